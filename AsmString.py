@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from enum import Enum
+import re
+
+
+class TokenType(Enum):
+    OPERAND = "operand"  # $Rd32, #$Ii, ##$II
+    WORD = "word"  # Mnemonics and fixed register names: add, memw, r31, p0, loop0
+    LITERAL = "literal"  # Everything else: whitespace, punctuation, numbers
+
+
+class SyntaxToken:
+    """
+    A single token of an LLVM AsmString.
+
+    Attributes:
+        type: TokenType The kind of the token.
+        llvm_text: str The text as it is found in the AsmString.
+        text: str The normalized text. Operands lose the '$' and '#' prefix and the number after their name.
+        name: str The LLVM operand name (Rd32, Ii). None for words and literals.
+    """
+
+    __slots__ = ["type", "llvm_text", "text", "name"]
+
+    def __init__(self, token_type: TokenType, llvm_text: str, text: str, name: str = None):
+        self.type = token_type
+        self.llvm_text = llvm_text
+        self.text = text
+        self.name = name
+
+    def __repr__(self):
+        return f"{self.type.name}({self.llvm_text})"
+
+
+def normalize_operand_name(llvm_name: str) -> str:
+    """Removes the number behind the operand name (it is the number of registers of the class): Rdd32 -> Rdd"""
+    return re.sub(r"([A-Z][a-zA-Z]+)[0-9]+", r"\1", llvm_name)
+
+
+class AsmString:
+    """
+    The LLVM AsmString of an instruction split into operands, words and literals.
+    It is parsed once. Everything which needs to know where an operand is in the syntax uses the tokens.
+
+    Args:
+        llvm_syntax: The AsmString. E.g.: "$Rd32 = add($Rs32,#$Ii)"
+    """
+
+    __slots__ = ["llvm_syntax", "tokens", "operand_names"]
+
+    TOKEN_PATTERN = re.compile(
+        r"(?P<operand>#{0,2}\$(?P<name>\w+))|(?P<word>[A-Za-z_]\w*)|(?P<literal>(?:[^$#A-Za-z_]|#(?!#?\$))+|.)"
+    )
+
+    def __init__(self, llvm_syntax: str):
+        self.llvm_syntax = llvm_syntax
+        self.tokens: list[SyntaxToken] = list()
+        # Operand names in the order of their first appearance.
+        self.operand_names: list[str] = list()
+        for match in self.TOKEN_PATTERN.finditer(llvm_syntax):
+            if match.group("operand"):
+                name = match.group("name")
+                self.tokens.append(SyntaxToken(TokenType.OPERAND, match.group(0), normalize_operand_name(name), name))
+                if name not in self.operand_names:
+                    self.operand_names.append(name)
+            elif match.group("word"):
+                self.tokens.append(SyntaxToken(TokenType.WORD, match.group(0), match.group(0)))
+            else:
+                self.tokens.append(SyntaxToken(TokenType.LITERAL, match.group(0), match.group(0)))
+
+    def __str__(self):
+        return self.llvm_syntax
+
+    @property
+    def normalized(self) -> str:
+        """The syntax without '$' and '#' operand prefixes and register class numbers: Rd = add(Rs,Ii)"""
+        return "".join([t.text for t in self.tokens])
+
+    @property
+    def words(self) -> list:
+        return [t.text for t in self.tokens if t.type == TokenType.WORD]
+
+    def has_operand(self, llvm_name: str) -> bool:
+        return llvm_name in self.operand_names
+
+    def get_operand_index(self, llvm_name: str) -> int:
+        """Returns the index of the operand in the syntax, counted from left to right. Or -1 if it is not in it."""
+        return self.operand_names.index(llvm_name) if llvm_name in self.operand_names else -1
@@ -0,0 +1,225 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from enum import Enum
+import re
+
+from ImplementationException import ImplementationException
+from InstructionTemplate import InstructionTemplate
+from Operand import OperandType
+import PluginInfo
+from helperFunctions import log, LogLevel
+
+
+class AsmTokenType(Enum):
+    WORD = "word"  # Mnemonics and other names: add, memw, jump, new
+    REG = "reg"  # Register names and aliases: R0, R1:0, SP, P3:0
+    NUM = "num"  # Decimal and hexadecimal numbers: 16, -0x10
+    PUNCT = "punct"  # Every other character except white space and '#'
+    OPERAND = "operand"  # An operand of a template (its text is the placeholder %r or %i)
+
+
+# 32bit FNV-1a
+FNV_OFFSET_BASIS = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+
+def fnv1a_32(key: str) -> int:
+    h = FNV_OFFSET_BASIS
+    for b in key.encode():
+        h = ((h ^ b) * FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+
+class AssemblerIndex:
+    """
+    Index of the instruction templates by the shape of their syntax. The assembler looks up the templates
+    which can encode a given text in it.
+
+    The text is split into tokens. White space and '#' are dropped.
+    The key of the token list has '%r' for register names, '%i' for numbers,
+    the words in lower case and the punctuation characters as they are.
+    "R0 = add(R1,#0x10)" has the key "%r=add(%r,%i)".
+    The operands of a template get the same placeholders, so a single hash lookup gives all candidate templates.
+
+    The tokenizer must produce the same tokens as hex_asm_tokenize() of the assembler.
+
+    Args:
+        hardware_regs: The hardware registers by register class.
+    """
+
+    IDENT_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+    PAIR_SUFFIX_PATTERN = re.compile(r":[0-9]+")
+    NUM_PATTERN = re.compile(r"-?(0[xX][0-9a-fA-F]+|[0-9]+)")
+
+    def __init__(self, hardware_regs: dict):
+        # Upper case register name or alias -> Upper case name of the register (as in the register name tables).
+        self.reg_names: dict[str, str] = dict()
+        for regs in hardware_regs.values():
+            for hw_reg in regs.values():
+                name = hw_reg.asm_name.upper()
+                self.reg_names[name] = name
+                alias = "".join(hw_reg.alias).upper()
+                if alias != "":
+                    self.reg_names.setdefault(alias, name)
+
+    def tokenize(self, text: str, tokens: list) -> list:
+        """Appends the (AsmTokenType, text) tuples of the text to tokens and returns them."""
+        i = 0
+        while i < len(text):
+            c = text[i]
+            if c in " \t\n\r\v\f#":
+                i += 1
+                continue
+            ident = self.IDENT_PATTERN.match(text, i)
+            if ident:
+                word = ident.group(0)
+                i = ident.end()
+                if word.upper() not in self.reg_names:
+                    tokens.append((AsmTokenType.WORD, word))
+                    continue
+                # Register pairs: R1:0, P3:0
+                suffix = self.PAIR_SUFFIX_PATTERN.match(text, i)
+                if suffix and (word + suffix.group(0)).upper() in self.reg_names:
+                    word += suffix.group(0)
+                    i = suffix.end()
+                tokens.append((AsmTokenType.REG, word))
+                continue
+            # A '-' only belongs to a number if no register, number or word is in front of it: "add(R0,#-1)"
+            num = self.NUM_PATTERN.match(text, i)
+            if num and (c != "-" or len(tokens) == 0 or tokens[-1][0] == AsmTokenType.PUNCT):
+                tokens.append((AsmTokenType.NUM, num.group(0)))
+                i = num.end()
+                continue
+            tokens.append((AsmTokenType.PUNCT, c))
+            i += 1
+        return tokens
+
+    @staticmethod
+    def get_key(tokens: list) -> str:
+        key = ""
+        prev = None
+        for token_type, text in tokens:
+            if token_type == AsmTokenType.REG:
+                key += "%r"
+            elif token_type == AsmTokenType.NUM:
+                key += "%i"
+            elif token_type == AsmTokenType.OPERAND:
+                key += text
+            elif token_type == AsmTokenType.WORD:
+                # Otherwise "a b" and "ab" would have the same key.
+                key += (" " if prev == AsmTokenType.WORD else "") + text.lower()
+            else:
+                key += text
+            prev = token_type
+        return key
+
+    def get_syntax_key(self, instr: InstructionTemplate) -> str:
+        """Returns the key of the instruction syntax. The operands are replaced by their placeholders."""
+        syntax, offsets = instr.get_syntax_operand_offsets()
+        tokens = list()
+        syntax_cur = 0
+        for op, syntax_off in offsets:
+            self.tokenize(syntax[syntax_cur:syntax_off], tokens)
+            syntax_cur = syntax_off
+            tokens.append((AsmTokenType.OPERAND, "%r" if op.type == OperandType.REGISTER else "%i"))
+        self.tokenize(syntax[syntax_cur:], tokens)
+        return self.get_key(tokens)
+
+    # RIZIN SPECIFIC
+    @staticmethod
+    def c_string(s: str) -> str:
+        return '"' + s.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    # RIZIN SPECIFIC
+    def get_index_in_c(self, tables: dict) -> str:
+        """Returns the candidate array, the hash table of the keys and the pointer to the constant extender template.
+
+        Args:
+            tables: The normal instructions of each template table by table name.
+                    The candidates of a key are ordered like the decoder checks them.
+        """
+        # Key -> [(Template reference, instruction name)]
+        candidates: dict[str, list] = dict()
+        ext_ref = None
+        for table_name, instructions in tables.items():
+            for i, instr in enumerate(instructions):
+                ref = f"&{table_name}[{i}]"
+                candidates.setdefault(self.get_syntax_key(instr), list()).append((ref, instr.name))
+                if instr.name == "A4_ext":
+                    ext_ref = ref
+        if ext_ref is None:
+            log("No A4_ext template. Extended immediates can not be assembled.", LogLevel.WARNING)
+
+        # Open addressing with linear probing. The size is a power of two and at least twice the number of keys.
+        size = 1 << (2 * len(candidates) - 1).bit_length()
+        slots = [None] * size
+        code = "static const HexInsnTemplate *hex_asm_candidates[] = {\n"
+        first = 0
+        for key, refs in candidates.items():
+            code += "".join([f"{ref}, // {name}\n" for ref, name in refs])
+            slot = fnv1a_32(key) & (size - 1)
+            while slots[slot] is not None:
+                slot = (slot + 1) & (size - 1)
+            slots[slot] = (key, first, len(refs))
+            first += len(refs)
+        code += "};\n\n"
+        if first > 0xFFFF:
+            raise ImplementationException(
+                "More than 0xffff assembler candidates. HexAsmIndexEntry stores ut16 indices."
+            )
+
+        code += f"static const HexAsmIndexEntry hex_asm_index[{size}] = {{\n"
+        for slot, entry in enumerate(slots):
+            if entry is None:
+                continue
+            key, key_first, count = entry
+            code += f"[{slot}] = {{ {self.c_string(key)}, {key_first}, {count} }},\n"
+        code += "};\n\n"
+        code += f"static const HexInsnTemplate *hex_asm_ext_template = {ext_ref if ext_ref else 'NULL'};\n\n"
+        log(
+            "Assembler index: {} keys, {} candidates, {} slots.",
+            LogLevel.VERBOSE,
+            len(candidates),
+            first,
+            size,
+            subsystem="importer",
+        )
+        return code
+
+    # RIZIN SPECIFIC
+    def get_reg_names_in_c(self) -> tuple:
+        """Returns the sorted table of all register names and aliases and the function which searches it.
+
+        Returns: Tuple of the code and the declaration of hex_get_canonical_reg_name().
+        """
+        prefix = PluginInfo.GENERAL_ENUM_PREFIX.lower()
+        code = f"static const char *{prefix}asm_reg_names[][2] = {{\n"
+        # Sorted like strcmp() compares them.
+        for name in sorted(self.reg_names):
+            code += f'{{ "{name}", "{self.reg_names[name]}" }},\n'
+        code += "};\n\n"
+
+        decl = f"const char *{prefix}get_canonical_reg_name(const char *name)"
+        code += "/**\n"
+        code += " * \\brief Returns the upper case name of the register with the given name or alias. Or NULL if\n"
+        code += " * there is no such register. \\p name must be in upper case.\n"
+        code += " */\n"
+        code += f"{decl} {{\n"
+        code += "size_t lo = 0;\n"
+        code += f"size_t hi = RZ_ARRAY_SIZE({prefix}asm_reg_names);\n"
+        code += "while (lo < hi) {\n"
+        code += "size_t mid = lo + (hi - lo) / 2;\n"
+        code += f"int cmp = strcmp(name, {prefix}asm_reg_names[mid][0]);\n"
+        code += "if (cmp == 0) {\n"
+        code += f"return {prefix}asm_reg_names[mid][1];\n"
+        code += "} else if (cmp < 0) {\n"
+        code += "hi = mid;\n"
+        code += "} else {\n"
+        code += "lo = mid + 1;\n"
+        code += "}\n"
+        code += "}\n"
+        code += "return NULL;\n"
+        code += "}\n\n"
+        return code, f"{decl};"
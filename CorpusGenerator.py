@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from __future__ import annotations
+
+import argparse
+import struct
+
+import numpy as np
+
+from HardwareRegister import HardwareRegister
+from InstructionDatabase import DbInstruction, DbOperand, InstructionDatabase
+from SubInstruction import DUPLEX_NAMESPACES
+
+PARSE_BITS_SHIFT = 14
+PARSE_BITS_MASK = 0b11 << PARSE_BITS_SHIFT
+PARSE_BITS_NOT_END = 0b01
+PARSE_BITS_LOOP = 0b10
+PARSE_BITS_END = 0b11
+DUPLEX_SUB_MASK = 0x1FFF
+MAX_PACKET_WORDS = 4
+# Value of a new-value register field which refers to the previous instruction (ahead = 1).
+N_REG_AHEAD_1 = 0b010
+
+# Kinds of hardware loop ends. Given by the parse bits of the first two words of a packet.
+ENDLOOP_NONE = 0
+ENDLOOP_0 = 1  # 10, 01/11
+ENDLOOP_1 = 2  # 01, 10
+ENDLOOP_01 = 3  # 10, 10
+
+EM_HEXAGON = 164
+
+
+def insert_operand_bits(value: int, masks: list) -> int:
+    """Distributes the value over the operand bits of an instruction word. Inverse of hex_op_masks_extract()."""
+    word = 0
+    for bits, shift in masks:
+        word |= (value & ((1 << bits) - 1)) << shift
+        value >>= bits
+    return word
+
+
+class EncodingTable:
+    """
+    The encodings of a list of instructions. Register operands only get values of registers
+    which exist in their class (no odd register pairs or unassigned control registers).
+
+    Args:
+        instructions: The instructions of the table.
+        reg_encodings: Register class -> The hardware encodings of its registers.
+        word_mask: The bits of the words which are used.
+    """
+
+    def __init__(self, instructions: list, reg_encodings: dict, word_mask: int = 0xFFFFFFFF):
+        self.word_mask = word_mask
+        self.masks = np.array([i.mask & word_mask for i in instructions], dtype=np.uint32)
+        self.op_codes = np.array([i.op_code & word_mask for i in instructions], dtype=np.uint32)
+        # Register operand k of each instruction: its bits in the word and the range of its valid values in reg_values.
+        reg_ops = [
+            [(op, self.get_valid_reg_bits(op, reg_encodings)) for op in i.operands if op.is_register]
+            for i in instructions
+        ]
+        reg_ops = [[(op, bits) for op, bits in ops if bits and "is_n_reg" not in op.flags] for ops in reg_ops]
+        max_regs = max([len(ops) for ops in reg_ops], default=0)
+        self.reg_fields = np.zeros((len(instructions), max_regs), dtype=np.uint32)
+        self.reg_first = np.zeros((len(instructions), max_regs), dtype=np.int64)
+        self.reg_count = np.zeros((len(instructions), max_regs), dtype=np.int64)
+        reg_values = list()
+        for i, ops in enumerate(reg_ops):
+            for k, (op, valid_bits) in enumerate(ops):
+                self.reg_fields[i, k] = insert_operand_bits(-1, op.masks)
+                self.reg_first[i, k] = len(reg_values)
+                self.reg_count[i, k] = len(valid_bits)
+                reg_values += [insert_operand_bits(v, op.masks) for v in valid_bits]
+        self.reg_values = np.array(reg_values, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.masks)
+
+    @staticmethod
+    def get_valid_reg_bits(op: DbOperand, reg_encodings: dict) -> list:
+        """Returns the values of the register bits which encode a register of the operand class."""
+        encodings = reg_encodings.get(op.reg_class, set())
+        field_bits = sum([bits for bits, _ in op.masks])
+        return [v for v in range(1 << field_bits) if HardwareRegister.remap_reg_bits(op.reg_class, v) in encodings]
+
+    def encode(self, rng: np.random.Generator, ids: np.ndarray) -> np.ndarray:
+        """Returns words of the instructions with random operands."""
+        words = rng.integers(0, 1 << 32, size=ids.shape, dtype=np.uint32)
+        words = (self.op_codes[ids] | (words & ~self.masks[ids])) & np.uint32(self.word_mask)
+        for k in range(self.reg_fields.shape[1]):
+            count = self.reg_count[ids, k]
+            pick = self.reg_first[ids, k] + (rng.random(ids.shape) * count).astype(np.int64)
+            values = np.where(count > 0, self.reg_values[np.minimum(pick, len(self.reg_values) - 1)], 0)
+            words = (words & ~self.reg_fields[ids, k]) | values.astype(np.uint32)
+        return words
+
+
+class CorpusGenerator:
+    """
+    Generates large streams of valid instruction packets for fuzzing and benchmarking the decoder.
+    The packets are built from the encodings in an instruction database (see InstructionDatabase.py).
+    All packets are generated at once with NumPy, one vector operation per slot.
+
+    A packet has one to four words. Operand bits are random. On top of that packets get:
+        - Constant extenders in front of instructions with extendable immediates.
+        - New-value stores whose Nt operand refers to a producer of a general purpose register in the previous slot.
+        - A duplex as last word.
+        - An endloop0, endloop1 or endloop01 marker in the parse bits.
+
+    Solo instructions, instructions which must be extended, and new-value instructions of other register
+    classes (predicates, HVX) are not generated.
+
+    Args:
+        db: The instruction database.
+        seed: Seed of the random generator.
+    """
+
+    def __init__(self, db: InstructionDatabase, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        instructions = [db.instruction(i) for i in range(len(db))]
+        normal = [i for i in instructions if not i.is_sub_instruction]
+        reg_encodings = {c: {r.hw_encoding for r in db.registers(c)} for c in db.reg_classes}
+        self.normal = EncodingTable(normal, reg_encodings)
+        self.extendable = np.array(["has_extendable_imm" in i.flags for i in normal], dtype=bool)
+        # Bits of the new-value field of consumers. Set to refer to the previous instruction.
+        self.n_reg_clear = np.zeros(len(normal), dtype=np.uint32)
+        self.n_reg_bits = np.zeros(len(normal), dtype=np.uint32)
+
+        self.pool = list()  # Instructions which are valid in any slot.
+        consumers = list()
+        producers = list()
+        for k, instr in enumerate(normal):
+            if self.is_excluded(instr):
+                continue
+            n_reg = next((op for op in instr.operands if "is_n_reg" in op.flags), None)
+            if n_reg:
+                self.n_reg_clear[k] = insert_operand_bits(-1, n_reg.masks)
+                self.n_reg_bits[k] = insert_operand_bits(N_REG_AHEAD_1, n_reg.masks)
+                consumers.append(k)
+                continue
+            if any(["is_new_value" in op.flags for op in instr.operands]):
+                continue
+            self.pool.append(k)
+            if self.is_producer(instr) and not self.extendable[k]:
+                producers.append(k)
+        self.pool = np.array(self.pool, dtype=np.int32)
+        self.consumers = np.array(consumers if producers else [], dtype=np.int32)
+        self.producers = np.array(producers, dtype=np.int32)
+        self.ext_index = next((k for k, i in enumerate(normal) if "is_imm_ext" in i.flags), None)
+
+        subs = {
+            ns: EncodingTable([i for i in instructions if i.namespace == ns], reg_encodings, DUPLEX_SUB_MASK)
+            for ns in db.namespaces
+        }
+        # Duplex i-class and the sub-instruction tables of its (high, low) instructions.
+        self.duplex_classes = list()
+        self.duplex_subs = list()
+        for i_class, (high_ns, low_ns) in DUPLEX_NAMESPACES.items():
+            if high_ns.name not in subs or low_ns.name not in subs:
+                continue
+            self.duplex_classes.append(i_class)
+            self.duplex_subs.append((subs[high_ns.name], subs[low_ns.name]))
+        self.duplex_classes = np.array(self.duplex_classes, dtype=np.uint32)
+
+    @staticmethod
+    def is_excluded(instr: DbInstruction) -> bool:
+        flags = instr.flags
+        return (
+            instr.name == "invalid_decode"
+            or "is_imm_ext" in flags
+            or "is_solo" in flags
+            or "must_be_extended" in flags
+            or "is_endloop" in flags
+        )
+
+    @staticmethod
+    def is_producer(instr: DbInstruction) -> bool:
+        """Instructions whose first output operand is a general purpose register."""
+        out = next((op for op in instr.operands if op.is_register and "is_out_operand" in op.flags), None)
+        return out is not None and out.reg_class == "IntRegs"
+
+    def choose(self, pool: np.ndarray, shape) -> np.ndarray:
+        return pool[self.rng.integers(0, len(pool), size=shape)]
+
+    def get_packet_sizes(self, n_words: int) -> np.ndarray:
+        """Random packet sizes which sum up to n_words."""
+        sizes = np.zeros(0, dtype=np.int64)
+        total = 0
+        while total < n_words:
+            more = self.rng.integers(1, MAX_PACKET_WORDS + 1, size=(n_words - total) // 2 + 1)
+            sizes = np.concatenate([sizes, more])
+            total = int(sizes.sum())
+        ends = np.cumsum(sizes)
+        count = int(np.searchsorted(ends, n_words)) + 1
+        sizes = sizes[:count]
+        sizes[-1] -= ends[count - 1] - n_words
+        return sizes
+
+    def generate(
+        self,
+        n_words: int,
+        ext_ratio: float = 0.1,
+        new_ratio: float = 0.1,
+        duplex_ratio: float = 0.2,
+        loop_ratio: float = 0.05,
+    ) -> np.ndarray:
+        """Returns n_words instruction words as uint32 array. The last packet is complete.
+
+        Args:
+            n_words: Number of words.
+            ext_ratio: Probability that an instruction with extendable immediate gets a constant extender.
+            new_ratio: Probability of a new-value store in a slot after the first.
+            duplex_ratio: Probability that the last word of a packet is a duplex.
+            loop_ratio: Probability that a packet (with enough words) ends a hardware loop.
+        """
+        sizes = self.get_packet_sizes(n_words)
+        n_pkts = len(sizes)
+        slot = np.arange(MAX_PACKET_WORDS)[None, :]
+        valid = slot < sizes[:, None]
+        last = sizes - 1
+        rows = np.arange(n_pkts)
+
+        ids = self.choose(self.pool, (n_pkts, MAX_PACKET_WORDS))
+        consumer = np.zeros(ids.shape, dtype=bool)
+        is_ext = np.zeros(ids.shape, dtype=bool)
+        if len(self.consumers) > 0:
+            for s in range(1, MAX_PACKET_WORDS):
+                sel = valid[:, s] & (self.rng.random(n_pkts) < new_ratio)
+                ids[sel, s] = self.choose(self.consumers, sel.sum())
+                ids[sel, s - 1] = self.choose(self.producers, sel.sum())
+                consumer[sel, s] = True
+                consumer[sel, s - 1] = False
+        if self.ext_index is not None:
+            for s in range(1, MAX_PACKET_WORDS):
+                # The previous slot becomes the extender. So it must not be extended itself.
+                sel = valid[:, s] & self.extendable[ids[:, s]] & ~consumer[:, s]
+                if s > 1:
+                    sel &= ~is_ext[:, s - 2]
+                sel &= self.rng.random(n_pkts) < ext_ratio
+                ids[sel, s - 1] = self.ext_index
+                is_ext[sel, s - 1] = True
+                consumer[sel, s - 1] = False
+
+        words = self.normal.encode(self.rng, ids)
+        words = (words & ~self.n_reg_clear[ids]) | np.where(consumer, self.n_reg_bits[ids], 0).astype(np.uint32)
+        parse_bits = np.where(slot == last[:, None], PARSE_BITS_END, PARSE_BITS_NOT_END)
+
+        # Duplexes replace the last word. An extender in front of it would extend the duplex.
+        is_duplex = np.zeros(n_pkts, dtype=bool)
+        if len(self.duplex_classes) > 0:
+            is_duplex = (self.rng.random(n_pkts) < duplex_ratio) & ~is_ext[rows, np.maximum(last - 1, 0)]
+            is_duplex &= ~consumer[rows, last]
+            pkts = np.flatnonzero(is_duplex)
+            classes = self.rng.integers(0, len(self.duplex_classes), size=len(pkts))
+            duplex_words = np.zeros(len(pkts), dtype=np.uint32)
+            for c in np.unique(classes):
+                sel = classes == c
+                high_table, low_table = self.duplex_subs[c]
+                high = high_table.encode(self.rng, self.rng.integers(0, len(high_table), size=sel.sum()))
+                low = low_table.encode(self.rng, self.rng.integers(0, len(low_table), size=sel.sum()))
+                i_class = self.duplex_classes[c]
+                duplex_words[sel] = (i_class >> 1) << 29 | high << 16 | (i_class & 1) << 13 | low
+            words[pkts, last[pkts]] = duplex_words
+            parse_bits[pkts, last[pkts]] = 0
+
+        # The loop markers are in the first two words. Those must not be the last word of the packet
+        # (endloop1, endloop01) or a duplex (endloop0).
+        endloop = np.where(self.rng.random(n_pkts) < loop_ratio, self.rng.integers(1, 4, size=n_pkts), ENDLOOP_NONE)
+        endloop[(endloop == ENDLOOP_0) & ((sizes < 2) | ((sizes == 2) & is_duplex))] = ENDLOOP_NONE
+        endloop[(endloop != ENDLOOP_0) & (sizes < 3)] = ENDLOOP_NONE
+        parse_bits[(endloop == ENDLOOP_0) | (endloop == ENDLOOP_01), 0] = PARSE_BITS_LOOP
+        parse_bits[(endloop == ENDLOOP_1) | (endloop == ENDLOOP_01), 1] = PARSE_BITS_LOOP
+
+        not_duplex = parse_bits != 0
+        words[not_duplex] = (words[not_duplex] & ~np.uint32(PARSE_BITS_MASK)) | (
+            parse_bits[not_duplex].astype(np.uint32) << PARSE_BITS_SHIFT
+        )
+        return words[valid]
+
+    @staticmethod
+    def write_raw(words: np.ndarray, path: str) -> None:
+        words.astype("<u4").tofile(path)
+
+    @staticmethod
+    def write_elf(words: np.ndarray, path: str, addr: int = 0) -> None:
+        """Writes the words as .text section of a minimal 32bit Hexagon ELF executable."""
+        code = words.astype("<u4").tobytes()
+        shstrtab = b"\0.text\0.shstrtab\0"
+        ehdr_size, phdr_size, shdr_size = 52, 32, 40
+        code_off = ehdr_size + phdr_size
+        shstrtab_off = code_off + len(code)
+        sh_off = (shstrtab_off + len(shstrtab) + 3) & ~3
+
+        elf = bytearray(b"\x7fELF" + bytes([1, 1, 1]) + bytes(9))  # 32bit, little endian, version 1
+        # e_type = ET_EXEC, e_machine, e_version, e_entry, e_phoff, e_shoff, e_flags, e_ehsize, e_phentsize,
+        # e_phnum, e_shentsize, e_shnum, e_shstrndx
+        elf += struct.pack(
+            "<HHIIIIIHHHHHH", 2, EM_HEXAGON, 1, addr, ehdr_size, sh_off, 0, ehdr_size, phdr_size, 1, shdr_size, 3, 2
+        )
+        # PT_LOAD, offset, vaddr, paddr, filesz, memsz, PF_R | PF_X, align
+        elf += struct.pack("<IIIIIIII", 1, code_off, addr, addr, len(code), len(code), 0x5, 4)
+        elf += code + shstrtab
+        elf += bytes(sh_off - len(elf))
+        elf += bytes(shdr_size)
+        # .text: SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR
+        elf += struct.pack("<IIIIIIIIII", 1, 1, 0x6, addr, code_off, len(code), 0, 0, 4, 0)
+        # .shstrtab: SHT_STRTAB
+        elf += struct.pack("<IIIIIIIIII", 7, 3, 0, 0, shstrtab_off, len(shstrtab), 0, 0, 1, 0)
+        with open(path, "wb") as f:
+            f.write(elf)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Generate a stream of valid Hexagon instruction packets.")
+    parser.add_argument("--db", required=True, help="Instruction database written with LLVMImporter.py --export-db.")
+    parser.add_argument("--words", type=int, default=1 << 20, help="Number of instruction words.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ext-ratio", type=float, default=0.1)
+    parser.add_argument("--new-ratio", type=float, default=0.1)
+    parser.add_argument("--duplex-ratio", type=float, default=0.2)
+    parser.add_argument("--loop-ratio", type=float, default=0.05)
+    parser.add_argument("--elf", action="store_true", help="Write an ELF file instead of the raw words.")
+    parser.add_argument("--addr", type=lambda x: int(x, 0), default=0, help="Address of the code in the ELF file.")
+    parser.add_argument("out", help="Output file.")
+    args = parser.parse_args()
+
+    with InstructionDatabase(args.db) as database:
+        generator = CorpusGenerator(database, args.seed)
+    corpus = generator.generate(args.words, args.ext_ratio, args.new_ratio, args.duplex_ratio, args.loop_ratio)
+    if args.elf:
+        CorpusGenerator.write_elf(corpus, args.out, args.addr)
+    else:
+        CorpusGenerator.write_raw(corpus, args.out)
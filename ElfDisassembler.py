@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+from CorpusGenerator import ENDLOOP_0, ENDLOOP_01, ENDLOOP_1, ENDLOOP_NONE, PARSE_BITS_END, PARSE_BITS_SHIFT
+from InstructionDatabase import InstructionDatabase
+from ReferenceDecoder import ReferenceDecoder, get_pkt_starts
+from UnexpectedException import UnexpectedException
+
+SHT_PROGBITS = 1
+SHF_EXECINSTR = 0x4
+ENDLOOP_SUFFIX = {ENDLOOP_NONE: "", ENDLOOP_0: ":endloop0", ENDLOOP_1: ":endloop1", ENDLOOP_01: ":endloop01"}
+
+# The decoder of a worker process. Set by init_worker().
+worker_decoder: ReferenceDecoder = None
+
+
+class ElfSection:
+    """An executable section of an ELF file."""
+
+    def __init__(self, name: str, addr: int, offset: int, size: int):
+        self.name = name
+        self.addr = addr
+        self.offset = offset
+        # Trailing bytes of an incomplete word are not decoded.
+        self.words = size // 4
+
+
+def get_exec_sections(elf) -> list[ElfSection]:
+    """Returns the executable sections of a 32bit little endian ELF file.
+
+    Args:
+        elf: The content of the file (bytes or a mmap).
+    """
+    if elf[:4] != b"\x7fELF" or elf[4] != 1 or elf[5] != 1:
+        raise UnexpectedException("The file is no 32bit little endian ELF file.")
+    sh_off, _, _, _, _, sh_ent_size, sh_num, sh_str_idx = struct.unpack_from("<IIHHHHHH", elf, 0x20)
+    if sh_off + sh_num * sh_ent_size > len(elf):
+        raise UnexpectedException("The section headers are out of the file bounds.")
+    headers = [struct.unpack_from("<IIIIII", elf, sh_off + i * sh_ent_size) for i in range(sh_num)]
+    str_off = headers[sh_str_idx][4] if sh_str_idx < sh_num else None
+
+    sections = list()
+    for name_off, sh_type, flags, addr, offset, size in headers:
+        if sh_type != SHT_PROGBITS or not flags & SHF_EXECINSTR:
+            continue
+        if offset + size > len(elf):
+            raise UnexpectedException("The section at 0x{:x} is out of the file bounds.".format(offset))
+        name = ""
+        if str_off is not None:
+            end = elf.find(b"\0", str_off + name_off)
+            name = elf[str_off + name_off : end].decode(errors="replace")
+        sections.append(ElfSection(name, addr, offset, size))
+    return sections
+
+
+def get_packet_chunks(words: np.ndarray, chunk_words: int) -> list[tuple]:
+    """Splits the words into chunks of about chunk_words words. Each chunk ends with the last word of a packet
+    (parse bits 0b11 or 0b00 for duplexes). So the chunks can be decoded independently.
+
+    Returns: (first word, word count) of each chunk.
+    """
+    parse_bits = (words >> PARSE_BITS_SHIFT) & 0x3
+    # Index of the first word after each packet end.
+    pkt_ends = np.flatnonzero((parse_bits == PARSE_BITS_END) | (parse_bits == 0)) + 1
+    chunks = list()
+    start = 0
+    while start < len(words):
+        k = np.searchsorted(pkt_ends, start + chunk_words)
+        # Without a packet end after the chunk size the rest is one chunk.
+        end = int(pkt_ends[k]) if k < len(pkt_ends) else len(words)
+        chunks.append((start, end - start))
+        start = end
+    return chunks
+
+
+def get_endloops(words: np.ndarray, pkt_starts: np.ndarray) -> np.ndarray:
+    """Returns the kind of hardware loop end of each packet (ENDLOOP_*).
+    It is given by the parse bits of the first two words of a packet.
+    """
+    parse_bits = (words >> PARSE_BITS_SHIFT) & 0x3
+    endloops = np.full(len(pkt_starts), ENDLOOP_NONE)
+    has_second = (pkt_starts + 1 < len(words)) & (parse_bits[pkt_starts] != PARSE_BITS_END)
+    has_second &= parse_bits[pkt_starts] != 0
+    first = parse_bits[pkt_starts[has_second]]
+    second = parse_bits[pkt_starts[has_second] + 1]
+    kinds = np.full(len(first), ENDLOOP_NONE)
+    kinds[(first == 0b10) & (second != 0b10)] = ENDLOOP_0
+    kinds[(first == 0b01) & (second == 0b10)] = ENDLOOP_1
+    kinds[(first == 0b10) & (second == 0b10)] = ENDLOOP_01
+    endloops[has_second] = kinds
+    return endloops
+
+
+def format_chunk(decoder: ReferenceDecoder, words: np.ndarray, addr: int, section: str, out_format: str) -> str:
+    """Decodes the words of a chunk and returns their disassembly in the output format ("text" or "json")."""
+    decoded = decoder.decode(words, addr)
+    parse_bits = (words >> PARSE_BITS_SHIFT) & 0x3
+    is_start = get_pkt_starts(parse_bits)
+    is_end = (parse_bits == PARSE_BITS_END) | (parse_bits == 0)
+    is_end[:-1] |= is_start[1:]
+    pkt_starts = np.flatnonzero(is_start)
+    # Kind of the loop end of the packet of each word.
+    endloops = get_endloops(words, pkt_starts)[np.cumsum(is_start) - 1]
+
+    lines = list()
+    for i in range(len(words)):
+        text = decoder.text(decoded, i)
+        endloop = ENDLOOP_SUFFIX[int(endloops[i])]
+        if out_format == "json":
+            entry = {
+                "addr": int(decoded.addrs[i]),
+                "word": int(words[i]),
+                "pkt_addr": int(decoded.pkt_addrs[i]),
+                "name": decoder.name(decoded, i),
+                "text": text,
+                "pkt_end": bool(is_end[i]),
+                "endloop": endloop[1:] if is_end[i] else "",
+                "section": section,
+            }
+            lines.append(json.dumps(entry))
+            continue
+        prefix = "{ " if is_start[i] else "  "
+        suffix = " }" + ("  " + endloop if endloop else "") if is_end[i] else ""
+        lines.append("0x{:08x} {:08x}  {}{}{}".format(int(decoded.addrs[i]), int(words[i]), prefix, text, suffix))
+    return "".join([line + "\n" for line in lines])
+
+
+def init_worker(db_path: str, decoder_args: dict) -> None:
+    global worker_decoder
+    with InstructionDatabase(db_path) as db:
+        worker_decoder = ReferenceDecoder.from_db(db, **decoder_args)
+
+
+def decode_chunk(task: tuple) -> str:
+    """Decodes a chunk of a section in a worker process. The ELF file is mapped by each worker."""
+    elf_path, offset, count, addr, section, out_format = task
+    with open(elf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as elf:
+        words = np.frombuffer(elf, dtype="<u4", count=count, offset=offset).astype(np.uint32)
+    return format_chunk(worker_decoder, words, addr, section, out_format)
+
+
+def disassemble(
+    elf_path: str,
+    db_path: str,
+    out,
+    out_format: str = "text",
+    jobs: int = None,
+    chunk_words: int = 1 << 16,
+    section_names: list = None,
+    decoder_args: dict = None,
+) -> None:
+    """Disassembles the executable sections of an ELF file and writes the result in address order.
+
+    Args:
+        elf_path: The ELF file.
+        db_path: The instruction database (LLVMImporter.py --export-db).
+        out: The file object the disassembly is written to.
+        out_format: "text" or "json" (one JSON object per word).
+        jobs: Number of worker processes. None for one per CPU. With 1 everything is decoded in this process.
+        chunk_words: Minimum number of words decoded at once by a worker.
+        section_names: Only disassemble these sections. All executable sections if None.
+        decoder_args: Keyword arguments of ReferenceDecoder.from_db() (print_reg_alias, show_hash, sign_nums).
+    """
+    decoder_args = decoder_args or dict()
+    tasks = list()
+    with open(elf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as elf:
+        for section in get_exec_sections(elf):
+            if section.words == 0 or (section_names is not None and section.name not in section_names):
+                continue
+            words = np.frombuffer(elf, dtype="<u4", count=section.words, offset=section.offset)
+            for start, count in get_packet_chunks(words, chunk_words):
+                task = (elf_path, section.offset + 4 * start, count, section.addr + 4 * start, section.name, out_format)
+                # The section header is written before the first chunk of the section.
+                tasks.append((task, start == 0))
+            del words
+
+    headers = {task: "\nDisassembly of section {}:\n\n".format(task[4]) for task, first in tasks if first}
+    if jobs == 1:
+        init_worker(db_path, decoder_args)
+        results = map(decode_chunk, [task for task, _ in tasks])
+        write_results(out, tasks, results, headers, out_format)
+        return
+    with Pool(jobs, initializer=init_worker, initargs=(db_path, decoder_args)) as pool:
+        # imap returns the results in task order. So the output is streamed in address order.
+        results = pool.imap(decode_chunk, [task for task, _ in tasks])
+        write_results(out, tasks, results, headers, out_format)
+
+
+def write_results(out, tasks: list, results, headers: dict, out_format: str) -> None:
+    for (task, _), result in zip(tasks, results):
+        if out_format == "text" and task in headers:
+            out.write(headers[task])
+        out.write(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Disassemble the executable sections of a Hexagon ELF file.")
+    parser.add_argument("--db", required=True, help="Instruction database written with LLVMImporter.py --export-db.")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="JSON writes one object per line.")
+    parser.add_argument("--jobs", type=int, default=None, help="Number of worker processes (default: CPU count).")
+    parser.add_argument("--chunk-words", type=int, default=1 << 16, help="Minimum number of words of a chunk.")
+    parser.add_argument("--section", action="append", help="Only disassemble this section. Can be repeated.")
+    parser.add_argument("--no-reg-alias", action="store_true", help="Print the register names instead of aliases.")
+    parser.add_argument("--no-hash", action="store_true", help="Do not print '#' before immediates.")
+    parser.add_argument("--no-sign", action="store_true", help="Print negative immediates as unsigned.")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: stdout).")
+    parser.add_argument("elf", help="The ELF file.")
+    args = parser.parse_args()
+
+    options = {"print_reg_alias": not args.no_reg_alias, "show_hash": not args.no_hash, "sign_nums": not args.no_sign}
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        disassemble(args.elf, args.db, output, args.format, args.jobs, args.chunk_words, args.section, options)
+    finally:
+        if args.output:
+            output.close()
@@ -14,6 +14,8 @@ from ImplementationException import ImplementationException
 class HardwareRegister(Register):
     """Represents a concrete Hexagon hardware register. Like R13, C17, V4 etc."""
 
+    __slots__ = ["name", "asm_name", "alias", "enum_name", "sorting_val", "hw_encoding", "size", "sub_register_names"]
+
     def __init__(self, llvm_reg_class: str, llvm_object: dict, name: str, size: int):
         index = list_to_int(llvm_object["HWEncoding"], endian="little")
         # We use the super class only to set all the register type flags.
@@ -106,6 +108,24 @@ class HardwareRegister(Register):
             code += "{} |= 6;\n".format(var)
         return code
 
+    @staticmethod
+    def remap_reg_bits(reg_class: str, value: int) -> int:
+        """Python equivalent of the code generated by get_parse_code_reg_bits().
+        Returns the register ID for the register bits of an instruction encoding.
+        """
+        if reg_class == "GeneralDoubleLow8Regs":
+            value = value << 1
+            if value > 6:  # HEX_REG_D3 == 6
+                value = (value & 0x7) | 0x10
+        elif reg_class == "GeneralSubRegs":
+            if value > 7:  # HEX_REG_R7 == 7
+                value = (value & 0x7) | 0x10
+        elif reg_class == "VectRegRev":
+            value = (value << 1) + 1
+        elif reg_class == "ModRegs":
+            value |= 6
+        return value
+
     # RIZIN SPECIFIC
     def get_reg_profile(self, offset: int, is_tmp: bool) -> str:
         """Returns a one line register profile description.
@@ -31,8 +31,6 @@ class Immediate(Operand):
 
     __slots__ = [
         "scale",
-        "type",
-        "syntax",
         "is_signed",
         "is_extendable",
         "extend_alignment",
@@ -91,7 +89,7 @@ class Immediate(Operand):
             else:
                 self.total_width = width.group(1)
             self.is_extendable = False
-            log("Parsed imm type: {}, width: {}".format(type_letter, self.total_width), LogLevel.VERBOSE)
+            log("Parsed imm type: {}, width: {}", LogLevel.VERBOSE, type_letter, self.total_width, subsystem="operand")
             return
         else:
             raise ImplementationException("Unhandled immediate type: {}".format(llvm_imm_type))
@@ -152,3 +150,31 @@ class Immediate(Operand):
         if self.scale > 0:
             r += f", .imm_scale = {self.scale}"
         return r
+
+    # RIZIN SPECIFIC
+    def c_decode(self, index: int, force_extendable=False) -> str:
+        op = f"hi->ops[{index}]"
+        code = f"{op}.attr = {'HEX_OP_IMM_SCALED' if self.scale > 0 else '0'};\n"
+        code += f"{op}.type = HEX_OP_TYPE_IMM;\n"
+        if self.is_constant:
+            code += f"{op}.op.imm = -1;\n"
+            code += 'rz_strbuf_append(sb, "-1");\n'
+            return code
+        value = f"(ut32)({self.opcode_mask.c_extract()})"
+        code += f"{op}.op.imm = {value}{f' << {self.scale}' if self.scale > 0 else ''};\n"
+        code += f"{op}.shift = {self.scale};\n"
+        if self.is_signed:
+            sign_bit = self.opcode_mask.bits_total + self.scale - 1
+            code += f"if ({op}.op.imm & (1ull << {sign_bit})) {{\n"
+            code += f"{op}.op.imm |= UT64_MAX << {sign_bit};\n"
+            code += "}\n"
+        if self.is_extendable or force_extendable:
+            code += f"hex_extend_op(state, &{op}, false, addr);\n"
+        hash_prefix = f'cfg->show_hash ? "{"##" if self.total_width == 32 else "#"}" : ""'
+        if self.is_pc_relative:
+            code += f'rz_strbuf_appendf(sb, "0x%" PFMT32x, pkt->pkt_addr + (st32){op}.op.imm);\n'
+        elif self.is_signed:
+            code += f"hex_append_signed_imm(sb, {hash_prefix}, {op}.op.imm, cfg->sign_nums);\n"
+        else:
+            code += f'rz_strbuf_appendf(sb, "%s0x%" PFMT32x, {hash_prefix}, (ut32){op}.op.imm);\n'
+        return code
@@ -2,11 +2,10 @@
 #
 # SPDX-License-Identifier: LGPL-3.0-only
 
-import re
-
+from AsmString import AsmString
 from InstructionTemplate import InstructionTemplate, LoopMembership
 from InstructionEncoding import InstructionEncoding
-from helperFunctions import normalize_llvm_syntax, list_to_int
+from helperFunctions import list_to_int
 
 
 class Instruction(InstructionTemplate):
@@ -14,36 +13,7 @@ class Instruction(InstructionTemplate):
     Definition of the instruction with the maximum processing done before being used for disassembly.
     """
 
-    __slots__ = [
-        "encoding",
-        "llvm_instr",
-        "i_class",
-        "is_imm_ext",
-        "llvm_filtered_operands",
-        "mult_inst",
-        "imm_ops",
-        "reg_ops",
-        "opt_ops",
-        "branch",
-        "behavior",
-        "tokens",
-        "name",
-        "type",
-        "syntax",
-        "llvm_syntax",
-        "predicated",
-        "llvm_filtered_operands",
-        "is_sub_instruction",
-        "has_extendable_imm",
-        "llvm_ext_operand_index",
-        "must_be_extended",
-        "extendable_alignment",
-        "is_solo",
-        "addr_mode",
-        "access_size",
-        "has_new_non_predicate",
-        "llvm_new_operand_index",
-    ]
+    __slots__ = []
 
     def __init__(self, llvm_instruction):
         super(Instruction, self).__init__(llvm_instruction)
@@ -51,7 +21,8 @@ class Instruction(InstructionTemplate):
         # Syntax and encoding
         self.encoding = InstructionEncoding(self.llvm_instr["Inst"])
         self.llvm_syntax = self.llvm_instr["AsmString"]
-        self.syntax = normalize_llvm_syntax(self.llvm_instr["AsmString"])
+        self.asm_string = AsmString(self.llvm_syntax)
+        self.syntax = self.asm_string.normalized
 
         # Packet and Duplex
         # Has to be only instruction in packet.
@@ -60,7 +31,7 @@ class Instruction(InstructionTemplate):
         self.is_sub_instruction = False
 
         # Operands
-        self.num_operands = self.get_num_operands(self.llvm_syntax, self.llvm_in_out_operands)
+        self.num_operands = self.get_num_operands(self.asm_string, self.llvm_in_out_operands)
 
         # Immediate operands
         self.has_extendable_imm = self.llvm_instr["isExtendable"][0] == 1
@@ -80,41 +51,39 @@ class Instruction(InstructionTemplate):
         self.is_endloop = "endloop" in self.name
         self.is_loop_begin = "loop" in self.name and not self.is_endloop
         self.is_loop = self.is_endloop or self.is_loop_begin
-        self.loop_member = self.get_loop_membership(self.llvm_syntax)
+        self.loop_member = self.get_loop_membership(self.asm_string)
 
         self.parse_instruction()
+        self.release_llvm_record()
 
     @staticmethod
-    def get_num_operands(llvm_syntax: str, llvm_operands: list) -> int:
+    def get_num_operands(asm_string: AsmString, llvm_operands: list) -> int:
         """Counts operands which actually appear in the syntax. This is necessary in case of
         InOutRegisters like Rx/RxIn.
         They are always listed in the LLVM instr. but not necessarily appear in the syntax.
         """
-        s = 0
-        for op in llvm_operands:
-            name = op[1]
-            s += 1 if name in llvm_syntax else 0
-        return s
+        return len([op for op in llvm_operands if asm_string.has_operand(op[1])])
 
     @staticmethod
-    def get_loop_membership(syntax: str) -> int:
+    def get_loop_membership(asm_string: AsmString) -> int:
         """Returns loop membership to a loop name.
         The syntax has to be parsed as some loops have the number not in the name (e.g. J2_ploop3sr).
         """
-        if re.search(r"loop0[^\d]", syntax):
-            return LoopMembership.HEX_LOOP_0
-        elif re.search(r"loop1[^\d]", syntax):
-            return LoopMembership.HEX_LOOP_1
-        elif re.search(r"endloop01", syntax):
+        words = asm_string.words
+        if "endloop01" in words:
             return (
                 LoopMembership.HEX_ENDS_LOOP_0
                 | LoopMembership.HEX_ENDS_LOOP_1
                 | LoopMembership.HEX_LOOP_0
                 | LoopMembership.HEX_LOOP_1
             )
-        elif re.search(r"enloop1[^\d]", syntax):
+        elif "endloop1" in words:
             return LoopMembership.HEX_LOOP_1 | LoopMembership.HEX_ENDS_LOOP_1
-        elif re.search(r"enloop0[^\d]", syntax):
+        elif "endloop0" in words:
             return LoopMembership.HEX_LOOP_0 | LoopMembership.HEX_ENDS_LOOP_0
+        elif any([w.endswith("loop0") for w in words]):  # loop0, sp1loop0 etc.
+            return LoopMembership.HEX_LOOP_0
+        elif any([w.endswith("loop1") for w in words]):
+            return LoopMembership.HEX_LOOP_1
         else:
             return LoopMembership.HEX_NO_LOOP
@@ -0,0 +1,441 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from __future__ import annotations
+
+from enum import IntEnum
+import mmap
+import struct
+from typing import NamedTuple
+
+from HardwareRegister import HardwareRegister
+from InstructionTemplate import InsnFeature
+from Operand import OperandType
+from UnexpectedException import UnexpectedException
+
+# Binary format of the instruction database. All numbers are little endian.
+#
+# Header: magic, version, number of sections. It is followed by one (offset, size, count) entry per Section.
+# The string offsets in the records point into the STRINGS section (null terminated utf-8, offset 0 is "").
+DB_MAGIC = b"HEXINSDB"
+DB_VERSION = 2
+HEADER = struct.Struct("<8sHH")
+SECTION = struct.Struct("<III")
+# name, syntax, syntax without operands, type, implicit uses, implicit defs, mask, op code, flags, first operand,
+# operand count, is sub-instruction, i-class or namespace index, feature (index in InsnFeature)
+INSTRUCTION = struct.Struct("<IIIIIIIIIIBBBB")
+# name, llvm type, flags, is register, syntax index, scale, encoding width, register class or 0xff,
+# offset in the syntax without operands, total width, 4 x (bits, shift) of the operand mask
+OPERAND = struct.Struct("<IIHBBBBBBBx8s")
+# name, asm name, aliases, register class, hardware encoding, size
+REGISTER = struct.Struct("<IIIHHH2x")
+# name, first register, register count
+GROUP = struct.Struct("<III")
+INDEX = struct.Struct("<I")
+
+# Bit i of the flags is set if the attribute is True.
+INSN_FLAGS = [
+    "is_call",
+    "is_branch",
+    "is_terminator",
+    "is_return",
+    "is_solo",
+    "is_predicated",
+    "is_pred_new",
+    "is_pred_true",
+    "is_pred_false",
+    "has_jump_target",
+    "is_imm_ext",
+    "is_loop",
+    "is_loop_begin",
+    "is_endloop",
+    "may_load",
+    "may_store",
+    "has_extendable_imm",
+    "must_be_extended",
+    "has_new_non_predicate",
+    "is_trap",
+    "is_pause",
+    "is_vector",
+]
+OPERAND_FLAGS = [
+    "is_in_operand",
+    "is_out_operand",
+    "is_in_out_operand",
+    "is_signed",
+    "is_extendable",
+    "is_pc_relative",
+    "is_constant",
+    "is_new_value",
+    "is_n_reg",
+    "is_double",
+    "is_quadruple",
+]
+NO_REG_CLASS = 0xFF
+
+
+class Section(IntEnum):
+    STRINGS = 0
+    INSTRUCTIONS = 1  # Normal instructions ordered by i-class, then sub-instructions ordered by namespace.
+    OPERANDS = 2  # The operands of each instruction ordered by their syntax index.
+    REGISTERS = 3  # Ordered by register class.
+    REG_CLASSES = 4  # GROUP records of the registers.
+    NAME_INDEX = 5  # Instruction indices sorted by name.
+    I_CLASS_INDEX = 6  # 16 GROUP records of the normal instructions. The name is unused.
+    NAMESPACE_INDEX = 7  # GROUP records of the sub-instructions by namespace.
+    MASK_INDEX = 8  # Instruction indices sorted by (mask, op code).
+
+
+def get_flags(obj, names: list) -> int:
+    return sum([1 << i for i, name in enumerate(names) if getattr(obj, name, False)])
+
+
+class InstructionDatabaseWriter:
+    """
+    Serializes the parsed instructions, sub-instructions and hardware registers into the binary database
+    which is read by InstructionDatabase.
+
+    Args:
+        normal_instructions: The normal instructions by name.
+        sub_instructions: The sub-instructions by name.
+        hardware_regs: The hardware registers by register class.
+    """
+
+    def __init__(self, normal_instructions: dict, sub_instructions: dict, hardware_regs: dict):
+        self.normal_instructions = normal_instructions
+        self.sub_instructions = sub_instructions
+        self.hardware_regs = hardware_regs
+        self.strings = bytearray(b"\0")
+        self.string_offsets: dict[str, int] = {"": 0}
+
+    def add_string(self, s: str) -> int:
+        if s not in self.string_offsets:
+            self.string_offsets[s] = len(self.strings)
+            self.strings += s.encode() + b"\0"
+        return self.string_offsets[s]
+
+    def pack_operand(self, op, syntax_offset: int, reg_classes: list) -> bytes:
+        is_reg = op.type == OperandType.REGISTER
+        masks = op.opcode_mask.masks if op.opcode_mask else []
+        return OPERAND.pack(
+            self.add_string(op.explicit_syntax),
+            self.add_string(op.llvm_type),
+            get_flags(op, OPERAND_FLAGS),
+            is_reg,
+            op.syntax_index,
+            0 if is_reg else op.scale,
+            op.opcode_mask.bits_total if op.opcode_mask else 0,
+            reg_classes.index(op.llvm_reg_class) if is_reg and op.llvm_reg_class in reg_classes else NO_REG_CLASS,
+            syntax_offset,
+            0 if is_reg else int(op.total_width),
+            bytes([v for mask in masks for v in mask]).ljust(8, b"\0"),
+        )
+
+    def write(self, path: str) -> None:
+        reg_classes = list(self.hardware_regs.keys())
+        namespaces = sorted({i.namespace.name for i in self.sub_instructions.values()})
+        # The sort is stable. So the instructions of an i-class are in the order the C decoder
+        # probes them: the core, HVX and system tables one after another.
+        features = list(InsnFeature)
+        normal = sorted(
+            self.normal_instructions.values(), key=lambda i: (i.encoding.get_i_class(), features.index(i.feature))
+        )
+        subs = sorted(self.sub_instructions.values(), key=lambda i: namespaces.index(i.namespace.name))
+        instructions = normal + subs
+
+        insn_data = bytearray()
+        op_data = bytearray()
+        op_count = 0
+        for instr in instructions:
+            # The operands ordered by their syntax index.
+            template_syntax, offsets = instr.get_syntax_operand_offsets()
+            insn_data += INSTRUCTION.pack(
+                self.add_string(instr.name),
+                self.add_string(instr.syntax),
+                self.add_string(template_syntax),
+                self.add_string(instr.type),
+                self.add_string(",".join(instr.implicit_uses)),
+                self.add_string(",".join(instr.implicit_defs)),
+                instr.encoding.instruction_mask,
+                instr.encoding.op_code,
+                get_flags(instr, INSN_FLAGS),
+                op_count,
+                len(offsets),
+                instr.is_sub_instruction,
+                namespaces.index(instr.namespace.name) if instr.is_sub_instruction else instr.encoding.get_i_class(),
+                features.index(instr.feature),
+            )
+            for op, syntax_offset in offsets:
+                op_data += self.pack_operand(op, syntax_offset, reg_classes)
+            op_count += len(offsets)
+
+        reg_data = bytearray()
+        class_data = bytearray()
+        reg_count = 0
+        for cls_index, reg_class in enumerate(reg_classes):
+            regs = sorted(self.hardware_regs[reg_class].values(), key=lambda r: r.hw_encoding)
+            class_data += GROUP.pack(self.add_string(reg_class), reg_count, len(regs))
+            hw_reg: HardwareRegister
+            for hw_reg in regs:
+                reg_data += REGISTER.pack(
+                    self.add_string(hw_reg.name),
+                    self.add_string(hw_reg.asm_name),
+                    self.add_string(",".join(hw_reg.alias)),
+                    cls_index,
+                    hw_reg.hw_encoding,
+                    hw_reg.size,
+                )
+            reg_count += len(regs)
+
+        by_name = sorted(range(len(instructions)), key=lambda i: instructions[i].name.encode())
+        by_mask = sorted(
+            range(len(instructions)),
+            key=lambda i: (instructions[i].encoding.instruction_mask, instructions[i].encoding.op_code, i),
+        )
+        i_class_data = bytearray()
+        for c in range(0x10):
+            members = [i for i, instr in enumerate(normal) if instr.encoding.get_i_class() == c]
+            i_class_data += GROUP.pack(0, members[0] if members else 0, len(members))
+        namespace_data = bytearray()
+        for ns in namespaces:
+            members = [len(normal) + i for i, instr in enumerate(subs) if instr.namespace.name == ns]
+            namespace_data += GROUP.pack(self.add_string(ns), members[0], len(members))
+
+        sections = {
+            Section.INSTRUCTIONS: (insn_data, len(instructions)),
+            Section.OPERANDS: (op_data, op_count),
+            Section.REGISTERS: (reg_data, reg_count),
+            Section.REG_CLASSES: (class_data, len(reg_classes)),
+            Section.NAME_INDEX: (b"".join([INDEX.pack(i) for i in by_name]), len(by_name)),
+            Section.I_CLASS_INDEX: (i_class_data, 0x10),
+            Section.NAMESPACE_INDEX: (namespace_data, len(namespaces)),
+            Section.MASK_INDEX: (b"".join([INDEX.pack(i) for i in by_mask]), len(by_mask)),
+        }
+        # All strings are added at this point.
+        sections[Section.STRINGS] = (self.strings, len(self.string_offsets))
+
+        out = bytearray(HEADER.pack(DB_MAGIC, DB_VERSION, len(Section)))
+        table_offset = len(out)
+        out += bytes(SECTION.size * len(Section))
+        for section in Section:
+            data, count = sections[section]
+            # Sections are 8 byte aligned.
+            out += bytes(-len(out) % 8)
+            SECTION.pack_into(out, table_offset + section * SECTION.size, len(out), len(data), count)
+            out += data
+        with open(path, "wb") as f:
+            f.write(out)
+
+
+class DbOperand(NamedTuple):
+    name: str
+    llvm_type: str
+    is_register: bool
+    syntax_index: int
+    flags: frozenset
+    scale: int
+    width: int
+    reg_class: str  # None for immediates
+    syntax_offset: int  # Where the operand is inserted into DbInstruction.template_syntax.
+    total_width: int  # Width of immediates including the bits of a constant extender. 0 for registers.
+    masks: list  # (bits, shift) tuples
+
+
+class DbInstruction(NamedTuple):
+    index: int
+    name: str
+    syntax: str
+    template_syntax: str  # The syntax without operands (register names in upper case).
+    type: str
+    implicit_uses: list
+    implicit_defs: list
+    mask: int
+    op_code: int
+    flags: frozenset
+    operands: list
+    is_sub_instruction: bool
+    i_class: int  # None for sub-instructions
+    namespace: str  # None for normal instructions
+    feature: InsnFeature
+
+
+class DbRegister(NamedTuple):
+    name: str
+    asm_name: str
+    alias: list
+    reg_class: str
+    hw_encoding: int
+    size: int
+
+
+class InstructionDatabase:
+    """
+    Read only access to an instruction database written by InstructionDatabaseWriter (LLVMImporter.py --export-db).
+    The file is memory mapped and the records are only decoded if they are queried.
+
+    Args:
+        path: Path of the database.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, section_count = HEADER.unpack_from(self.buf, 0)
+        if magic != DB_MAGIC or version != DB_VERSION or section_count < len(Section):
+            raise UnexpectedException(f"{path} is no instruction database of version {DB_VERSION}.")
+        # Section -> (offset, size, count)
+        self.sections = [SECTION.unpack_from(self.buf, HEADER.size + s * SECTION.size) for s in Section]
+        self.namespaces = [
+            self.get_group(Section.NAMESPACE_INDEX, i)[0] for i in range(self.count(Section.NAMESPACE_INDEX))
+        ]
+        self.reg_classes = [self.get_group(Section.REG_CLASSES, i)[0] for i in range(self.count(Section.REG_CLASSES))]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count(Section.INSTRUCTIONS)
+
+    def close(self) -> None:
+        self.buf.close()
+
+    def count(self, section: Section) -> int:
+        return self.sections[section][2]
+
+    def record(self, section: Section, layout: struct.Struct, index: int) -> tuple:
+        return layout.unpack_from(self.buf, self.sections[section][0] + index * layout.size)
+
+    def string(self, offset: int) -> str:
+        start = self.sections[Section.STRINGS][0] + offset
+        return self.buf[start : self.buf.find(b"\0", start)].decode()
+
+    def get_group(self, section: Section, index: int) -> tuple:
+        """Returns (name, first, count) of a GROUP record."""
+        name, first, count = self.record(section, GROUP, index)
+        return self.string(name), first, count
+
+    def get_operand(self, index: int) -> DbOperand:
+        name, llvm_type, flags, is_reg, syntax_index, scale, width, reg_class, syntax_offset, total_width, masks = (
+            self.record(Section.OPERANDS, OPERAND, index)
+        )
+        return DbOperand(
+            self.string(name),
+            self.string(llvm_type),
+            bool(is_reg),
+            syntax_index,
+            frozenset([f for i, f in enumerate(OPERAND_FLAGS) if flags & (1 << i)]),
+            scale,
+            width,
+            self.reg_classes[reg_class] if reg_class != NO_REG_CLASS else None,
+            syntax_offset,
+            total_width,
+            [(masks[i], masks[i + 1]) for i in range(0, len(masks), 2) if masks[i]],
+        )
+
+    def instruction(self, index: int) -> DbInstruction:
+        name, syntax, tpl_syntax, typ, uses, defs, mask, op, flags, first_op, op_count, is_sub, group, feature = (
+            self.record(Section.INSTRUCTIONS, INSTRUCTION, index)
+        )
+        return DbInstruction(
+            index,
+            self.string(name),
+            self.string(syntax),
+            self.string(tpl_syntax),
+            self.string(typ),
+            [r for r in self.string(uses).split(",") if r],
+            [r for r in self.string(defs).split(",") if r],
+            mask,
+            op,
+            frozenset([f for i, f in enumerate(INSN_FLAGS) if flags & (1 << i)]),
+            [self.get_operand(first_op + i) for i in range(op_count)],
+            bool(is_sub),
+            None if is_sub else group,
+            self.namespaces[group] if is_sub else None,
+            list(InsnFeature)[feature],
+        )
+
+    def index_entry(self, section: Section, i: int) -> int:
+        return self.record(section, INDEX, i)[0]
+
+    def find(self, name: str) -> DbInstruction:
+        """Returns the instruction with the given name or None."""
+        lo, hi = 0, self.count(Section.NAME_INDEX)
+        key = name.encode()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            index = self.index_entry(Section.NAME_INDEX, mid)
+            mid_name = self.string(self.record(Section.INSTRUCTIONS, INSTRUCTION, index)[0]).encode()
+            if mid_name == key:
+                return self.instruction(index)
+            elif mid_name < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def by_i_class(self, i_class: int) -> list:
+        """Returns the normal instructions of an i-class in decoding order."""
+        _, first, count = self.get_group(Section.I_CLASS_INDEX, i_class)
+        return [self.instruction(i) for i in range(first, first + count)]
+
+    def by_namespace(self, namespace: str) -> list:
+        """Returns the sub-instructions of a namespace (A, L1, L2, S1, S2)."""
+        if namespace not in self.namespaces:
+            return []
+        _, first, count = self.get_group(Section.NAMESPACE_INDEX, self.namespaces.index(namespace))
+        return [self.instruction(i) for i in range(first, first + count)]
+
+    def by_mask(self, mask: int) -> list:
+        """Returns all instructions with the given encoding mask."""
+        entries = self.count(Section.MASK_INDEX)
+
+        def mask_of(i: int) -> int:
+            return self.record(Section.INSTRUCTIONS, INSTRUCTION, self.index_entry(Section.MASK_INDEX, i))[6]
+
+        lo, hi = 0, entries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mask_of(mid) < mask:
+                lo = mid + 1
+            else:
+                hi = mid
+        result = []
+        while lo < entries and mask_of(lo) == mask:
+            result.append(self.instruction(self.index_entry(Section.MASK_INDEX, lo)))
+            lo += 1
+        return result
+
+    def match(self, word: int) -> list:
+        """Returns the normal instructions which match the instruction word in the order the C decoder probes them.
+        Each feature table of an i-class ends at invalid_decode (id 0), so the instructions behind it are never
+        probed and not returned. The first one of an enabled feature is decoded.
+        """
+        _, first, count = self.get_group(Section.I_CLASS_INDEX, (word >> 28) & 0xF)
+        result = []
+        terminated = set()
+        for i in range(first, first + count):
+            record = self.record(Section.INSTRUCTIONS, INSTRUCTION, i)
+            name, mask, op, feature = record[0], record[6], record[7], record[13]
+            if self.string(name) == "invalid_decode":
+                terminated.add(feature)
+            if feature not in terminated and (word & mask) == op:
+                result.append(self.instruction(i))
+        return result
+
+    def registers(self, reg_class: str = None) -> list:
+        """Returns the registers of a class ordered by their hardware encoding. Or all registers."""
+        classes = [reg_class] if reg_class else self.reg_classes
+        regs = []
+        for cls in classes:
+            if cls not in self.reg_classes:
+                continue
+            _, first, count = self.get_group(Section.REG_CLASSES, self.reg_classes.index(cls))
+            for i in range(first, first + count):
+                name, asm_name, alias, _, hw_encoding, size = self.record(Section.REGISTERS, REGISTER, i)
+                alias = [a for a in self.string(alias).split(",") if a]
+                regs.append(DbRegister(self.string(name), self.string(asm_name), alias, cls, hw_encoding, size))
+        return regs
@@ -2,6 +2,8 @@
 #
 # SPDX-License-Identifier: LGPL-3.0-only
 
+import sys
+
 from bitarray import bitarray
 
 from helperFunctions import bitarray_to_uint, log, LogLevel
@@ -12,9 +14,11 @@ class InstructionEncoding:
     """
     Represents the encoding of an instruction.
 
-    Attributes:
+    Args:
         llvm_encoding: The encoding of an instruction, as it is found in an instruction object of
-        the llvm-tblgen generated json file.
+        the llvm-tblgen generated json file. It is not kept after parsing.
+
+    Attributes:
         docs_mask: The mask as it can be found in the Programmers Reference Manual.
         llvm_operand_names: A list of llvm type operand names which are encoded in the instruction.
         operand_masks: Masks of all operands encoded in the instruction.
@@ -29,7 +33,6 @@ class InstructionEncoding:
         "llvm_operand_names",
         "operand_masks",
         "instruction_mask",
-        "llvm_encoding",
         "op_code",
         "num_representation",
         "parse_bits_mask",
@@ -42,13 +45,12 @@ class InstructionEncoding:
         self.op_code: int = 0
         self.parse_bits_mask: int = 0
         self.docs_mask = ""
-        self.llvm_encoding = llvm_encoding
         # The first 13bit of the encoding as 13bit unsigned int. Variable fields are interpreted as 0.
         self.num_representation = 0
 
-        self.parse_encoding()
+        self.parse_encoding(llvm_encoding)
 
-    def parse_encoding(self):
+    def parse_encoding(self, llvm_encoding: list):
         """Parses each bit in the LLVM encoding and extracts masks and operands from those bits."""
 
         instruction_mask = bitarray(HexagonArchInfo.INSTRUCTION_LENGTH, endian="little")
@@ -59,7 +61,7 @@ class InstructionEncoding:
         p_bits_mask.setall(0)
 
         for i in range(0, 32):
-            bit = self.llvm_encoding[i]
+            bit = llvm_encoding[i]
             # Instruction bits
             if bit == 0 or bit == 1:
                 if i < 13:  # Number representation for SubInstruction comparison (Duplex generation).
@@ -86,7 +88,7 @@ class InstructionEncoding:
                 self.docs_mask = "-" + self.docs_mask
             # Variable bits encoding a register or immediate
             else:
-                op_name = bit["var"]
+                op_name = sys.intern(bit["var"])
                 # Not yet parsed operand in encoding found. Create new mask.
                 if op_name not in self.llvm_operand_names:
                     self.llvm_operand_names.append(op_name)
@@ -101,8 +103,14 @@ class InstructionEncoding:
         self.op_code = bitarray_to_uint(op_code, endian="little")
         self.parse_bits_mask = bitarray_to_uint(p_bits_mask, endian="little")
 
-        log("Added encoding: {} with operands: {}".format(self.docs_mask, self.llvm_operand_names), LogLevel.VERBOSE)
+        log(
+            "Added encoding: {} with operands: {}",
+            LogLevel.VERBOSE,
+            self.docs_mask,
+            self.llvm_operand_names,
+            subsystem="encoding",
+        )
 
     def get_i_class(self) -> int:
-        i_class = self.llvm_encoding[28:32]
-        return i_class[3] << 3 | i_class[2] << 2 | i_class[1] << 1 | i_class[0]
+        # Bit 31:28. Those are never variable, so the op code holds them.
+        return (self.op_code >> 28) & 0xF
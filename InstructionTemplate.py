@@ -2,12 +2,13 @@
 #
 # SPDX-License-Identifier: LGPL-3.0-only
 
-from copy import deepcopy
-from enum import IntFlag
+from enum import Enum, IntFlag
 import re
+import sys
 
 import HexagonArchInfo
 import PluginInfo
+from AsmString import AsmString, TokenType
 from Immediate import Immediate
 from ImplementationException import ImplementationException
 from InstructionEncoding import InstructionEncoding
@@ -18,6 +19,43 @@ from helperFunctions import log, LogLevel
 
 PARSE_BITS_MASK_CONST = 0xC000  # currently, this is the same for all instructions, so no need to store it explicitly
 
+# RIZIN SPECIFIC
+# LLVM addrMode -> HexAddrMode. Absolute GP relative addressing is split off by get_c_addr_mode().
+ADDR_MODES = {
+    "NoAddrMode": "HEX_NO_ADDR_MODE",
+    "Absolute": "HEX_ADDR_MODE_ABS",
+    "AbsoluteSet": "HEX_ADDR_MODE_ABS_SET",
+    "BaseImmOffset": "HEX_ADDR_MODE_BASE_IMM",
+    "BaseLongOffset": "HEX_ADDR_MODE_BASE_LONG",
+    "BaseRegOffset": "HEX_ADDR_MODE_BASE_REG",
+    "PostInc": "HEX_ADDR_MODE_POST_INC",
+}
+# LLVM accessSize -> Number of bytes. HVX vectors are accessed in 128 byte mode.
+ACCESS_SIZES = {
+    "NoMemAccess": 0,
+    "ByteAccess": 1,
+    "HalfWordAccess": 2,
+    "WordAccess": 4,
+    "DoubleWordAccess": 8,
+    "HVXVectorAccess": 128,
+}
+# Addressing modes whose address is the base register plus something.
+BASE_REG_ADDR_MODES = ["BaseImmOffset", "BaseRegOffset", "PostInc"]
+# Addressing modes with an immediate offset or absolute address.
+IMM_OFFSET_ADDR_MODES = ["BaseImmOffset", "BaseLongOffset", "Absolute", "AbsoluteSet"]
+
+
+# RIZIN SPECIFIC
+class InsnFeature(Enum):
+    """Instruction set extensions. Each has its own template tables (templates_<value>_0x<i-class>),
+    so the disassembler can skip disabled ones. The order is the decoding order.
+    Must match HexFeature in handwritten/hexagon_h/typedefs.h
+    """
+
+    CORE = "normal"
+    HVX = "hvx"
+    SYSTEM = "system"
+
 
 class LoopMembership(IntFlag):
     HEX_NO_LOOP = 0
@@ -28,7 +66,69 @@ class LoopMembership(IntFlag):
 
 
 class InstructionTemplate:
-    """Fields, flags and methods which are shared by Duplex-, Sub- and normal instructions."""
+    """Fields, flags and methods which are shared by Duplex-, Sub- and normal instructions.
+
+    The raw LLVM fields (llvm_instr, llvm_*_operands, constraints) are only needed while parsing.
+    They are released with release_llvm_record() once the operands are parsed.
+    """
+
+    __slots__ = [
+        # Meta info
+        "llvm_instr",
+        "name",
+        "is_vector",
+        "plugin_name",
+        "type",
+        "constraints",
+        "has_jump_target",
+        "is_call",
+        "is_branch",
+        "is_terminator",
+        "is_return",
+        "is_pause",
+        "is_trap",
+        # Syntax and encoding
+        "encoding",
+        "llvm_syntax",
+        "asm_string",
+        "syntax",
+        # Packet and Duplex
+        "is_solo",
+        "is_sub_instruction",
+        # Operands
+        "llvm_in_operands",
+        "llvm_out_operands",
+        "llvm_in_out_operands",
+        "implicit_uses",
+        "implicit_defs",
+        "llvm_filtered_operands",
+        "operands",
+        "operand_indices",
+        "num_operands",
+        "new_operand_index",
+        "ext_operand_index",
+        # Immediate operands
+        "has_extendable_imm",
+        "must_be_extended",
+        "extendable_alignment",
+        # Register operands
+        "has_new_non_predicate",
+        "is_predicated",
+        "is_pred_new",
+        "is_pred_false",
+        "is_pred_true",
+        # Special
+        "is_imm_ext",
+        "is_endloop",
+        "is_loop",
+        "is_loop_begin",
+        "loop_member",
+        # Execution specific
+        "addr_mode",
+        "access_size",
+        "may_load",
+        "may_store",
+    ]
 
     def __init__(self, llvm_instruction):
         # Meta info
@@ -36,7 +136,7 @@ class InstructionTemplate:
         self.name: str = self.llvm_instr["!name"]
         self.is_vector = self.name[0] == "V"
         self.plugin_name: str = PluginInfo.INSTR_ENUM_PREFIX + self.name.upper()
-        self.type: str = self.llvm_instr["Type"]["def"]
+        self.type: str = sys.intern(self.llvm_instr["Type"]["def"])
         self.constraints = self.llvm_instr["Constraints"]
         self.has_jump_target = self.name[:2] == "J2" or self.name[:2] == "J4"
         if self.name[0] == "J" and not self.has_jump_target:
@@ -55,6 +155,7 @@ class InstructionTemplate:
         # Syntax and encoding
         self.encoding: InstructionEncoding = None
         self.llvm_syntax: str = None
+        self.asm_string: AsmString = None
         self.syntax: str = None
 
         # Packet and Duplex
@@ -68,23 +169,23 @@ class InstructionTemplate:
         self.llvm_out_operands: list = self.llvm_instr["OutOperandList"]["args"]
         # Order matters!
         self.llvm_in_out_operands: list = self.llvm_out_operands + self.llvm_in_operands
+        # Registers which are read or written but are not encoded.
+        self.implicit_uses: list = [sys.intern(r["def"]) for r in self.llvm_instr["Uses"]]
+        self.implicit_defs: list = [sys.intern(r["def"]) for r in self.llvm_instr["Defs"]]
         self.llvm_filtered_operands: list = list()
         self.operands = dict()
         self.operand_indices = dict()
         self.num_operands = 999
-        self.llvm_operands = list()
         self.new_operand_index = 999
         self.ext_operand_index = 999
 
         # Immediate operands
         self.has_extendable_imm: bool = None
         self.must_be_extended: bool = None
-        self.llvm_ext_operand_index: bool = None
         self.extendable_alignment: bool = None
 
         # Register operands
         self.has_new_non_predicate: bool = None
-        self.llvm_new_operand_index: bool = None
         self.is_predicated: bool = False
         self.is_pred_new: bool = False
         self.is_pred_false: bool = False  # Duplex can have both, true and false predicates.
@@ -99,15 +200,26 @@ class InstructionTemplate:
 
         # Execution specific (Interesting for decompiler plugin)
         # The address mode of load/store instructions
-        self.addr_mode = None
+        self.addr_mode: str = sys.intern(self.llvm_instr["addrMode"]["def"])
         # The access size of the load/store instruction
-        self.access_size = None
+        self.access_size: str = sys.intern(self.llvm_instr["accessSize"]["def"])
+        self.may_load: bool = self.llvm_instr["mayLoad"] == 1
+        self.may_store: bool = self.llvm_instr["mayStore"] == 1
 
     def assign_syntax_indices_to_operands(self) -> None:
         pass
 
+    def release_llvm_record(self) -> None:
+        """Drops the references to the LLVM instruction record. Only call it after the operands are parsed."""
+        self.llvm_instr = None
+        self.constraints = None
+        self.llvm_in_operands = None
+        self.llvm_out_operands = None
+        self.llvm_in_out_operands = None
+        self.llvm_filtered_operands = None
+
     @staticmethod
-    def get_syntax_operand_indices(llvm_syntax: str, llvm_operands: list) -> dict:
+    def get_syntax_operand_indices(asm_string: AsmString, llvm_operands: list) -> dict:
         """Gives the indices of the operands in the syntax, counted from left to right.
 
             LLVM indexing starts counting from the out-operands to the in-operands json objects.
@@ -118,7 +230,7 @@ class InstructionTemplate:
             See the test case for: V6_vS32b_nt_new_pred_ppu
 
         Args:
-            llvm_syntax: The llvm syntax string.
+            asm_string: The tokenized llvm syntax.
             llvm_operands: List of operands from the llvm In/OutOperand list.
 
         Returns: Dictionary of {Reg_name : index} entries.
@@ -127,31 +239,20 @@ class InstructionTemplate:
         indices = dict()
         for op in llvm_operands:
             llvm_op_name = op[1]
-            if llvm_op_name not in indices and llvm_op_name in llvm_syntax:
-                indices[llvm_op_name] = re.search(r"\b" + llvm_op_name + r"\b", llvm_syntax).start()
-            elif llvm_op_name in indices:
+            if llvm_op_name in indices:
                 raise UnexpectedException(
-                    "Two operands with the same name given.\nSyntax {}, op: {}".format(llvm_syntax, llvm_op_name)
+                    "Two operands with the same name given.\nSyntax {}, op: {}".format(asm_string, llvm_op_name)
                 )
+            elif asm_string.has_operand(llvm_op_name):
+                indices[llvm_op_name] = asm_string.get_operand_index(llvm_op_name)
 
-        sorted_ops = dict(sorted(indices.items(), key=lambda item: item[1]))  # Sort by value
-        for i, operand_name in enumerate(sorted_ops):
-            indices[operand_name] = i
-
-        return indices
+        sorted_ops = sorted(indices, key=lambda name: indices[name])
+        return {operand_name: i for i, operand_name in enumerate(sorted_ops)}
 
     @staticmethod
-    def remove_invisible_in_out_regs(llvm_syntax: str, llvm_ops: list) -> list:
-        """Removes registers from the llvm_ops list which does not appear in the syntax."""
-        del_indices = list()
-        for i, op in enumerate(llvm_ops):
-            name = op[1]
-            if name not in llvm_syntax:
-                del_indices.append(i)
-
-        for n, i in enumerate(del_indices):
-            del llvm_ops[i - n]
-        return llvm_ops
+    def remove_invisible_in_out_regs(asm_string: AsmString, llvm_ops: list) -> list:
+        """Returns the llvm_ops without the registers which do not appear in the syntax."""
+        return [op for op in llvm_ops if asm_string.has_operand(op[1])]
 
     def has_imm_jmp_target(self) -> bool:
         """Returns true if the call or jump uses a immediate value to determine the target address. Otherwise false"""
@@ -182,20 +283,18 @@ class InstructionTemplate:
     def parse_instruction(self) -> None:
         """Parses all operands of the instruction which are encoded."""
 
-        all_ops = deepcopy(self.llvm_in_out_operands)
-
-        self.llvm_filtered_operands = self.remove_invisible_in_out_regs(self.llvm_syntax, all_ops)
-        self.operand_indices = self.get_syntax_operand_indices(self.llvm_syntax, self.llvm_filtered_operands)
+        self.llvm_filtered_operands = self.remove_invisible_in_out_regs(self.asm_string, self.llvm_in_out_operands)
+        self.operand_indices = self.get_syntax_operand_indices(self.asm_string, self.llvm_filtered_operands)
 
         # Update syntax indices.
         if self.has_new_non_predicate:
             op_name = self.llvm_in_out_operands[self.new_operand_index][1]
             self.new_operand_index = self.operand_indices[op_name]
-            log("{}\n new: {}".format(self.llvm_syntax, self.new_operand_index), LogLevel.VERBOSE)
+            log("{}\n new: {}", LogLevel.VERBOSE, self.llvm_syntax, self.new_operand_index, subsystem="instruction")
         if self.has_extendable_imm:
             op_name = self.llvm_in_out_operands[self.ext_operand_index][1]
             self.ext_operand_index = self.operand_indices[op_name]
-            log("{}\n ext: {}".format(self.llvm_syntax, self.ext_operand_index), LogLevel.VERBOSE)
+            log("{}\n ext: {}", LogLevel.VERBOSE, self.llvm_syntax, self.ext_operand_index, subsystem="instruction")
 
         if len(self.llvm_filtered_operands) > PluginInfo.MAX_OPERANDS:
             warning = "{} instruction struct can only hold {} operands. This" " instruction has {} operands.".format(
@@ -206,8 +305,8 @@ class InstructionTemplate:
             raise ImplementationException(warning)
 
         for in_out_operand in self.llvm_filtered_operands:
-            op_name = in_out_operand[1]
-            op_type = in_out_operand[0]["def"]
+            op_name = sys.intern(in_out_operand[1])
+            op_type = sys.intern(in_out_operand[0]["def"])
             index = self.operand_indices[op_name]
 
             # Parse register operand
@@ -263,8 +362,116 @@ class InstructionTemplate:
 
             self.operands[op_name] = operand
 
-    def get_template_in_c(self) -> str:
-        """Returns an initializer for the HexInsnTemplate struct representing this instruction"""
+    # RIZIN SPECIFIC
+    @property
+    def feature(self) -> InsnFeature:
+        if self.name.startswith("V6_"):
+            return InsnFeature.HVX
+        elif self.name.startswith("IMPORTED_"):  # See import/instructions
+            return InsnFeature.SYSTEM
+        return InsnFeature.CORE
+
+    @property
+    def has_single_imm_operand(self) -> bool:
+        """True if the instruction has exactly one immediate operand. This one is always treated as extendable."""
+        return 1 == len([op for op in self.operands.values() if op.type == OperandType.IMMEDIATE])
+
+    def get_syntax_operand_offsets(self) -> tuple:
+        """Cuts the operands out of the syntax and determines where they have to be inserted again.
+
+        Returns: The syntax without operands (register names in upper case) and a list of (operand, offset) tuples.
+        The list is ordered by the syntax index of the operands.
+        """
+        offsets = []
+        syntax = ""
+        for token in self.asm_string.tokens:
+            op = self.operands.get(token.name) if token.type == TokenType.OPERAND else None
+            # Only the first appearance of an operand is cut out. Later ones stay in the syntax.
+            if op is not None and op.syntax_index == len(offsets):
+                offsets.append((op, len(syntax)))
+            elif token.type == TokenType.WORD:
+                syntax += self.register_name_to_upper(token.text)
+            else:
+                syntax += token.text
+        if len(offsets) != len(self.operands):
+            raise ImplementationException(f"Not all operands of {self.name} found in syntax {self.asm_string}")
+        return syntax, offsets
+
+    # RIZIN SPECIFIC
+    @staticmethod
+    def get_out_operand_index(operands: list):
+        """Returns the index of the first output register in the given operands or None if there is none.
+        The .new operand of a consumer in the same packet refers to this register.
+        """
+        for i, op in enumerate(operands):
+            if op.type == OperandType.REGISTER and op.is_out_operand:
+                return i
+        return None
+
+    # RIZIN SPECIFIC
+    def get_mem_operand_indices(self, syntax: str, offsets: list) -> tuple:
+        """Returns the indices of the base register and of the offset immediate of the memory operand.
+
+        Args:
+            syntax: The syntax without operands.
+            offsets: List of (operand, syntax offset) tuples. Both as returned by get_syntax_operand_offsets().
+
+        Returns: Tuple of (base index, offset index). An index is None if the addressing mode has no such operand
+        or it is not encoded (like R29 of SS2_storew_sp).
+        """
+        mem = re.search(r"mem\w*\(", syntax)
+        if self.addr_mode == "NoAddrMode" or not mem:
+            return None, None
+        # Find the closing parenthesis. Circular addressing has nested ones: memw(Rx++#s4:2:circ(Mu))
+        depth = 0
+        end = len(syntax)
+        for i in range(mem.end() - 1, len(syntax)):
+            depth += {"(": 1, ")": -1}.get(syntax[i], 0)
+            if depth == 0:
+                end = i
+                break
+        inside = [(i, op) for i, (op, off) in enumerate(offsets) if mem.end() <= off <= end]
+        regs = [i for i, op in inside if op.type == OperandType.REGISTER]
+        imms = [i for i, op in inside if op.type == OperandType.IMMEDIATE]
+        base = regs[0] if regs and self.addr_mode in BASE_REG_ADDR_MODES else None
+        offset = imms[-1] if imms and self.addr_mode in IMM_OFFSET_ADDR_MODES else None
+        return base, offset
+
+    # RIZIN SPECIFIC
+    def get_c_addr_mode(self) -> str:
+        if self.addr_mode not in ADDR_MODES:
+            raise ImplementationException(f"Unknown addressing mode {self.addr_mode} of {self.name}")
+        if self.addr_mode == "Absolute" and "GP" in self.implicit_uses:
+            return "HEX_ADDR_MODE_GP_REL"
+        return ADDR_MODES[self.addr_mode]
+
+    # RIZIN SPECIFIC
+    def get_mem_access_in_c(self, syntax: str, offsets: list) -> str:
+        """Returns an initializer for the HexMemAccess struct or an empty string if the instruction accesses no
+        memory.
+        """
+        if self.access_size not in ACCESS_SIZES:
+            raise ImplementationException(f"Unknown access size {self.access_size} of {self.name}")
+        size = ACCESS_SIZES[self.access_size]
+        if size == 0:
+            return ""
+        direction = []
+        if self.may_load:
+            direction.append("RZ_ANALYSIS_OP_DIR_READ")
+        if self.may_store:
+            direction.append("RZ_ANALYSIS_OP_DIR_WRITE")
+        base, offset = self.get_mem_operand_indices(syntax, offsets)
+        return (
+            f".mem = {{ .mode = {self.get_c_addr_mode()}, .size = {size}, "
+            f".direction = {' | '.join(direction) if direction else 0}, "
+            f".base = {'HEX_MEM_NO_OP' if base is None else base}, "
+            f".offset = {'HEX_MEM_NO_OP' if offset is None else offset} }},\n"
+        )
+
+    def get_template_in_c(self, reg_sets=None) -> str:
+        """Returns an initializer for the HexInsnTemplate struct representing this instruction.
+        If reg_sets (RegisterSets) is given, the indices of the implicit register sets are set as well.
+        """
         code = "{\n"
         code += f"// {self.encoding.docs_mask} | {self.syntax}\n"
         code += f".encoding = {{ .mask = 0x{self.encoding.instruction_mask:x}, .op = 0x{self.encoding.op_code:x} }},\n"
@@ -274,32 +481,36 @@ class InstructionTemplate:
                 f"Unknown parse_bits_mask {self.encoding.parse_bits_mask} != {PARSE_BITS_MASK_CONST}"
             )
         op_templates = []
-        last_syntax_off = 0
-        syntax = self.syntax
-        only_one_imm_op = 1 == len([op for op in self.operands.values() if op.type == OperandType.IMMEDIATE])
-        for op in sorted(self.operands.values(), key=lambda item: item.syntax_index):
-            if op.type == OperandType.IMMEDIATE and op.is_constant:
-                pattern = r"[nN]1"
-            else:
-                pattern = op.explicit_syntax
-            inject = re.search(pattern, syntax)
-            if inject is None:
-                raise ImplementationException(f"Operand pattern {pattern} not found in syntax {syntax}")
-            elif inject.start() < last_syntax_off:
-                raise ImplementationException(f"Operand pattern {pattern} in syntax {syntax} out of order")
-            syntax_off = inject.start()
-            syntax = syntax[: inject.start()] + syntax[inject.end() :]
-            last_syntax_off = syntax_off
+        syntax, offsets = self.get_syntax_operand_offsets()
+        only_one_imm_op = self.has_single_imm_operand
+        for op, syntax_off in offsets:
             tpl = f"{{ {op.c_template(force_extendable=only_one_imm_op)}, .syntax = {syntax_off} }}"
             op_templates.append(tpl)
-        syntax = self.register_names_to_upper(syntax)
         if len(op_templates) != 0:
             ops_code = ",\n".join(op_templates)
             code += f".ops = {{\n{ops_code}, }},\n"
+        out_op = self.get_out_operand_index([op for op, _ in offsets])
+        code += f".out_op = {'HEX_OP_TEMPLATE_NO_OUT' if out_op is None else out_op},\n"
+        if reg_sets:
+            implicit_read = reg_sets.get_implicit_index(self.implicit_uses)
+            implicit_write = reg_sets.get_implicit_index(self.implicit_defs)
+            if implicit_read != 0:
+                code += f".implicit_read = {implicit_read},\n"
+            if implicit_write != 0:
+                code += f".implicit_write = {implicit_write},\n"
+        code += self.get_mem_access_in_c(syntax, offsets)
         code += f".pred = {self.get_predicate()},"
         code += f".cond = {self.get_rz_cond_type()},\n"
         code += f".type = {self.c_rz_op_type},\n"
         code += f'.syntax = "{syntax}",\n'
+        flags = self.get_template_flags_in_c()
+        if flags != "0":
+            code += f".flags = {flags},\n"
+        code += "}"
+        return code
+
+    def get_template_flags_in_c(self) -> str:
+        """Returns the HexInsnTemplateFlag bits of this instruction as C expression."""
         flags = []
         if self.is_call:
             flags.append("HEX_INSN_TEMPLATE_FLAG_CALL")
@@ -313,10 +524,25 @@ class InstructionTemplate:
             flags.append("HEX_INSN_TEMPLATE_FLAG_LOOP_0")
         elif self.loop_member == LoopMembership.HEX_LOOP_1:
             flags.append("HEX_INSN_TEMPLATE_FLAG_LOOP_1")
-        if flags != []:
-            flags = " | ".join(flags)
-            code += f".flags = {flags},\n"
-        code += "}"
+        return " | ".join(flags) if flags else "0"
+
+    # RIZIN SPECIFIC
+    def get_decode_ops_in_c(self) -> str:
+        """Returns the body of the specialized operand decoder of this instruction.
+        It decodes the operands like hex_decode_ops() does with the template of get_template_in_c().
+        But all masks, shifts, widths and register classes are constants.
+        """
+        syntax, offsets = self.get_syntax_operand_offsets()
+        only_one_imm_op = self.has_single_imm_operand
+        code = f"hi->op_count = {len(offsets)};\n"
+        syntax_cur = 0
+        for i, (op, syntax_off) in enumerate(offsets):
+            if syntax_cur < syntax_off <= len(syntax):
+                code += f"rz_strbuf_append_n(sb, tpl->syntax + {syntax_cur}, {syntax_off - syntax_cur});\n"
+                syntax_cur = syntax_off
+            code += op.c_decode(i, force_extendable=only_one_imm_op)
+        if len(syntax) > syntax_cur:
+            code += f"rz_strbuf_append_n(sb, tpl->syntax + {syntax_cur}, {len(syntax) - syntax_cur});\n"
         return code
 
     # RIZIN SPECIFIC
@@ -384,22 +610,16 @@ class InstructionTemplate:
             elif self.is_branch or self.is_loop:
                 # Immediate and register jump
                 return "RZ_ANALYSIS_OP_TYPE_JMP" if self.has_imm_jmp_target() else "RZ_ANALYSIS_OP_TYPE_RJMP"
-        log(
-            "Instruction: {} has no instr. type assigned to it yet.".format(self.name),
-            LogLevel.VERBOSE,
-        )
+        log("Instruction: {} has no instr. type assigned to it yet.", LogLevel.VERBOSE, self.name, subsystem="template")
         return "RZ_ANALYSIS_OP_TYPE_NULL"
 
     # RIZIN SPECIFIC
     @staticmethod
-    def register_names_to_upper(mnemonic: str) -> str:
+    def register_name_to_upper(word: str) -> str:
         """The syntax can contain lower case register names. Here we convert them to upper case to enable syntax
         highlighting in rizin.
         """
-        for reg_name in HexagonArchInfo.ALL_REG_NAMES:
-            if re.search(r"[^a-zA-Z]" + reg_name.lower(), mnemonic) or mnemonic.startswith(reg_name.lower()):
-                mnemonic = re.sub(reg_name.lower(), reg_name.upper(), mnemonic)
-        return mnemonic
+        return word.upper() if word.upper() in HexagonArchInfo.ALL_REG_NAMES else word
 
     # RIZIN SPECIFIC
     def get_pkt_info_code(self) -> str:
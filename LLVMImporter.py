@@ -14,10 +14,22 @@ import argparse
 from HardwareRegister import HardwareRegister
 from ImplementationException import ImplementationException
 from Instruction import Instruction
+from InstructionDatabase import InstructionDatabaseWriter
+from Operand import OperandType
+from Register import Register
+from RegisterSets import RegisterSets
+from AssemblerIndex import AssemblerIndex
 from SubInstruction import SubInstruction
+from TblgenCache import TblgenCache
+from TemplateOverlap import OverlapIndex
 from helperFunctions import (
     log,
     LogLevel,
+    LOG_LEVEL,
+    LOG_SUBSYSTEMS,
+    parse_log_arg,
+    set_log_level,
+    set_log_json_sink,
     get_generation_warning_c_code,
     unfold_llvm_sequence,
     get_include_guard,
@@ -30,7 +42,10 @@ from helperFunctions import (
 )
 import PluginInfo
 import HexagonArchInfo
-from InstructionTemplate import PARSE_BITS_MASK_CONST
+from InstructionTemplate import PARSE_BITS_MASK_CONST, InsnFeature, InstructionTemplate
+
+# RIZIN SPECIFIC
+DECODE_BACKENDS = ["table", "specialized"]
 
 
 class LLVMImporter:
@@ -44,9 +59,42 @@ class LLVMImporter:
     sub_instructions = dict()
     hardware_regs = dict()
 
-    def __init__(self, build_json: bool, test_mode=False):
+    def __init__(
+        self,
+        build_json: bool,
+        test_mode=False,
+        split_disas=False,
+        tblgen="llvm-tblgen",
+        use_tblgen_cache=True,
+        decode_backend="table",
+        export_db=None,
+        overlap_dir=None,
+    ):
+        # The instructions and registers of each object. Otherwise all objects (e.g. of the tests) share them.
+        self.llvm_instructions = dict()
+        self.normal_instruction_names = list()
+        self.normal_instructions = dict()
+        self.sub_instruction_names = list()
+        self.sub_instructions = dict()
+        self.hardware_regs = dict()
         self.sub_namespaces = set()
         self.test_mode = test_mode
+        # The tblgen command and whether a cached Hexagon.json of the same LLVM sources can be used.
+        self.tblgen = tblgen
+        self.use_tblgen_cache = use_tblgen_cache
+        # RIZIN SPECIFIC
+        # Write each template table of the disassembler into its own compilation unit.
+        self.split_disas = split_disas
+        # RIZIN SPECIFIC
+        # "table": The operands are decoded by interpreting the operand templates (smaller).
+        # "specialized": Each instruction gets its own operand decoder with constant masks and shifts (faster).
+        if decode_backend not in DECODE_BACKENDS:
+            raise ImplementationException(f"Unknown decode backend {decode_backend}. Use one of {DECODE_BACKENDS}")
+        self.decode_backend = decode_backend
+        # Path of the binary instruction database (InstructionDatabase.py) or None.
+        self.export_db = export_db
+        # Directory of the template overlap index and report or None.
+        self.overlap_dir = overlap_dir
         if self.test_mode:
             self.hexagon_target_json_path = "../Hexagon.json"
         else:
@@ -74,6 +122,9 @@ class LLVMImporter:
         HexagonArchInfo.CC_REGS = self.get_cc_regs()
 
         self.unchanged_files = []  # Src files which had no changes after generation.
+        self.written_files = []  # Src files written in this run.
+        # License and timestamp header of all written src files.
+        self.src_header = get_license() + "\n" + get_generation_timestamp(self.config) + "\n"
 
         # RIZIN SPECIFIC
         # Name of the function which parses the encoded register index bits.
@@ -81,14 +132,28 @@ class LLVMImporter:
 
         self.parse_hardware_registers()
         self.parse_instructions()
-        self.check_insn_syntax_length()
+        self.reg_sets = RegisterSets(self.hardware_regs, self.hexArch)
+        self.asm_index = AssemblerIndex(self.hardware_regs)
+        self.overlap_index = OverlapIndex(self.normal_instructions, self.sub_instructions)
         if not test_mode:
+            # The tests still need the LLVM records.
+            self.release_llvm_records()
+            if self.overlap_dir:
+                self.write_overlap_index(self.overlap_dir)
+            if self.export_db:
+                self.write_instruction_db(self.export_db)
             self.generate_rizin_code()
             self.generate_decompiler_code()
-            self.add_license_info_header()
             self.apply_clang_format()
         log("Done")
 
+    def release_llvm_records(self) -> None:
+        """Drops the parsed Hexagon.json. Everything the code generation needs is in the instruction
+        and register objects at this point.
+        """
+        self.hexArch = dict()
+        self.llvm_instructions.clear()
+
     def get_import_config(self):
         """Loads the importer configuration from a file and writes it to self.config"""
         cwd = os.getcwd()
@@ -169,18 +234,15 @@ class LLVMImporter:
 
         log("Generate Hexagon.json from LLVM target descriptions.")
         self.set_llvm_commit_info(use_prev=False)
-        subprocess.call(
-            [
-                "llvm-tblgen",
-                "-I",
-                "../../../include/",
-                "--dump-json",
-                "-o",
-                "{}/Hexagon.json".format(self.config["GENERATOR_ROOT_DIR"]),
-                "Hexagon.td",
-            ],
-            cwd=self.config["LLVM_PROJECT_HEXAGON_DIR"],
+        cache = TblgenCache(
+            "{}/.tblgen_cache".format(self.config["GENERATOR_ROOT_DIR"]),
+            self.config["LLVM_PROJECT_HEXAGON_DIR"],
+            self.config["LLVM_PROJECT_REPO_DIR"] + "/llvm/include",
+            self.tblgen,
         )
+        json_path = "{}/Hexagon.json".format(self.config["GENERATOR_ROOT_DIR"])
+        if not cache.generate_json(self.config["LLVM_COMMIT_HASH"], json_path, self.use_tblgen_cache):
+            exit()
 
     def update_hex_arch(self):
         """Imports system instructions and registers described in the manual but not implemented by LLVM."""
@@ -236,12 +298,9 @@ class LLVMImporter:
                 )
                 continue
             if llvm_instruction["isPseudo"]:
-                log(
-                    "Pseudo instruction passed. Name: {}".format(i_name),
-                    LogLevel.VERBOSE,
-                )
+                log("Pseudo instruction passed. Name: {}", LogLevel.VERBOSE, i_name, subsystem="importer")
                 continue
-            log("{} | Parse {}".format(i, i_name), LogLevel.VERBOSE)
+            log("{} | Parse {}", LogLevel.VERBOSE, i, i_name, subsystem="importer")
             self.llvm_instructions[i_name] = llvm_instruction
 
             if llvm_instruction["Type"]["def"] == "TypeSUBINSN":
@@ -301,25 +360,44 @@ class LLVMImporter:
                 self.hardware_regs[reg_class_name][name] = reg
                 cr += 1
                 log(
-                    "Added reg: {}::{} with hw encoding: {}".format(name, reg_class_name, reg.hw_encoding),
+                    "Added reg: {}::{} with hw encoding: {}",
                     LogLevel.DEBUG,
+                    name,
+                    reg_class_name,
+                    reg.hw_encoding,
+                    subsystem="registers",
                 )
 
             cc += 1
         log("Parsed {} hardware registers of {} different register classes.".format(cr, cc))
 
-    def check_insn_syntax_length(self):
-        for instr_set in [
-            self.normal_instructions.values(),
-            self.sub_instructions.values(),
-        ]:
-            for insn in instr_set:
-                if len(insn.syntax) >= 128:
-                    sl = len(insn.syntax) + 1  # +1 for \0 in the string
-                    raise ImplementationException(
-                        "The text infix variable is at the moment only 128 byte."
-                        + "This syntax takes at least {}+1 bytes.".format(sl)
-                    )
+    def write_instruction_db(self, path: str) -> None:
+        """Writes the parsed instructions and registers as binary database. See InstructionDatabase.py"""
+        InstructionDatabaseWriter(self.normal_instructions, self.sub_instructions, self.hardware_regs).write(path)
+        log("Write {}".format(path), LogLevel.INFO)
+
+    def write_overlap_index(self, out_dir: str) -> None:
+        """Writes the index (overlap_index.json) and the report (overlap_report.txt) of templates
+        which match the same instruction words to out_dir.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        index_path = os.path.join(out_dir, "overlap_index.json")
+        report_path = os.path.join(out_dir, "overlap_report.txt")
+        self.overlap_index.write(index_path, report_path)
+        overlaps = sum([len(p) for p in self.overlap_index.overlaps.values()])
+        shadowed = sum([len(p) for p in self.overlap_index.shadowed.values()])
+        log("{} overlapping template pairs ({} never matched). See {}".format(overlaps, shadowed, report_path))
+
+    def get_reg_operand_bits(self) -> dict:
+        """Returns the maximum number of bits which encode a register operand by register class."""
+        bits = dict()
+        for instr in chain(self.normal_instructions.values(), self.sub_instructions.values()):
+            for op in instr.operands.values():
+                if op.type != OperandType.REGISTER:
+                    continue
+                op: Register
+                bits[op.llvm_reg_class] = max(bits.get(op.llvm_reg_class, 0), op.opcode_mask.full_mask.count(1))
+        return bits
 
     def get_cc_regs(self) -> dict:
         """Returns a list of register names which are argument or return register in the calling convention.
@@ -372,27 +450,21 @@ class LLVMImporter:
     def generate_decompiler_code(self) -> None:
         pass
 
-    # RIZIN SPECIFIC
-    def add_license_info_header(self) -> None:
-        log("Add license headers")
-        for subdir, dirs, files in os.walk("./rizin/"):
-            for file in files:
-                if file == "hexagon" or file[-3:] == "txt":  # Tests
-                    continue
-                p = os.path.join(subdir, file)
-                if p in self.unchanged_files:
-                    continue
-                with open(p, "r+") as f:
-                    content = f.read()
-                    f.seek(0, 0)
-                    f.write(get_license() + "\n" + get_generation_timestamp(self.config) + "\n" + content)
-
     # RIZIN SPECIFIC
     def build_hexagon_insn_enum_h(self, path: str = "./rizin/librz/asm/arch/hexagon/hexagon_insn.h") -> None:
         code = get_generation_warning_c_code()
         code += "\n"
         code += get_include_guard("hexagon_insn.h")
-        code += "\ntypedef enum {\n"
+        code += self.get_insn_enum_in_c()
+        code += "#endif"
+
+        self.write_src(code, path)
+
+    def get_insn_enum_in_c(self) -> str:
+        """Returns the HexInsnID enum. HEX_INS_INVALID_DECODE is 0.
+        The last item (HEX_INS_COUNT) is the number of instruction ids.
+        """
+        code = "\ntypedef enum {\n"
         enum = ""
         for name in self.normal_instruction_names + self.sub_instruction_names:
             if "invalid_decode" in name:
@@ -400,47 +472,171 @@ class LLVMImporter:
             else:
                 enum += PluginInfo.INSTR_ENUM_PREFIX + name.upper() + ","
         code += enum
+        code += PluginInfo.INSTR_ENUM_PREFIX + "COUNT\n"
         code += "} HexInsnID;\n"
-        code += "#endif"
+        return code
 
-        self.write_src(code, path)
+    # RIZIN SPECIFIC
+    def get_template_buckets(self) -> dict:
+        """Returns the instructions of the HexInsnTemplate tables by table name.
+        One table per sub-instruction namespace (templates_sub_<ns>) and one per feature and i-class
+        (templates_normal_0x<c>, templates_hvx_0x<c> etc.).
+        """
+        buckets = {f"templates_sub_{ns.name}": list() for ns in sorted(self.sub_namespaces)}
+        for feature in InsnFeature:
+            buckets.update({f"templates_{feature.value}_0x{c:x}": list() for c in range(0x10)})
+        for instr in self.sub_instructions.values():
+            buckets[f"templates_sub_{instr.namespace.name}"].append(instr)
+        for instr in self.normal_instructions.values():
+            buckets[f"templates_{instr.feature.value}_0x{instr.encoding.get_i_class():x}"].append(instr)
+        return buckets
 
     # RIZIN SPECIFIC
-    def build_hexagon_disas_c(self, path: str = "./rizin/librz/asm/arch/hexagon/hexagon_disas.c") -> None:
-        code = get_generation_warning_c_code()
+    def get_template_tables(self, buckets: dict = None) -> dict:
+        """Returns the bodies of the HexInsnTemplate tables by table name.
+        Empty tables of features other than the core are omitted.
+        """
+        buckets = buckets if buckets is not None else self.get_template_buckets()
+        return {
+            name: "".join([i.get_template_in_c(self.reg_sets) + "," for i in instructions])
+            for name, instructions in buckets.items()
+            if instructions or name.startswith(f"templates_{InsnFeature.CORE.value}_")
+        }
 
-        code += include_file("handwritten/hexagon_disas_c/include.c")
-        code += include_file("handwritten/hexagon_disas_c/types.c")
-
-        templates_code = "\n\n"
-
-        # Sub-Instructions instructions
-        for ns in sorted(self.sub_namespaces):
-            templates_code += f"static const HexInsnTemplate templates_sub_{ns.name}[] = {{\n"
-            instr: SubInstruction
-            for instr in self.sub_instructions.values():
-                if instr.namespace == ns:
-                    templates_code += instr.get_template_in_c() + ","
-            templates_code += "{ { 0 } }, };\n\n"
-
-        # Normal instructions
-        for c in range(0x10):
-            templates_code += f"static const HexInsnTemplate templates_normal_0x{c:x}[] = {{\n"
-            instr: Instruction
-            for instr in self.normal_instructions.values():
-                if instr.encoding.get_i_class() == c:
-                    templates_code += instr.get_template_in_c() + ","
-            templates_code += "{ { 0 } }, };\n\n"
-
-        templates_code += "static const HexInsnTemplate *templates_normal[] = {\n"
-        templates_code += ",\n".join([f"templates_normal_0x{c:x}" for c in range(0x10)])
+    # RIZIN SPECIFIC
+    def build_hexagon_disas_c(self, path: str = "./rizin/librz/asm/arch/hexagon/hexagon_disas.c") -> None:
+        """Builds the disassembler. If self.split_disas is set, each template table is written into its own
+        compilation unit (hexagon_disas_<table>.c) next to path. They share the header hexagon_disas_templates.h.
+        """
+        out_dir = os.path.dirname(path)
+        buckets = self.get_template_buckets()
+        tables = self.get_template_tables(buckets)
+        templates_code = "static const HexInsnTemplate *templates_normal[HEX_FEATURE_COUNT][0x10] = {\n"
+        for feature in InsnFeature:
+            feature_tables = [f"templates_{feature.value}_0x{c:x}" for c in range(0x10)]
+            feature_tables = [t if t in tables else "NULL" for t in feature_tables]
+            templates_code += f"[HEX_FEATURE_{feature.name}] = {{ {', '.join(feature_tables)} }},\n"
         templates_code += "};\n\n"
 
-        code += templates_code
-        code += include_file("handwritten/hexagon_disas_c/functions.c")
+        # The file is built as a list of chunks and written at once.
+        code = [get_generation_warning_c_code()]
+        if self.decode_backend == "specialized":
+            code.append("\n#define HEX_DECODE_SPECIALIZED\n")
+        if self.split_disas:
+            header = [
+                get_generation_warning_c_code(),
+                "\n",
+                get_include_guard("hexagon_disas_templates.h"),
+                include_file("handwritten/hexagon_disas_c/include.c"),
+                include_file("handwritten/hexagon_disas_c/types.c"),
+                "\n",
+            ]
+            header += [f"extern const HexInsnTemplate {name}[];\n" for name in tables]
+            header.append("\n#endif")
+            self.write_src(header, os.path.join(out_dir, "hexagon_disas_templates.h"))
+
+            for name, table in tables.items():
+                unit = [
+                    get_generation_warning_c_code(),
+                    '\n#include "hexagon_disas_templates.h"\n\n',
+                    f"const HexInsnTemplate {name}[] = {{\n",
+                    table,
+                    "{ { 0 } }, };\n",
+                ]
+                self.write_src(unit, self.get_disas_unit_path(out_dir, name))
+            log("Compile the hexagon_disas_templates_*.c units together with {}.".format(path))
+            code.append('\n#include "hexagon_disas_templates.h"\n\n')
+        else:
+            self.remove_disas_units(out_dir)
+            code.append(include_file("handwritten/hexagon_disas_c/include.c"))
+            code.append(include_file("handwritten/hexagon_disas_c/types.c"))
+            code.append("\n\n")
+            for name, table in tables.items():
+                code += [f"static const HexInsnTemplate {name}[] = {{\n", table, "{ { 0 } }, };\n\n"]
+
+        # The implicit register sets are collected while the templates are generated.
+        code.append(self.reg_sets.get_implicit_table_in_c())
+        code.append(templates_code)
+        code.append(self.get_insn_info_in_c(buckets))
+        # Duplexes are not assembled. So only the normal instructions are indexed.
+        code.append(
+            self.asm_index.get_index_in_c(
+                {name: instrs for name, instrs in buckets.items() if not name.startswith("templates_sub_")}
+            )
+        )
+        code.append(include_file("handwritten/hexagon_disas_c/functions.c"))
+        if self.decode_backend == "specialized":
+            code.append(self.get_specialized_decoders())
+        code.append(include_file("handwritten/hexagon_disas_c/assembler.c"))
 
         self.write_src(code, path)
 
+    # RIZIN SPECIFIC
+    @staticmethod
+    def get_insn_info_in_c(buckets: dict) -> str:
+        """Returns hex_insn_info. It holds the template, name, analysis op type and flags of each instruction
+        and is indexed by the HexInsnID. So an instruction can be decoded again from only its id and opcode.
+        """
+        code = "static const HexInsnInfo hex_insn_info[HEX_INS_COUNT] = {\n"
+        for table, instructions in buckets.items():
+            instr: InstructionTemplate
+            for k, instr in enumerate(instructions):
+                code += (
+                    f"[{instr.plugin_name}] = {{ &{table}[{k}], "
+                    f'"{instr.name}", {instr.c_rz_op_type}, {instr.get_template_flags_in_c()} }},\n'
+                )
+        code += "};\n\n"
+        return code
+
+    # RIZIN SPECIFIC
+    def get_specialized_decoders(self) -> str:
+        """Returns the operand decoder of each instruction and hex_decode_ops_specialized(),
+        which calls them by template id. Instructions with the same decoder body share one function.
+        """
+        params = (
+            "const HexInsnTemplate *tpl, HexState *state, const ut32 hi_u32, RZ_INOUT HexInsn *hi, "
+            "const HexInsnContainer *hic, const ut64 addr, const HexPkt *pkt, const HexDecodeCfg *cfg, "
+            "RZ_OUT RzStrBuf *sb"
+        )
+        args = "tpl, state, hi_u32, hi, hic, addr, pkt, cfg, sb"
+        # Decoder body -> (Function name, ids of the instructions)
+        decoders: dict[str, tuple[str, list]] = dict()
+        for instr in list(self.normal_instructions.values()) + list(self.sub_instructions.values()):
+            body = instr.get_decode_ops_in_c()
+            if body not in decoders:
+                decoders[body] = (f"hex_decode_ops_{instr.name.lower()}", list())
+            decoders[body][1].append(instr.plugin_name)
+
+        code = "\n"
+        for body, (fn_name, _) in decoders.items():
+            code += f"static inline void {fn_name}({params}) {{\n{body}}}\n\n"
+        code += f"static void hex_decode_ops_specialized({params}) {{\n"
+        code += "switch (tpl->id) {\n"
+        code += "default:\n"
+        code += f"hex_decode_ops({args});\n"
+        code += "break;\n"
+        for fn_name, ids in decoders.values():
+            code += "".join([f"case {i}:\n" for i in ids])
+            code += f"{fn_name}({args});\n"
+            code += "break;\n"
+        code += "}\n"
+        code += "}\n"
+        log("Generated {} specialized operand decoders.", LogLevel.VERBOSE, len(decoders), subsystem="importer")
+        return code
+
+    # RIZIN SPECIFIC
+    @staticmethod
+    def get_disas_unit_path(out_dir: str, table_name: str) -> str:
+        return os.path.join(out_dir, "hexagon_disas_{}.c".format(table_name))
+
+    # RIZIN SPECIFIC
+    def remove_disas_units(self, out_dir: str) -> None:
+        """Removes the compilation units of a previous run with split_disas set."""
+        for name in sorted(os.listdir(out_dir)):
+            if name.startswith("hexagon_disas_templates") and name.split(".")[-1] in ["c", "h"]:
+                log("Remove {}".format(os.path.join(out_dir, name)))
+                os.remove(os.path.join(out_dir, name))
+
     # RIZIN SPECIFIC
     def build_hexagon_h(self, path: str = "./rizin/librz/asm/arch/hexagon/hexagon.h") -> None:
         indent = PluginInfo.LINE_INDENT
@@ -508,44 +704,88 @@ class LLVMImporter:
         code = get_generation_warning_c_code()
         code += include_file("handwritten/hexagon_c/include.c")
 
+        # Flat name tables. Indexed by the register bits of the encoding. The bit remapping is pre-applied.
+        reg_operand_bits = self.get_reg_operand_bits()
+        tables = list()
         reg_class: str
         for reg_class in self.hardware_regs:
-            func_name = HardwareRegister.get_func_name_of_class(reg_class, False)
-            function = "\nchar* {}(int opcode_reg, bool get_alias)".format(func_name)
-            self.reg_resolve_decl.append(function + ";")
-            code += "{} {{".format(function)
-
-            parsing_code = HardwareRegister.get_parse_code_reg_bits(reg_class, "opcode_reg")
-            if parsing_code != "":
-                code += "{}".format(parsing_code)
-
-            code += "switch (opcode_reg) {"
-            code += 'default:return "<err>";'
-
-            hw_reg: HardwareRegister
-            for hw_reg in self.hardware_regs[reg_class].values():
+            regs = {hw_reg.hw_encoding: hw_reg for hw_reg in self.hardware_regs[reg_class].values()}
+            bits = max(reg_operand_bits.get(reg_class, 0), max(regs).bit_length())
+            table_name = (
+                f"{general_prefix.lower()}reg_names_{HardwareRegister.register_class_name_to_upper(reg_class).lower()}"
+            )
+            tables.append((HardwareRegister.get_enum_item_of_class(reg_class), table_name))
+            code += f"static const char *{table_name}[][2] = {{\n"
+            for reg_bits in range(1 << bits):
+                hw_reg: HardwareRegister = regs.get(HardwareRegister.remap_reg_bits(reg_class, reg_bits))
+                if not hw_reg:
+                    code += '{ "<err>", "<err>" },\n'
+                    continue
+                asm_name = hw_reg.asm_name.upper()
                 alias = "".join(hw_reg.alias).upper()
-                alias_choice = 'get_alias ? "' + alias + '" : "' + hw_reg.asm_name.upper() + '"'
-                code += "case {}:\nreturn {};".format(
-                    hw_reg.enum_name,
-                    alias_choice if alias != "" else '"' + hw_reg.asm_name.upper() + '"',
-                )
-            code += "}}\n"
+                code += f'{{ "{asm_name}", "{alias if alias != "" else asm_name}" }}, // {hw_reg.enum_name}\n'
+            code += "};\n\n"
+
+        code += "static const struct {\n"
+        code += "const char *(*names)[2];\n"
+        code += "size_t count;\n"
+        code += f"}} {general_prefix.lower()}reg_name_tables[] = {{\n"
+        for enum_item, table_name in tables:
+            code += f"[{enum_item}] = {{ {table_name}, RZ_ARRAY_SIZE({table_name}) }},\n"
+        code += "};\n\n"
 
         reg_in_cls_decl = (
             f"char *{general_prefix.lower()}" "get_reg_in_class(HexRegClass cls, int opcode_reg, bool get_alias)"
         )
         self.reg_resolve_decl.append(f"{reg_in_cls_decl};")
         code += f"{reg_in_cls_decl} {{\n"
-        code += "switch (cls) {\n"
-        for reg_class in self.hardware_regs:
-            code += f"case {HardwareRegister.get_enum_item_of_class(reg_class)}:\n"
-            code += f"return {HardwareRegister.get_func_name_of_class(reg_class, False)}(opcode_reg, get_alias);\n"
-        code += "default:\n"
+        code += f"if (cls >= RZ_ARRAY_SIZE({general_prefix.lower()}reg_name_tables)) {{\n"
         code += "return NULL;\n"
         code += "}\n"
+        code += f"if ((ut32)opcode_reg >= {general_prefix.lower()}reg_name_tables[cls].count) {{\n"
+        code += 'return "<err>";\n'
+        code += "}\n"
+        code += f"return (char *){general_prefix.lower()}reg_name_tables[cls].names[opcode_reg][get_alias ? 1 : 0];\n"
+        code += "}\n\n"
+
+        reg_index_decl = f"int {general_prefix.lower()}get_reg_index_in_class(HexRegClass cls, const char *name)"
+        self.reg_resolve_decl.append(f"\n{reg_index_decl};")
+        code += "/**\n"
+        code += " * \\brief Returns the register bits of the register with the given name or alias in a class.\n"
+        code += " * The name is compared case insensitive. Returns -1 if the class has no such register.\n"
+        code += " */\n"
+        code += f"{reg_index_decl} {{\n"
+        code += f"if (cls >= RZ_ARRAY_SIZE({general_prefix.lower()}reg_name_tables) || !name) {{\n"
+        code += "return -1;\n"
+        code += "}\n"
+        code += f"const char *(*names)[2] = {general_prefix.lower()}reg_name_tables[cls].names;\n"
+        code += f"for (size_t i = 0; i < {general_prefix.lower()}reg_name_tables[cls].count; i++) {{\n"
+        code += "if (!rz_str_casecmp(names[i][0], name) || !rz_str_casecmp(names[i][1], name)) {\n"
+        code += "return i;\n"
+        code += "}\n"
+        code += "}\n"
+        code += "return -1;\n"
         code += "}\n\n"
 
+        reg_names_code, canonical_reg_decl = self.asm_index.get_reg_names_in_c()
+        self.reg_resolve_decl.append(f"\n{canonical_reg_decl}")
+        code += reg_names_code
+
+        reg_sets_code, reg_set_add_decl = self.reg_sets.get_class_tables_in_c(reg_operand_bits)
+        self.reg_resolve_decl.append(f"\n{reg_set_add_decl}")
+        code += reg_sets_code
+
+        for reg_class in self.hardware_regs:
+            function = "char* {}(int opcode_reg, bool get_alias)".format(
+                HardwareRegister.get_func_name_of_class(reg_class, False)
+            )
+            self.reg_resolve_decl.append(f"\n{function};")
+            code += f"{function} {{\n"
+            code += "return {}get_reg_in_class({}, opcode_reg, get_alias);\n".format(
+                general_prefix.lower(), HardwareRegister.get_enum_item_of_class(reg_class)
+            )
+            code += "}\n\n"
+
         code += include_file("handwritten/hexagon_c/functions.c")
 
         self.write_src(code, path)
@@ -593,7 +833,7 @@ class LLVMImporter:
             with open("./rizin/test/db/asm/hexagon", "w+") as g:
                 set_pos_after_license(g)
                 g.writelines(f.readlines())
-        log("Copied test files to ./rizin/test/db/", LogLevel.DEBUG)
+        log("Copied test files to ./rizin/test/db/", LogLevel.DEBUG, subsystem="importer")
 
     # RIZIN SPECIFIC
     def build_analysis_hexagon_c(self, path: str = "./rizin/librz/analysis/p/analysis_hexagon.c") -> None:
@@ -794,34 +1034,34 @@ class LLVMImporter:
                 f.write(k + "=" + v + "\n")
 
     # RIZIN SPECIFIC
-    @staticmethod
-    def apply_clang_format() -> None:
+    def apply_clang_format(self) -> None:
+        """Formats the src files written in this run. Unchanged files were formatted when they were written."""
         log("Apply clang-format.")
-        for subdir, dirs, files in os.walk("rizin/librz/"):
-            for file in files:
-                p = os.path.join(subdir, file)
-                if os.path.splitext(p)[-1] in [
-                    ".c",
-                    ".cpp",
-                    ".h",
-                    ".hpp",
-                    ".inc",
-                ]:
-                    log("Format {}".format(p), LogLevel.VERBOSE)
-                    os.system("clang-format-13 -style file -i " + p)
-
-    def write_src(self, code: str, path: str) -> None:
+        files = [p for p in self.written_files if os.path.splitext(p)[-1] in [".c", ".cpp", ".h", ".hpp", ".inc"]]
+        if not files:
+            return
+        log("Format {}", LogLevel.VERBOSE, " ".join(files), subsystem="importer")
+        subprocess.run(["clang-format-13", "-style", "file", "-i"] + files)
+
+    def write_src(self, code, path: str) -> None:
         """Compares the given src code to the src code in the file at path and writes it if it differs.
         It ignores the leading license header and timestamps in the existing src file.
         Changes in formatting (anything which matches the regex '[[:blank:]]')
+        The license header and the timestamp are written together with the code.
+
+        Args:
+            code: The src code. Either a string or a list of string chunks.
+            path: The path of the src file.
         """
 
         if compare_src_to_old_src(code, path):
             self.unchanged_files.append(path)
             return
         with open(path, "w+") as dest:
+            dest.write(self.src_header)
             dest.writelines(code)
             log("Write {}".format(path), LogLevel.INFO)
+        self.written_files.append(path)
 
 
 if __name__ == "__main__":
@@ -833,5 +1073,70 @@ if __name__ == "__main__":
         help="Run llvm-tblgen to build a new Hexagon.json file from the LLVM definitions.",
         dest="bjs",
     )
+    parser.add_argument(
+        "--tblgen",
+        default="llvm-tblgen",
+        metavar="PATH",
+        help="The llvm-tblgen binary used with -j.",
+    )
+    parser.add_argument(
+        "--no-tblgen-cache",
+        action="store_false",
+        default=True,
+        help="Always run llvm-tblgen with -j, even if a Hexagon.json of the same LLVM sources is cached.",
+        dest="use_tblgen_cache",
+    )
+    parser.add_argument(
+        "--split-disas",
+        action="store_true",
+        default=False,
+        help="Write each instruction template table of the disassembler into its own compilation unit.",
+        dest="split_disas",
+    )
+    parser.add_argument(
+        "--decode-backend",
+        choices=DECODE_BACKENDS,
+        default="table",
+        help="table: Decode operands by interpreting the instruction templates (smaller code). "
+        "specialized: Generate a decoder with constant masks and shifts for each instruction (faster decoding).",
+    )
+    parser.add_argument(
+        "--export-db",
+        metavar="PATH",
+        help="Write the parsed instructions and registers as binary database to PATH (see InstructionDatabase.py).",
+    )
+    parser.add_argument(
+        "--overlap-report",
+        metavar="DIR",
+        help="Write the index and report of overlapping instruction templates to DIR.",
+        dest="overlap_dir",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=[level.name for level in LogLevel],
+        default=LOG_LEVEL.name,
+        help="Default log level.",
+    )
+    parser.add_argument(
+        "--log",
+        action="append",
+        default=[],
+        type=parse_log_arg,
+        metavar="SUBSYSTEM=LEVEL",
+        help="Log level of a single subsystem. Subsystems: {}".format(", ".join(LOG_SUBSYSTEMS)),
+    )
+    parser.add_argument("--log-json", metavar="PATH", help="Write all log messages as JSON lines to PATH.")
     args = parser.parse_args()
-    interface = LLVMImporter(args.bjs)
+    set_log_level(LogLevel[args.log_level])
+    for subsystem, level in args.log:
+        set_log_level(level, subsystem)
+    set_log_json_sink(args.log_json)
+    interface = LLVMImporter(
+        args.bjs,
+        split_disas=args.split_disas,
+        tblgen=args.tblgen,
+        use_tblgen_cache=args.use_tblgen_cache,
+        decode_backend=args.decode_backend,
+        export_db=args.export_db,
+        overlap_dir=args.overlap_dir,
+    )
@@ -10,7 +10,7 @@ from bitarray import bitarray
 
 import HexagonArchInfo
 from ImplementationException import ImplementationException
-from helperFunctions import normalize_llvm_syntax
+from AsmString import normalize_operand_name
 
 
 class SparseMask:
@@ -76,6 +76,22 @@ class SparseMask:
     def c_template(self):
         return ", ".join([f"{{ 0x{bits:x}, {shift} }}" for bits, shift in self.masks])
 
+    @property
+    def bits_total(self) -> int:
+        return sum([bits for bits, _ in self.masks])
+
+    def c_extract(self, var: str = "hi_u32") -> str:
+        """Returns a C expression which concatenates the bits of the operand in var with constant shifts and masks.
+        It gives the same value as hex_op_masks_extract() with the masks of c_template.
+        """
+        parts = []
+        off = 0
+        for bits, shift in self.masks:
+            part = f"(({var} >> {shift}) & 0x{(1 << bits) - 1:x})" if shift else f"({var} & 0x{(1 << bits) - 1:x})"
+            parts.append(f"({part} << {off})" if off else part)
+            off += bits
+        return " | ".join(parts)
+
 
 class OperandType(Enum):
     REGISTER = "HEX_OP_TYPE_REG"
@@ -108,7 +124,7 @@ class Operand:
         self.llvm_type = llvm_type
         self.type: OperandType = self.get_operand_type(llvm_type)
         self.syntax_index = syntax_index
-        self.explicit_syntax = normalize_llvm_syntax(self.llvm_syntax)
+        self.explicit_syntax = normalize_operand_name(self.llvm_syntax)
         self.opcode_mask: SparseMask = None
 
         self.is_in_operand = False
@@ -124,6 +140,16 @@ class Operand:
         """
         raise ImplementationException("You need to override this method.")
 
+    def c_decode(self, index: int, force_extendable=False) -> str:
+        """Returns C code which decodes this operand into hi->ops[index] and appends its text to sb.
+        It does the same as hex_decode_ops() with the c_template of the operand, but without any branch on its flags.
+
+        Keyword arguments:
+        force_extenable -- For immediate operands, whether is_extendable should be considered
+                           to be true regardless of its stored value.
+        """
+        raise ImplementationException("You need to override this method.")
+
     @staticmethod
     def get_operand_type(operand_type: str) -> OperandType:
         if operand_type in HexagonArchInfo.REG_CLASS_NAMES:
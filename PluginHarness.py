@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import glob
+import os
+import struct
+import subprocess
+import tempfile
+
+from helperFunctions import log, LogLevel
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark")
+
+PLUGIN_SOURCES = [
+    "asm/arch/hexagon/hexagon.c",
+    "asm/arch/hexagon/hexagon_disas.c",
+    "asm/arch/hexagon/hexagon_arch.c",
+    "asm/p/asm_hexagon.c",
+    "analysis/p/analysis_hexagon.c",
+]
+
+
+def build_plugin(out_path: str, rizin_dir: str, driver: str, cc: str = "cc", cflags: list = None) -> None:
+    """Compiles the generated plugin sources in rizin_dir (a librz directory) with the rizin shim
+    (benchmark/harness) and a driver program.
+    """
+    sources = [os.path.join(rizin_dir, s) for s in PLUGIN_SOURCES]
+    # Template tables of a generator run with --split-disas.
+    sources += sorted(glob.glob(os.path.join(rizin_dir, "asm/arch/hexagon/hexagon_disas_templates_*.c")))
+    sources += [os.path.join(BENCH_DIR, "harness/rz_shim.c"), driver]
+    includes = ["-I" + os.path.join(BENCH_DIR, "harness"), "-I" + os.path.join(rizin_dir, "asm/arch/hexagon")]
+    # The plugin initializes its configuration with pthread_once().
+    cmd = [cc] + (cflags or []) + includes + sources + ["-pthread", "-o", out_path]
+    log("Build: {}", LogLevel.DEBUG, " ".join(cmd), subsystem="benchmark")
+    subprocess.run(cmd, check=True)
+
+
+class PluginHarness:
+    """
+    Generates the rizin plugin of an LLVMImporter into a temporary directory and builds it with the rizin shim
+    and the check driver (benchmark/check_decoder.c). So the generated C code can be compared against the
+    Python implementations without a rizin build.
+
+    Args:
+        interface: The LLVMImporter of which the plugin is generated.
+        cc: The C compiler.
+    """
+
+    def __init__(self, interface, cc: str = "cc"):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rizin_dir = os.path.join(self.tmp_dir.name, "librz")
+        arch_dir = os.path.join(rizin_dir, "asm/arch/hexagon")
+        for d in [arch_dir, os.path.join(rizin_dir, "asm/p"), os.path.join(rizin_dir, "analysis/p")]:
+            os.makedirs(d)
+        # The handwritten parts are read relative to the generator root.
+        cwd = os.getcwd()
+        os.chdir(interface.config["GENERATOR_ROOT_DIR"])
+        try:
+            interface.build_hexagon_insn_enum_h(os.path.join(arch_dir, "hexagon_insn.h"))
+            interface.build_hexagon_disas_c(os.path.join(arch_dir, "hexagon_disas.c"))
+            interface.build_hexagon_c(os.path.join(arch_dir, "hexagon.c"))
+            interface.build_hexagon_h(os.path.join(arch_dir, "hexagon.h"))
+            interface.build_asm_hexagon_c(os.path.join(rizin_dir, "asm/p/asm_hexagon.c"))
+            interface.build_hexagon_arch_c(os.path.join(arch_dir, "hexagon_arch.c"))
+            interface.build_hexagon_arch_h(os.path.join(arch_dir, "hexagon_arch.h"))
+            interface.build_analysis_hexagon_c(os.path.join(rizin_dir, "analysis/p/analysis_hexagon.c"))
+        finally:
+            os.chdir(cwd)
+        self.driver = os.path.join(self.tmp_dir.name, "check_decoder")
+        build_plugin(self.driver, rizin_dir, os.path.join(BENCH_DIR, "check_decoder.c"), cc, ["-O1"])
+
+    def close(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def run(self, check: str, data: bytes, addr: int = 0) -> list:
+        """Runs a check of the driver on the input data and returns its output lines."""
+        path = os.path.join(self.tmp_dir.name, "input.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        result = subprocess.run(
+            [self.driver, check, path, hex(addr)], check=True, stdout=subprocess.PIPE, universal_newlines=True
+        )
+        return result.stdout.splitlines()
+
+    def run_words(self, check: str, words, addr: int) -> list:
+        return self.run(check, struct.pack("<{}I".format(len(words)), *[int(w) for w in words]), addr)
+
+    def text(self, words, addr: int = 0) -> list:
+        """Returns the text of each word (without packet indicators), decoded linearly by the plugin."""
+        return [line.split(" ", 1)[1] for line in self.run_words("text", words, addr)]
+
+    def insns(self, words, addr: int = 0, redecode: bool = False) -> list:
+        """Returns "<address> <text> | <operands>" of each instruction, decoded linearly by the plugin.
+        If redecode is set the instructions are decoded a second time with hex_insn_redecode().
+        """
+        return self.run_words("redecode" if redecode else "insns", words, addr)
+
+    def assemble(self, packets: list) -> list:
+        """Assembles the packets (tuples of address and text) with hexagon_assemble_packet().
+        Returns the words of each packet. Or None if it could not be assembled.
+        """
+        lines = self.run("asm", "".join("{:#x} {}\n".format(addr, text) for addr, text in packets).encode())
+        return [None if line == "error" else [int(w, 16) for w in line.split()] for line in lines]
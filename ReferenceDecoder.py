@@ -0,0 +1,476 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from __future__ import annotations
+
+import numpy as np
+
+import PluginInfo
+from HardwareRegister import HardwareRegister
+from Immediate import Immediate
+from Instruction import Instruction
+from InstructionDatabase import DbInstruction, DbOperand, InstructionDatabase
+from InstructionTemplate import InsnFeature
+from Operand import OperandType
+from Register import Register
+from SubInstruction import DUPLEX_NAMESPACES, SubInstruction, SubInstrNamespace
+
+# Upper bound of the elements in a match matrix (words x templates) computed at once.
+MATCH_CHUNK_ELEMENTS = 1 << 22
+# A packet holds at most four instructions (see is_pkt_full() in hexagon_arch.c).
+MAX_PKT_INSNS = 4
+
+
+class DecoderOperand:
+    """The decoding information of a single operand. Equivalent of the C HexOpTemplate."""
+
+    __slots__ = [
+        "is_reg",
+        "is_const",
+        "masks",
+        "syntax_offset",
+        "scale",
+        "is_signed",
+        "is_extendable",
+        "is_pc_relative",
+        "double_hash",
+        "reg_class",
+        "is_out",
+        "is_n_reg",
+    ]
+
+    def __init__(self, op, syntax_offset: int, force_extendable: bool):
+        self.syntax_offset = syntax_offset
+        self.is_reg = op.type == OperandType.REGISTER
+        self.is_const = not self.is_reg and op.is_constant
+        self.masks = op.opcode_mask.masks if not self.is_const else []
+        self.scale = 0
+        self.is_signed = False
+        self.is_extendable = False
+        self.is_pc_relative = False
+        self.double_hash = False
+        self.reg_class = None
+        self.is_out = False
+        self.is_n_reg = False
+        if self.is_reg:
+            op: Register
+            self.reg_class = op.llvm_reg_class
+            self.is_out = op.is_out_operand
+            self.is_n_reg = op.is_n_reg
+        elif not self.is_const:
+            op: Immediate
+            self.scale = op.scale
+            self.is_signed = op.is_signed
+            self.is_extendable = op.is_extendable or force_extendable
+            self.is_pc_relative = op.is_pc_relative
+            self.double_hash = op.total_width == 32
+
+    @classmethod
+    def from_db(cls, op: DbOperand, force_extendable: bool) -> DecoderOperand:
+        """Returns the operand of an instruction database record."""
+        operand = cls.__new__(cls)
+        operand.syntax_offset = op.syntax_offset
+        operand.is_reg = op.is_register
+        operand.is_const = not operand.is_reg and "is_constant" in op.flags
+        operand.masks = op.masks if not operand.is_const else []
+        operand.scale = 0 if operand.is_reg else op.scale
+        operand.is_signed = not operand.is_reg and not operand.is_const and "is_signed" in op.flags
+        operand.is_extendable = (
+            not operand.is_reg and not operand.is_const and ("is_extendable" in op.flags or force_extendable)
+        )
+        operand.is_pc_relative = not operand.is_reg and not operand.is_const and "is_pc_relative" in op.flags
+        operand.double_hash = not operand.is_reg and not operand.is_const and op.total_width == 32
+        operand.reg_class = op.reg_class if operand.is_reg else None
+        operand.is_out = operand.is_reg and "is_out_operand" in op.flags
+        operand.is_n_reg = operand.is_reg and "is_n_reg" in op.flags
+        return operand
+
+
+class DecoderTemplate:
+    """The decoding information of a single instruction. Equivalent of the C HexInsnTemplate."""
+
+    __slots__ = ["name", "plugin_name", "mask", "op_code", "syntax", "operands", "is_imm_ext"]
+
+    def __init__(self, instr: Instruction):
+        self.name = instr.name
+        self.plugin_name = instr.plugin_name
+        self.mask = instr.encoding.instruction_mask
+        self.op_code = instr.encoding.op_code
+        self.is_imm_ext = instr.is_imm_ext
+        self.syntax, offsets = instr.get_syntax_operand_offsets()
+        force_extendable = instr.has_single_imm_operand
+        self.operands = [DecoderOperand(op, off, force_extendable) for op, off in offsets]
+
+    @classmethod
+    def from_db(cls, instr: DbInstruction) -> DecoderTemplate:
+        """Returns the template of an instruction database record."""
+        template = cls.__new__(cls)
+        template.name = instr.name
+        template.plugin_name = PluginInfo.INSTR_ENUM_PREFIX + instr.name.upper()
+        template.mask = instr.mask
+        template.op_code = instr.op_code
+        template.is_imm_ext = "is_imm_ext" in instr.flags
+        template.syntax = instr.template_syntax
+        force_extendable = 1 == len([op for op in instr.operands if not op.is_register])
+        template.operands = [DecoderOperand.from_db(op, force_extendable) for op in instr.operands]
+        return template
+
+
+class TemplateTable:
+    """Template table of an i-class or a sub-instruction namespace. Templates are checked in table order."""
+
+    __slots__ = ["masks", "op_codes", "indices"]
+
+    def __init__(self, templates: list, indices: list):
+        self.masks = np.array([templates[i].mask for i in indices], dtype=np.uint32)
+        self.op_codes = np.array([templates[i].op_code for i in indices], dtype=np.uint32)
+        self.indices = np.array(indices, dtype=np.int32)
+
+    def match(self, words: np.ndarray) -> np.ndarray:
+        """Returns for each word the index of the first matching template or -1 if none matches."""
+        result = np.full(words.shape, -1, dtype=np.int32)
+        if len(self.indices) == 0:
+            return result
+        chunk = max(1, MATCH_CHUNK_ELEMENTS // len(self.indices))
+        for start in range(0, len(words), chunk):
+            w = words[start : start + chunk, None]
+            hits = (w & self.masks[None, :]) == self.op_codes[None, :]
+            first = hits.argmax(axis=1)
+            result[start : start + chunk] = np.where(hits.any(axis=1), self.indices[first], -1)
+        return result
+
+
+class DecodedWords:
+    """
+    The result of ReferenceDecoder.decode().
+
+    Attributes:
+        words: The decoded instruction words.
+        addrs: The address of each word.
+        pkt_addrs: The address of the packet each word belongs to.
+        is_duplex: True for duplex words.
+        ids: Template index of each slot, shape (n, 2). Slot 0 holds normal instructions and the high
+        sub-instruction of duplexes. Slot 1 the low sub-instruction. -1 if no template matched.
+        values: Operand values of each slot, shape (n, 2, MAX_OPERANDS). Immediates are scaled, sign extended
+        and extended by a preceding constant extender. Registers hold the bits of the encoding.
+    """
+
+    __slots__ = ["words", "addrs", "pkt_addrs", "is_duplex", "ids", "values"]
+
+    def __init__(self, words: np.ndarray, addrs: np.ndarray, pkt_addrs: np.ndarray, is_duplex: np.ndarray):
+        self.words = words
+        self.addrs = addrs
+        self.pkt_addrs = pkt_addrs
+        self.is_duplex = is_duplex
+        self.ids = np.full((len(words), 2), -1, dtype=np.int32)
+        self.values = np.zeros((len(words), 2, PluginInfo.MAX_OPERANDS), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.words)
+
+
+def extract_operand_bits(words: np.ndarray, masks: list) -> tuple:
+    """Concatenates the operand bits scattered over the words. Vectorized equivalent of hex_op_masks_extract().
+
+    Args:
+        words: The instruction words.
+        masks: The (bits, shift) tuples of a SparseMask, ordered ascending by shift.
+
+    Returns: The operand values and the total number of operand bits.
+    """
+    r = np.zeros(words.shape, dtype=np.int64)
+    off = 0
+    for bits, shift in masks:
+        r |= ((words.astype(np.int64) >> shift) & ((1 << bits) - 1)) << off
+        off += bits
+    return r, off
+
+
+def get_pkt_starts(parse_bits: np.ndarray) -> np.ndarray:
+    """Returns True for each word which starts a packet.
+    A packet starts after a word with parse bits 0b11 or 0b00 (duplex) and after four words without packet end.
+    """
+    n = len(parse_bits)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = (parse_bits[:-1] == 0x3) | (parse_bits[:-1] == 0x0)
+    idx = np.arange(n)
+    last_end = np.maximum.accumulate(np.where(is_start, idx, 0)) if n else idx
+    is_start |= (idx - last_end) % MAX_PKT_INSNS == 0
+    return is_start
+
+
+class ReferenceDecoder:
+    """
+    Decodes Hexagon instruction words in bulk with NumPy. It is built from the same Instruction and SubInstruction
+    objects the C templates are generated from (or from an instruction database, see from_db())
+    and follows the logic of hexagon_disas.c.
+    So it can be used to analyse large instruction streams offline and to cross-check the generated C tables.
+
+    Words are decoded as one linear stream: each word is 4 bytes after its predecessor and packets are
+    delimited by the parse bits.
+
+    Args:
+        normal_instructions: The normal instructions (LLVMImporter.normal_instructions).
+        sub_instructions: The sub-instructions (LLVMImporter.sub_instructions).
+        hardware_regs: The hardware registers by class (LLVMImporter.hardware_regs). Only needed for text().
+        print_reg_alias: Same as the config "plugins.hexagon.reg.alias".
+        show_hash: Same as the config "plugins.hexagon.imm.hash".
+        sign_nums: Same as the config "plugins.hexagon.imm.sign".
+    """
+
+    def __init__(
+        self,
+        normal_instructions: dict,
+        sub_instructions: dict,
+        hardware_regs: dict = None,
+        print_reg_alias: bool = True,
+        show_hash: bool = True,
+        sign_nums: bool = True,
+    ):
+        self.print_reg_alias = print_reg_alias
+        self.show_hash = show_hash
+        self.sign_nums = sign_nums
+        self.templates: list[DecoderTemplate] = list()
+
+        instr: Instruction
+        normal = [
+            (instr.feature, instr.encoding.get_i_class(), DecoderTemplate(instr))
+            for instr in normal_instructions.values()
+        ]
+        instr: SubInstruction
+        sub = [(instr.namespace, DecoderTemplate(instr)) for instr in sub_instructions.values()]
+        self.build_tables(normal, sub)
+
+        # Register class -> register ID -> (asm name, alias)
+        self.reg_names = dict()
+        for reg_class, regs in (hardware_regs or dict()).items():
+            hw_reg: HardwareRegister
+            self.reg_names[reg_class] = {
+                hw_reg.hw_encoding: (hw_reg.asm_name.upper(), "".join(hw_reg.alias).upper()) for hw_reg in regs.values()
+            }
+
+    @classmethod
+    def from_db(
+        cls, db: InstructionDatabase, print_reg_alias: bool = True, show_hash: bool = True, sign_nums: bool = True
+    ) -> ReferenceDecoder:
+        """Returns a decoder of the instructions and registers in an instruction database (LLVMImporter.py --export-db).
+        It does not need Hexagon.json.
+        """
+        decoder = cls(dict(), dict(), None, print_reg_alias, show_hash, sign_nums)
+        instructions = [db.instruction(i) for i in range(len(db))]
+        normal = [(i.feature, i.i_class, DecoderTemplate.from_db(i)) for i in instructions if not i.is_sub_instruction]
+        sub = [
+            (SubInstrNamespace[i.namespace], DecoderTemplate.from_db(i)) for i in instructions if i.is_sub_instruction
+        ]
+        decoder.build_tables(normal, sub)
+        for reg_class in db.reg_classes:
+            decoder.reg_names[reg_class] = {
+                reg.hw_encoding: (reg.asm_name.upper(), "".join(reg.alias).upper()) for reg in db.registers(reg_class)
+            }
+        return decoder
+
+    def build_tables(self, normal: list, sub: list) -> None:
+        """Builds the template tables.
+
+        Args:
+            normal: (feature, i-class, template) of each normal instruction in table order.
+            sub: (namespace, template) of each sub-instruction in table order.
+        """
+        self.templates = list()
+        # The C tables of each feature are scanned in order until an id of 0 (= invalid_decode).
+        # So templates after it are never matched.
+        normal_indices = {c: [] for c in range(0x10)}
+        terminated = set()
+        features = list(InsnFeature)
+        for feature, i_class, template in sorted(normal, key=lambda n: features.index(n[0])):
+            if template.name == "invalid_decode":
+                terminated.add((feature, i_class))
+            if (feature, i_class) in terminated:
+                continue
+            normal_indices[i_class].append(len(self.templates))
+            self.templates.append(template)
+        self.normal_tables = {c: TemplateTable(self.templates, idx) for c, idx in normal_indices.items()}
+
+        sub_indices = {ns: [] for ns in SubInstrNamespace}
+        for namespace, template in sub:
+            sub_indices[namespace].append(len(self.templates))
+            self.templates.append(template)
+        self.sub_tables = {ns: TemplateTable(self.templates, idx) for ns, idx in sub_indices.items()}
+
+        self.imm_ext_indices = np.array([i for i, t in enumerate(self.templates) if t.is_imm_ext], dtype=np.int32)
+
+    def decode(self, words, addr: int = 0) -> DecodedWords:
+        """Decodes a stream of instruction words.
+
+        Args:
+            words: Anything convertible to a uint32 NumPy array.
+            addr: The address of the first word.
+
+        Returns: The decoded words.
+        """
+        words = np.asarray(words, dtype=np.uint32)
+        n = len(words)
+        addrs = (addr + 4 * np.arange(n, dtype=np.int64)) & 0xFFFFFFFF
+        parse_bits = (words >> 14) & 0x3
+        valid = words != 0
+        is_duplex = (parse_bits == 0) & valid
+
+        is_start = get_pkt_starts(parse_bits)
+        pkt_start = np.maximum.accumulate(np.where(is_start, np.arange(n), 0)) if n else np.zeros(0, dtype=np.int64)
+        decoded = DecodedWords(words, addrs, addrs[pkt_start], is_duplex)
+
+        # Slot 0: Normal instructions or high sub-instructions. Slot 1: low sub-instructions.
+        slot_words = np.stack([np.where(is_duplex, (words >> 16) & 0x1FFF, words), words & 0x1FFF], axis=1)
+
+        normal = np.flatnonzero(valid & ~is_duplex)
+        i_class = words[normal] >> 28
+        for c in np.unique(i_class):
+            sel = normal[i_class == c]
+            decoded.ids[sel, 0] = self.normal_tables[int(c)].match(words[sel])
+
+        duplex = np.flatnonzero(is_duplex)
+        d_class = (((words[duplex] >> 29) & 0x7) << 1) | ((words[duplex] >> 13) & 0x1)
+        for c in np.unique(d_class):
+            if int(c) not in DUPLEX_NAMESPACES:
+                continue
+            sel = duplex[d_class == c]
+            high_ns, low_ns = DUPLEX_NAMESPACES[int(c)]
+            decoded.ids[sel, 0] = self.sub_tables[high_ns].match(slot_words[sel, 0])
+            decoded.ids[sel, 1] = self.sub_tables[low_ns].match(slot_words[sel, 1])
+
+        for slot in range(2):
+            ids = decoded.ids[:, slot]
+            for t in np.unique(ids[ids >= 0]):
+                sel = np.flatnonzero(ids == t)
+                for k, op in enumerate(self.templates[t].operands):
+                    decoded.values[sel, slot, k] = self.extract_operand(op, slot_words[sel, slot])
+
+        self.apply_constant_extenders(decoded)
+        return decoded
+
+    @staticmethod
+    def extract_operand(op: DecoderOperand, words: np.ndarray) -> np.ndarray:
+        """Returns the values of an operand for all words."""
+        if op.is_const:
+            return np.full(words.shape, -1, dtype=np.int64)
+        value, bits_total = extract_operand_bits(words, op.masks)
+        if op.is_reg:
+            return value
+        value <<= op.scale
+        if op.is_signed:
+            sign_bit = bits_total + op.scale - 1
+            value = np.where(value & (1 << sign_bit), value - (1 << (sign_bit + 1)), value)
+        return value
+
+    def apply_constant_extenders(self, decoded: DecodedWords) -> None:
+        """Extends the first extendable immediate of each instruction which follows a constant extender.
+        Like hex_extend_op() in C the extender belongs to the address after it. Of a duplex only the high
+        sub-instruction (slot 0) is decoded at this address. The low one is decoded at the address + 2.
+        So it is never extended, even if the high sub-instruction has no extendable immediate.
+        The immediate of an extender can itself be extended (if it follows another one). Such chains are
+        resolved in address order first, because the extended value is the one which extends the next word.
+        """
+        ext_rows = np.flatnonzero(np.isin(decoded.ids[:, 0], self.imm_ext_indices))
+        ext_rows = ext_rows[ext_rows + 1 < len(decoded)]
+        if len(ext_rows) == 0:
+            return
+        targets = ext_rows + 1
+        chained = np.isin(decoded.ids[targets, 0], self.imm_ext_indices)
+        for ext_row in ext_rows[chained]:
+            self.extend_slot0(decoded, np.array([ext_row]))
+        self.extend_slot0(decoded, ext_rows[~chained])
+
+    def extend_slot0(self, decoded: DecodedWords, ext_rows: np.ndarray) -> None:
+        """Extends the instruction in slot 0 of the word after each of the extenders in ext_rows."""
+        targets = ext_rows + 1
+        target_ids = decoded.ids[targets, 0]
+        for t in np.unique(target_ids[target_ids >= 0]):
+            ops = self.templates[t].operands
+            k = next((i for i, op in enumerate(ops) if op.is_extendable and not op.is_reg), None)
+            if k is None:
+                continue
+            sel = target_ids == t
+            rows = targets[sel]
+            value = decoded.values[rows, 0, k] >> ops[k].scale
+            decoded.values[rows, 0, k] = (value & 0x3F) | decoded.values[ext_rows[sel], 0, 0]
+
+    def name(self, decoded: DecodedWords, i: int) -> str:
+        """Returns the instruction name(s) of word i. Duplexes as "<high>;<low>"."""
+        names = [self.templates[t].name if t >= 0 else "invalid" for t in decoded.ids[i]]
+        return ";".join(names) if decoded.is_duplex[i] else names[0]
+
+    def text(self, decoded: DecodedWords, i: int) -> str:
+        """Returns the textual disassembly of word i without packet indicators (like text_infix in C)."""
+        if decoded.is_duplex[i]:
+            d_class = ((int(decoded.words[i]) >> 29) << 1) | ((int(decoded.words[i]) >> 13) & 0x1)
+            if d_class not in DUPLEX_NAMESPACES:
+                # Reserved duplex classes (see hex_set_invalid_duplex() in C).
+                return "invalid ; invalid"
+            if (decoded.ids[i] < 0).all():
+                return "invalid ; "
+            return " ; ".join(self.slot_text(decoded, i, slot) for slot in range(2))
+        return self.slot_text(decoded, i, 0)
+
+    def slot_text(self, decoded: DecodedWords, i: int, slot: int) -> str:
+        t = decoded.ids[i, slot]
+        if t < 0:
+            # Sub-instructions without matching template have no text in C.
+            return "" if decoded.is_duplex[i] else "invalid"
+        tpl = self.templates[t]
+        text = ""
+        syntax_cur = 0
+        for k, op in enumerate(tpl.operands):
+            if syntax_cur < op.syntax_offset <= len(tpl.syntax):
+                text += tpl.syntax[syntax_cur : op.syntax_offset]
+                syntax_cur = op.syntax_offset
+            text += self.operand_text(decoded, i, slot, k, op)
+        return text + tpl.syntax[syntax_cur:]
+
+    def operand_text(self, decoded: DecodedWords, i: int, slot: int, k: int, op: DecoderOperand) -> str:
+        value = int(decoded.values[i, slot, k])
+        if op.is_const:
+            return "-1"
+        if op.is_reg:
+            if op.is_n_reg:
+                value = self.resolve_n_register(decoded, i, value)
+                if value is None:
+                    return "<err>"
+            return self.reg_name(op.reg_class, value)
+        h = ("##" if op.double_hash else "#") if self.show_hash else ""
+        if op.is_pc_relative:
+            return "0x{:x}".format((int(decoded.pkt_addrs[i]) + value) & 0xFFFFFFFF)
+        st32 = ((value + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+        if op.is_signed and self.sign_nums and st32 < 0:
+            return "{}-0x{:x}".format(h, -st32)
+        return "{}0x{:x}".format(h, value & 0xFFFFFFFF)
+
+    def reg_name(self, reg_class: str, reg_bits: int) -> str:
+        """Equivalent of hex_get_reg_in_class()."""
+        names = self.reg_names[reg_class].get(HardwareRegister.remap_reg_bits(reg_class, reg_bits))
+        if not names:
+            return "<err>"
+        asm_name, alias = names
+        return alias if self.print_reg_alias and alias != "" else asm_name
+
+    def resolve_n_register(self, decoded: DecodedWords, i: int, reg_bits: int):
+        """Equivalent of resolve_n_register(). Returns the register bits of the producer or None."""
+        if reg_bits <= 1 or reg_bits >= 8:
+            return None
+        ahead = reg_bits >> 1
+        first = i - ((int(decoded.addrs[i]) - int(decoded.pkt_addrs[i])) & 0xFFFFFFFF) // 4
+        j = i
+        while ahead > 0:
+            j -= 1
+            if j < first:
+                return None
+            if decoded.ids[j, 0] in self.imm_ext_indices:
+                continue
+            ahead -= 1
+        t = decoded.ids[j, 0]
+        if t < 0 or decoded.is_duplex[j]:
+            return None
+        for k, op in enumerate(self.templates[t].operands):
+            if op.is_reg and op.is_out:
+                return int(decoded.values[j, 0, k])
+        return None
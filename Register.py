@@ -37,8 +37,6 @@ class Register(Operand):
         "is_control",
         "is_system",
         "is_new_value",
-        "llvm_syntax",
-        "syntax_index",
         "is_hvx",
         "is_general",
         "is_lower8",
@@ -157,6 +155,8 @@ class Register(Operand):
     # RIZIN SPECIFIC
     def c_template(self, force_extendable=False) -> str:
         info = ["HEX_OP_TEMPLATE_TYPE_REG"]
+        if self.is_in_operand:
+            info.append("HEX_OP_TEMPLATE_FLAG_REG_IN")
         if self.is_out_operand:
             info.append("HEX_OP_TEMPLATE_FLAG_REG_OUT")
         if self.is_double:
@@ -171,6 +171,33 @@ class Register(Operand):
             + f".reg_cls = {Register.get_enum_item_of_class(self.llvm_type)}"
         )
 
+    # RIZIN SPECIFIC
+    def c_decode(self, index: int, force_extendable=False) -> str:
+        op = f"hi->ops[{index}]"
+        attr = []
+        if self.is_out_operand:
+            attr.append("HEX_OP_REG_OUT")
+        if self.is_double:
+            attr.append("HEX_OP_REG_PAIR")
+        if self.is_quadruple:
+            attr.append("HEX_OP_REG_QUADRUPLE")
+        reg_cls = Register.get_enum_item_of_class(self.llvm_type)
+        code = f"{op}.attr = {' | '.join(attr) if attr else '0'};\n"
+        code += f"{op}.type = HEX_OP_TYPE_REG;\n"
+        code += f"{op}.op.reg = {self.opcode_mask.c_extract()};\n"
+        reg_idx = f"{op}.op.reg"
+        if self.is_n_reg:
+            reg_idx = f"n_reg_{index}"
+            code += f"HEX_PROF_START(t_new_reg_{index});\n"
+            code += f"int {reg_idx} = resolve_n_register({op}.op.reg, hic->addr, pkt);\n"
+            code += f"HEX_PROF_STOP(state, HEX_PROF_NEW_REG, t_new_reg_{index});\n"
+        if self.is_in_operand:
+            code += f"hex_reg_set_add(&hi->regs_read, {reg_cls}, {reg_idx});\n"
+        if self.is_out_operand:
+            code += f"hex_reg_set_add(&hi->regs_written, {reg_cls}, {reg_idx});\n"
+        code += f"rz_strbuf_append(sb, hex_get_reg_in_class({reg_cls}, {reg_idx}, cfg->reg_alias));\n"
+        return code
+
     @staticmethod
     def register_class_name_to_upper(s: str) -> str:
         """Separates words by an '_' and sets them upper case: IntRegsLow8 -> INT_REGS_LOW8"""
@@ -0,0 +1,160 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+from HardwareRegister import HardwareRegister
+from ImplementationException import ImplementationException
+import PluginInfo
+from helperFunctions import log, LogLevel
+
+# Register class -> HexRegSet member. Registers of all other classes are composed of these or are not tracked.
+REG_SET_MEMBERS = {
+    "IntRegs": "gpr",
+    "CtrRegs": "ctr",
+    "HvxVR": "vec",
+    "PredRegs": "pred",
+    "HvxQR": "vpred",
+}
+
+
+class RegisterSet:
+    """Python equivalent of the HexRegSet struct. One bit per register, by hardware encoding."""
+
+    def __init__(self):
+        self.bits = {member: 0 for member in REG_SET_MEMBERS.values()}
+
+    def __or__(self, other):
+        result = RegisterSet()
+        for member in result.bits:
+            result.bits[member] = self.bits[member] | other.bits[member]
+        return result
+
+    def __eq__(self, other):
+        return self.bits == other.bits
+
+    def __hash__(self):
+        return hash(tuple(self.bits.values()))
+
+    def is_empty(self) -> bool:
+        return not any(self.bits.values())
+
+    def get_c_initializer(self) -> str:
+        if self.is_empty():
+            return "{ 0 }"
+        return "{ " + ", ".join([f".{m} = 0x{b:x}" for m, b in self.bits.items() if b != 0]) + " }"
+
+
+class RegisterSets:
+    """
+    Read and write sets of registers for the instruction templates.
+
+    The registers of explicit operands are only known after decoding. So for those the generator emits
+    one HexRegSet table per register class, indexed by the operand bits (like the register name tables).
+    The implicit registers (LLVM Uses and Defs) are fixed per template. They are stored once in a table
+    and the templates refer to them by index.
+
+    Args:
+        hardware_regs: The hardware registers by register class.
+        hex_arch: The LLVM Hexagon.json. Only the sub-registers are taken from it.
+    """
+
+    def __init__(self, hardware_regs: dict, hex_arch: dict):
+        self.hardware_regs = hardware_regs
+        # Register name -> Names of its sub-registers
+        self.sub_regs: dict[str, list[str]] = {
+            name: [sub["def"] for sub in rec["SubRegs"]]
+            for name, rec in hex_arch.items()
+            if isinstance(rec, dict) and "SubRegs" in rec
+        }
+        # Register name -> RegisterSet
+        self.sets: dict[str, RegisterSet] = dict()
+        for reg_class, member in REG_SET_MEMBERS.items():
+            for name, hw_reg in self.hardware_regs.get(reg_class, dict()).items():
+                self.sets[name] = RegisterSet()
+                self.sets[name].bits[member] = 1 << hw_reg.hw_encoding
+        # The predicate registers are accessed as a whole via C4 (P3:0).
+        if "P3_0" in self.sets:
+            self.sets["P3_0"] = RegisterSet()
+            self.sets["P3_0"].bits["pred"] = 0xF
+        self.implicit_sets: list[RegisterSet] = [RegisterSet()]
+
+    def get_set(self, name: str) -> RegisterSet:
+        """Returns the set of the register with the given LLVM name. Composed registers are split into their
+        sub-registers. Registers which are not tracked give an empty set.
+        """
+        if name in self.sets:
+            return self.sets[name]
+        result = RegisterSet()
+        if name not in self.sub_regs:
+            log("Register {} is not tracked in register sets.", LogLevel.VERBOSE, name, subsystem="registers")
+            return result
+        for sub in self.sub_regs[name]:
+            result = result | self.get_set(sub)
+        self.sets[name] = result
+        return result
+
+    def get_implicit_index(self, reg_names: list) -> int:
+        """Returns the index of the set of the given registers in the implicit register set table.
+        Index 0 is the empty set.
+        """
+        reg_set = RegisterSet()
+        for name in reg_names:
+            reg_set = reg_set | self.get_set(name)
+        if reg_set not in self.implicit_sets:
+            self.implicit_sets.append(reg_set)
+        index = self.implicit_sets.index(reg_set)
+        if index > 0xFF:
+            raise ImplementationException("More than 256 implicit register sets. HexInsnTemplate stores ut8 indices.")
+        return index
+
+    def get_implicit_table_in_c(self) -> str:
+        """Returns the table of implicit register sets. Must be emitted after all templates are generated."""
+        code = "static const HexRegSet hex_implicit_reg_sets[] = {\n"
+        code += ",\n".join([s.get_c_initializer() for s in self.implicit_sets])
+        code += "\n};\n\n"
+        return code
+
+    def get_class_tables_in_c(self, reg_operand_bits: dict) -> tuple:
+        """Returns the HexRegSet tables of all register classes, indexed by the operand bits.
+
+        Args:
+            reg_operand_bits: Maximum number of bits which encode a register operand by register class.
+
+        Returns: Tuple of the code and the declaration of hex_reg_set_add().
+        """
+        prefix = PluginInfo.GENERAL_ENUM_PREFIX.lower()
+        code = ""
+        tables = list()
+        for reg_class in self.hardware_regs:
+            regs = {hw_reg.hw_encoding: hw_reg for hw_reg in self.hardware_regs[reg_class].values()}
+            bits = max(reg_operand_bits.get(reg_class, 0), max(regs).bit_length())
+            sets = list()
+            for reg_bits in range(1 << bits):
+                hw_reg: HardwareRegister = regs.get(HardwareRegister.remap_reg_bits(reg_class, reg_bits))
+                sets.append(self.get_set(hw_reg.name) if hw_reg else RegisterSet())
+            if all([s.is_empty() for s in sets]):
+                continue
+            table_name = f"{prefix}reg_sets_{HardwareRegister.register_class_name_to_upper(reg_class).lower()}"
+            tables.append((HardwareRegister.get_enum_item_of_class(reg_class), table_name))
+            code += f"static const HexRegSet {table_name}[] = {{\n"
+            code += ",\n".join([s.get_c_initializer() for s in sets])
+            code += "\n};\n\n"
+
+        code += "static const struct {\n"
+        code += "const HexRegSet *sets;\n"
+        code += "size_t count;\n"
+        code += f"}} {prefix}reg_set_tables[] = {{\n"
+        for enum_item, table_name in tables:
+            code += f"[{enum_item}] = {{ {table_name}, RZ_ARRAY_SIZE({table_name}) }},\n"
+        code += "};\n\n"
+
+        decl = f"void {prefix}reg_set_add(RZ_INOUT HexRegSet *set, HexRegClass cls, ut32 opcode_reg)"
+        code += f"{decl} {{\n"
+        code += (
+            f"if (cls >= RZ_ARRAY_SIZE({prefix}reg_set_tables) || opcode_reg >= {prefix}reg_set_tables[cls].count) {{\n"
+        )
+        code += "return;\n"
+        code += "}\n"
+        code += f"{prefix}reg_set_union(set, &{prefix}reg_set_tables[cls].sets[opcode_reg]);\n"
+        code += "}\n\n"
+        return code, f"{decl};"
@@ -17,7 +17,30 @@ class SubInstrNamespace(StrEnum):
     S2 = "SUBINSN_S2"
 
 
+# The sub-instruction namespaces of the high and low sub-instruction of a duplex, indexed by the duplex IClass.
+# Must match get_sub_template_table() in handwritten/hexagon_disas_c/functions.c
+DUPLEX_NAMESPACES = {
+    0x0: (SubInstrNamespace.L1, SubInstrNamespace.L1),
+    0x1: (SubInstrNamespace.L1, SubInstrNamespace.L2),
+    0x2: (SubInstrNamespace.L2, SubInstrNamespace.L2),
+    0x3: (SubInstrNamespace.A, SubInstrNamespace.A),
+    0x4: (SubInstrNamespace.A, SubInstrNamespace.L1),
+    0x5: (SubInstrNamespace.A, SubInstrNamespace.L2),
+    0x6: (SubInstrNamespace.A, SubInstrNamespace.S1),
+    0x7: (SubInstrNamespace.A, SubInstrNamespace.S2),
+    0x8: (SubInstrNamespace.L1, SubInstrNamespace.S1),
+    0x9: (SubInstrNamespace.L2, SubInstrNamespace.S1),
+    0xA: (SubInstrNamespace.S1, SubInstrNamespace.S1),
+    0xB: (SubInstrNamespace.S1, SubInstrNamespace.S2),
+    0xC: (SubInstrNamespace.L1, SubInstrNamespace.S2),
+    0xD: (SubInstrNamespace.L2, SubInstrNamespace.S2),
+    0xE: (SubInstrNamespace.S2, SubInstrNamespace.S2),
+}
+
+
 class SubInstruction(Instruction):
+    __slots__ = ["namespace", "enc_number_representation"]
+
     def __init__(self, llvm_instruction: dict):
         if llvm_instruction["Type"]["def"] != "TypeSUBINSN":
             raise UnexpectedException(
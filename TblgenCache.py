@@ -0,0 +1,109 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import hashlib
+import os
+import shutil
+import subprocess
+
+from helperFunctions import log, LogLevel
+
+
+class TblgenCache:
+    """
+    Cache of the Hexagon.json files produced by llvm-tblgen.
+
+    Running llvm-tblgen over the whole Hexagon target takes minutes and a lot of RAM.
+    The result only depends on the LLVM commit, the .td files and the tblgen binary.
+    So we store each produced json under a key of those and copy it back if nothing changed.
+    The hash of the .td files catches uncommitted changes in the LLVM checkout.
+
+    Args:
+        cache_dir: Directory the json files are stored in.
+        hexagon_dir: The Hexagon target directory of LLVM (tblgen runs in it).
+        include_dir: The include directory passed to tblgen.
+        tblgen: The tblgen command. Can be replaced by a stand-in for testing.
+    """
+
+    def __init__(self, cache_dir: str, hexagon_dir: str, include_dir: str, tblgen: str = "llvm-tblgen"):
+        self.cache_dir = cache_dir
+        self.hexagon_dir = hexagon_dir
+        self.include_dir = include_dir
+        self.tblgen = tblgen
+
+    def get_td_hash(self) -> str:
+        """Returns the sha256 of the paths and contents of all .td files tblgen can read."""
+        h = hashlib.sha256()
+        for in_dir in [self.hexagon_dir, self.include_dir]:
+            td_files = list()
+            for root, _, files in os.walk(in_dir):
+                td_files += [os.path.join(root, f) for f in files if f.endswith(".td")]
+            for path in sorted(td_files):
+                h.update(os.path.relpath(path, in_dir).encode())
+                with open(path, "rb") as f:
+                    h.update(f.read())
+        return h.hexdigest()
+
+    def get_tblgen_hash(self) -> str:
+        """Returns the sha256 of the tblgen binary. So a rebuilt or updated tblgen under the same
+        command gets a new key. If the binary is not found, the hash of the command is returned.
+        """
+        h = hashlib.sha256()
+        path = shutil.which(self.tblgen)
+        if not path:
+            h.update(self.tblgen.encode())
+            return h.hexdigest()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def get_key(self, llvm_commit: str) -> str:
+        """Returns the cache key of the current inputs."""
+        h = hashlib.sha256()
+        h.update(llvm_commit.encode())
+        h.update(self.get_tblgen_hash().encode())
+        h.update(self.get_td_hash().encode())
+        return "{}-{}".format(llvm_commit[:12], h.hexdigest()[:16])
+
+    def get_cached_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def run_tblgen(self, out_path: str) -> bool:
+        """Runs tblgen on Hexagon.td. Returns True on success."""
+        log("Run {} on the Hexagon target.".format(self.tblgen))
+        ret = subprocess.call(
+            [self.tblgen, "-I", self.include_dir, "--dump-json", "-o", out_path, "Hexagon.td"],
+            cwd=self.hexagon_dir,
+        )
+        return ret == 0 and os.path.exists(out_path)
+
+    def generate_json(self, llvm_commit: str, out_path: str, use_cache: bool = True) -> bool:
+        """Writes the Hexagon.json to out_path. It is copied from the cache if the inputs did not change.
+        Otherwise tblgen is run and the result is added to the cache.
+
+        Args:
+            llvm_commit: The hash of the checked out LLVM commit.
+            out_path: Path of the Hexagon.json.
+            use_cache: If False, tblgen is always run. The result is still cached.
+
+        Returns: True if the json was generated. False if tblgen failed.
+        """
+        key = self.get_key(llvm_commit)
+        cached = self.get_cached_path(key)
+        if use_cache and os.path.exists(cached):
+            log("Reuse cached Hexagon.json {}".format(key))
+            shutil.copyfile(cached, out_path)
+            return True
+        log("No cached Hexagon.json for {}", LogLevel.VERBOSE, key, subsystem="importer")
+
+        if not self.run_tblgen(out_path):
+            log("{} failed to generate {}".format(self.tblgen, out_path), LogLevel.ERROR)
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Copy first and rename. An interrupted run must not leave a broken json in the cache.
+        shutil.copyfile(out_path, cached + ".tmp")
+        os.replace(cached + ".tmp", cached)
+        log("Added Hexagon.json to the cache: {}".format(key))
+        return True
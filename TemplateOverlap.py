@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import json
+
+import HexagonArchInfo
+from Instruction import Instruction
+from InstructionTemplate import InsnFeature
+from SubInstruction import SubInstrNamespace
+
+
+def get_overlapping_pairs(encodings: list) -> tuple:
+    """Determines which encodings can match the same instruction word.
+
+    Two encodings (mask_a, op_a) and (mask_b, op_b) overlap if they agree on all bits set in both masks:
+    (op_a ^ op_b) & mask_a & mask_b == 0
+    Instead of comparing all pairs, a bitset (a Python int with one bit per encoding) is built for each
+    instruction bit and value. The encodings which conflict with encoding i are the union of the bitsets
+    for the opposite value of every bit in mask_i. All others overlap with i.
+
+    Args:
+        encodings: List of (mask, op_code) tuples.
+
+    Returns: Tuple of:
+        - List of overlapping index pairs (i, j) with i < j.
+        - List of shadowing index pairs (i, j) with i < j. Every word matching j matches i as well.
+    """
+    n = len(encodings)
+    all_set = (1 << n) - 1
+    # fixed_to[v][b]: Encodings which require bit b to be v. has_bit[b]: Encodings which check bit b.
+    fixed_to = [[0] * HexagonArchInfo.INSTRUCTION_LENGTH for _ in range(2)]
+    for i, (mask, op) in enumerate(encodings):
+        for b in range(HexagonArchInfo.INSTRUCTION_LENGTH):
+            if mask & (1 << b):
+                fixed_to[(op >> b) & 1][b] |= 1 << i
+    has_bit = [fixed_to[0][b] | fixed_to[1][b] for b in range(HexagonArchInfo.INSTRUCTION_LENGTH)]
+
+    overlapping = list()
+    shadowing = list()
+    for j, (mask, op) in enumerate(encodings):
+        conflicts = 0
+        outside_mask = 0
+        for b in range(HexagonArchInfo.INSTRUCTION_LENGTH):
+            if mask & (1 << b):
+                conflicts |= fixed_to[((op >> b) & 1) ^ 1][b]
+            else:
+                outside_mask |= has_bit[b]
+        earlier = (1 << j) - 1
+        overlaps = (all_set ^ conflicts) & earlier
+        # Earlier encodings whose masks are a subset of mask_j shadow j.
+        shadows = overlaps & (all_set ^ outside_mask)
+        overlapping += [(i, j) for i in iterate_bits(overlaps)]
+        shadowing += [(i, j) for i in iterate_bits(shadows)]
+    return overlapping, shadowing
+
+
+def iterate_bits(bitset: int):
+    """Yields the indices of the set bits in ascending order."""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+class OverlapIndex:
+    """
+    Index of the HexInsnTemplate entries which match the same instruction words.
+    The decoder checks the templates of a table in order and the first matching one wins.
+    So for each overlapping pair the earlier template wins. Decoder optimizations which reorder
+    templates or build decision trees must preserve this.
+
+    The tables are the same as the generated templates_sub_<namespace> tables. The normal_0x<i-class> tables
+    hold the templates of all features (templates_normal_0x<c>, templates_hvx_0x<c>, ...) in decoding order.
+
+    Args:
+        normal_instructions: The normal instructions by name, in table order.
+        sub_instructions: The sub-instructions by name, in table order.
+    """
+
+    def __init__(self, normal_instructions: dict, sub_instructions: dict):
+        self.tables: dict[str, list[Instruction]] = dict()
+        features = list(InsnFeature)
+        decode_order = sorted(normal_instructions.values(), key=lambda i: features.index(i.feature))
+        for c in range(0x10):
+            self.tables[f"normal_0x{c:x}"] = [
+                # invalid_decode only terminates the C tables. It is never matched.
+                i
+                for i in decode_order
+                if i.encoding.get_i_class() == c and i.name != "invalid_decode"
+            ]
+        for ns in SubInstrNamespace:
+            self.tables[f"sub_{ns.name}"] = [i for i in sub_instructions.values() if i.namespace == ns]
+
+        # Table name -> list of (winner, loser) instruction names
+        self.overlaps: dict[str, list[tuple]] = dict()
+        self.shadowed: dict[str, list[tuple]] = dict()
+        for table, instructions in self.tables.items():
+            encodings = [(i.encoding.instruction_mask, i.encoding.op_code) for i in instructions]
+            overlaps, shadows = get_overlapping_pairs(encodings)
+            self.overlaps[table] = [(instructions[a].name, instructions[b].name) for a, b in overlaps]
+            self.shadowed[table] = [(instructions[a].name, instructions[b].name) for a, b in shadows]
+
+    def get_overlapping(self, name: str) -> set:
+        """Returns the names of all instructions which overlap with the given one."""
+        result = set()
+        for pairs in self.overlaps.values():
+            for a, b in pairs:
+                if a == name:
+                    result.add(b)
+                elif b == name:
+                    result.add(a)
+        return result
+
+    def get_index(self) -> dict:
+        """Returns the machine-readable overlap index."""
+        return {
+            table: {
+                "templates": [i.name for i in instructions],
+                "overlaps": [list(p) for p in self.overlaps[table]],
+                "shadowed": [list(p) for p in self.shadowed[table]],
+            }
+            for table, instructions in self.tables.items()
+        }
+
+    def get_report(self) -> str:
+        """Returns a human-readable report of all overlaps."""
+        report = ""
+        for table, instructions in self.tables.items():
+            report += "{}: {} templates, {} overlapping pairs, {} shadowed\n".format(
+                table, len(instructions), len(self.overlaps[table]), len(self.shadowed[table])
+            )
+            shadowed = set(self.shadowed[table])
+            for a, b in self.shadowed[table]:
+                report += "    {} shadows {} (never matched)\n".format(a, b)
+            for a, b in self.overlaps[table]:
+                if (a, b) not in shadowed:
+                    report += "    {} wins over {}\n".format(a, b)
+        return report
+
+    def write(self, index_path: str, report_path: str) -> None:
+        with open(index_path, "w") as f:
+            json.dump(self.get_index(), f, indent=2)
+            f.write("\n")
+        with open(report_path, "w") as f:
+            f.write(self.get_report())
@@ -0,0 +1,74 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import re
+import unittest
+
+from AssemblerIndex import AsmTokenType, fnv1a_32
+from LLVMImporter import LLVMImporter
+
+
+class TestAssemblerIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = LLVMImporter(False, test_mode=True)
+        self.index = self.interface.asm_index
+
+    def get_text_key(self, text: str) -> str:
+        return self.index.get_key(self.index.tokenize(text, list()))
+
+    def test_tokenize(self) -> None:
+        tokens = self.index.tokenize("r1:0 = combine(SP,#-0x10)", list())
+        self.assertEqual(
+            [
+                (AsmTokenType.REG, "r1:0"),
+                (AsmTokenType.PUNCT, "="),
+                (AsmTokenType.WORD, "combine"),
+                (AsmTokenType.PUNCT, "("),
+                (AsmTokenType.REG, "SP"),
+                (AsmTokenType.PUNCT, ","),
+                (AsmTokenType.NUM, "-0x10"),
+                (AsmTokenType.PUNCT, ")"),
+            ],
+            tokens,
+        )
+        # A '-' behind a register is no sign.
+        self.assertEqual(
+            [AsmTokenType.REG, AsmTokenType.PUNCT, AsmTokenType.PUNCT, AsmTokenType.NUM],
+            [t for t, _ in self.index.tokenize("R0 -= 1", list())],
+        )
+        # P3:0 is an alias of C4. P3:1 is no register pair.
+        self.assertEqual((AsmTokenType.REG, "P3:0"), self.index.tokenize("P3:0", list())[0])
+        self.assertEqual(3, len(self.index.tokenize("P3:1", list())))
+
+    def test_syntax_key(self) -> None:
+        instructions = self.interface.normal_instructions
+        self.assertEqual("%r=add(%r,%i)", self.index.get_syntax_key(instructions["A2_addi"]))
+        self.assertEqual("if(%r)jump:nt%i", self.index.get_syntax_key(instructions["J2_jumpt"]))
+        self.assertEqual("memw(%r+%i)=%r.new", self.index.get_syntax_key(instructions["S2_storerinew_io"]))
+        # The text of an instruction has the key of its syntax.
+        self.assertEqual("%r=add(%r,%i)", self.get_text_key("R0 = ADD(r1, ##0x10)"))
+        self.assertEqual("if(%r)jump:nt%i", self.get_text_key("if (P0) jump:nt 0x1000"))
+        self.assertEqual("memw(%r+%i)=%r.new", self.get_text_key("memw(R0+#-4) = R2.new"))
+        self.assertEqual("jumpr%r", self.get_text_key("jumpr LR"))
+
+    def test_index_in_c(self) -> None:
+        buckets = self.interface.get_template_buckets()
+        code = self.index.get_index_in_c({n: i for n, i in buckets.items() if not n.startswith("templates_sub_")})
+        self.assertNotIn("templates_sub_", code)
+        self.assertRegex(code, r"hex_asm_ext_template = &templates_normal_0x0\[\d+\];")
+
+        size = int(re.search(r"hex_asm_index\[(\d+)\]", code).group(1))
+        self.assertEqual(0, size & (size - 1))
+        slots = {int(m.group(1)): m.group(2) for m in re.finditer(r'\[(\d+)\] = \{ "(.*)", \d+, \d+ \}', code)}
+        self.assertLessEqual(2 * len(slots), size)
+        # Every key is found by probing from its hash.
+        for slot, key in slots.items():
+            probe = fnv1a_32(key) & (size - 1)
+            while slots[probe] != key:
+                probe = (probe + 1) & (size - 1)
+            self.assertEqual(slot, probe)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@
 
 import unittest
 
+from InstructionTemplate import InstructionTemplate
 from LLVMImporter import LLVMImporter
 
 
@@ -14,3 +15,89 @@ class TestInstruction(unittest.TestCase):
 
     def test_code_generation(self) -> None:
         pass
+
+    def test_out_operand_index(self) -> None:
+        addi = self.interface.normal_instructions["A2_addi"]
+        _, offsets = addi.get_syntax_operand_offsets()
+        self.assertEqual(0, InstructionTemplate.get_out_operand_index([op for op, _ in offsets]))
+        self.assertIn(".out_op = 0,", addi.get_template_in_c())
+
+        store = self.interface.normal_instructions["S2_storerinew_io"]
+        _, offsets = store.get_syntax_operand_offsets()
+        self.assertIsNone(InstructionTemplate.get_out_operand_index([op for op, _ in offsets]))
+        self.assertIn(".out_op = HEX_OP_TEMPLATE_NO_OUT,", store.get_template_in_c())
+
+    def test_mem_operand_indices(self) -> None:
+        expected = {
+            "L2_loadri_io": ("BaseImmOffset", 1, 2),  # Rd = memw(Rs+#Ii)
+            "L4_loadri_ap": ("AbsoluteSet", None, 2),  # Rd = memw(Re=##II)
+            "L2_loadrigp": ("Absolute", None, 1),  # Rd = memw(gp+#Ii)
+            "S2_storeri_pi": ("PostInc", 0, None),  # memw(Rx++#Ii) = Rt
+            "S4_pstorerinewtnew_rr": ("BaseRegOffset", 1, None),  # if (Pv.new) memw(Rs+Ru<<#Ii) = Nt.new
+            "A2_addi": ("NoAddrMode", None, None),
+        }
+        for name, (addr_mode, base, offset) in expected.items():
+            instr = self.interface.normal_instructions[name]
+            syntax, offsets = instr.get_syntax_operand_offsets()
+            self.assertEqual(addr_mode, instr.addr_mode)
+            self.assertEqual((base, offset), instr.get_mem_operand_indices(syntax, offsets), name)
+
+        sub_instr = self.interface.sub_instructions["SS2_storew_sp"]  # memw(r29+#Ii) = Rt
+        syntax, offsets = sub_instr.get_syntax_operand_offsets()
+        self.assertEqual((None, 0), sub_instr.get_mem_operand_indices(syntax, offsets))
+
+    def test_mem_access_in_c(self) -> None:
+        self.assertIn(
+            ".mem = { .mode = HEX_ADDR_MODE_GP_REL, .size = 4, .direction = RZ_ANALYSIS_OP_DIR_READ, "
+            ".base = HEX_MEM_NO_OP, .offset = 1 },",
+            self.interface.normal_instructions["L2_loadrigp"].get_template_in_c(),
+        )
+        self.assertIn(
+            "HEX_ADDR_MODE_POST_INC, .size = 128",
+            self.interface.normal_instructions["V6_vS32b_nt_new_pred_ppu"].get_template_in_c(),
+        )
+        self.assertNotIn(".mem", self.interface.normal_instructions["A2_addi"].get_template_in_c())
+
+    def test_decode_ops_in_c(self) -> None:
+        # Rd = add(Rs,#Ii)
+        code = self.interface.normal_instructions["A2_addi"].get_decode_ops_in_c()
+        self.assertIn("hi->op_count = 3;", code)
+        self.assertIn("hi->ops[0].attr = HEX_OP_REG_OUT;", code)
+        self.assertIn("hex_reg_set_add(&hi->regs_written, HEX_REG_CLASS_INT_REGS, hi->ops[0].op.reg);", code)
+        self.assertIn("if (hi->ops[2].op.imm & (1ull << 15)) {", code)
+        self.assertIn("hex_extend_op(state, &hi->ops[2], false, addr);", code)
+        self.assertNotIn("resolve_n_register", code)
+        # memw(Rs+#Ii) = Nt.new
+        code = self.interface.normal_instructions["S2_storerinew_io"].get_decode_ops_in_c()
+        self.assertIn("int n_reg_2 = resolve_n_register(hi->ops[2].op.reg, hic->addr, pkt);", code)
+        self.assertIn("hex_reg_set_add(&hi->regs_read, HEX_REG_CLASS_INT_REGS, n_reg_2);", code)
+
+        decoders = self.interface.get_specialized_decoders()
+        self.assertIn("case HEX_INS_A2_ADDI:\nhex_decode_ops_a2_addi(", decoders)
+        self.assertIn("case HEX_INS_SA1_ADDI:", decoders)
+
+    def test_template_tables(self) -> None:
+        tables = self.interface.get_template_tables()
+        # All core tables, but only the HVX and system tables with templates.
+        self.assertEqual(len(self.interface.sub_namespaces) + 0x10 + 2 + 4, len(tables))
+        self.assertIn("HEX_INS_A2_ADDI,", tables["templates_normal_0xb"])
+        self.assertIn("HEX_INS_V6_VADDW,", tables["templates_hvx_0x1"])
+        self.assertNotIn("HEX_INS_V6_VADDW,", tables["templates_normal_0x1"])
+        self.assertNotIn("templates_hvx_0x0", tables)
+        self.assertIn("HEX_INS_IMPORTED_RD_SS,", tables["templates_system_0x6"])
+        self.assertIn("HEX_INS_SA1_ADDI,", tables["templates_sub_A"])
+        self.assertEqual(
+            "hexagon/hexagon_disas_templates_sub_A.c",
+            LLVMImporter.get_disas_unit_path("hexagon", "templates_sub_A"),
+        )
+
+    def test_insn_info(self) -> None:
+        self.assertIn("HEX_INS_COUNT\n} HexInsnID;", self.interface.get_insn_enum_in_c())
+        buckets = self.interface.get_template_buckets()
+        info = self.interface.get_insn_info_in_c(buckets)
+        addi = self.interface.normal_instructions["A2_addi"]
+        k = buckets["templates_normal_0xb"].index(addi)
+        self.assertIn(f'[HEX_INS_A2_ADDI] = {{ &templates_normal_0xb[{k}], "A2_addi", {addi.c_rz_op_type}, 0 }},', info)
+        self.assertIn('"J2_call", RZ_ANALYSIS_OP_TYPE_CALL, HEX_INSN_TEMPLATE_FLAG_CALL | ', info)
+        ids = len(self.interface.normal_instructions) + len(self.interface.sub_instructions)
+        self.assertEqual(ids, info.count("] = { &templates_"))
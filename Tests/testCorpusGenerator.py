@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import os
+import struct
+import tempfile
+import unittest
+
+from InstructionDatabase import InstructionDatabase
+from LLVMImporter import LLVMImporter
+
+try:
+    import numpy as np
+
+    from CorpusGenerator import CorpusGenerator
+    from ReferenceDecoder import ReferenceDecoder
+
+    numpy_missing = False
+except ImportError:
+    numpy_missing = True
+
+
+@unittest.skipIf(numpy_missing, "numpy is not installed")
+class TestCorpusGenerator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.interface = LLVMImporter(False, test_mode=True)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(cls.tmp_dir.name, "hexagon.db")
+        cls.interface.write_instruction_db(db_path)
+        cls.db = InstructionDatabase(db_path)
+        cls.decoder = ReferenceDecoder(
+            cls.interface.normal_instructions, cls.interface.sub_instructions, cls.interface.hardware_regs
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.db.close()
+        cls.tmp_dir.cleanup()
+
+    def test_generate(self) -> None:
+        words = CorpusGenerator(self.db, 1).generate(20000, ext_ratio=0.3, new_ratio=0.3, loop_ratio=0.3)
+        self.assertEqual(20000, len(words))
+        self.assertEqual(words.tolist(), CorpusGenerator(self.db, 1).generate(20000, 0.3, 0.3, 0.2, 0.3).tolist())
+
+        parse_bits = (words >> 14) & 0x3
+        is_duplex = parse_bits == 0
+        is_end = (parse_bits == 0x3) | is_duplex
+        self.assertTrue(is_end[-1])
+        # Packets have at most four words.
+        ends = np.flatnonzero(is_end)
+        self.assertLessEqual(np.diff(np.concatenate([[-1], ends])).max(), 4)
+        self.assertGreater(is_duplex.sum(), 0)
+
+        # The extenders are not in the decoder tables (invalid_decode comes first in i-class 0).
+        is_ext = ((words >> 28) == 0) & ~is_duplex
+        self.assertGreater(is_ext.sum(), 0)
+        self.assertFalse(is_end[is_ext].any())
+        for i in np.flatnonzero(is_ext):
+            self.assertIn("has_extendable_imm", self.db.match(int(words[i + 1]))[0].flags)
+
+        decoded = self.decoder.decode(words)
+        self.assertTrue((decoded.ids[~is_ext & ~is_duplex, 0] >= 0).all())
+        self.assertTrue((decoded.ids[is_duplex] >= 0).all())
+        consumers = [
+            i
+            for i in np.flatnonzero(~is_duplex & (decoded.ids[:, 0] >= 0))
+            if any([op.is_n_reg for op in self.decoder.templates[decoded.ids[i, 0]].operands])
+        ]
+        self.assertGreater(len(consumers), 0)
+        # All registers exist and all new-value operands have a producer.
+        for i in np.flatnonzero(~is_ext):
+            self.assertNotIn("<err>", self.decoder.text(decoded, i))
+
+        # Loop ends: 0b10 in the first or second word of a packet.
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        self.assertGreater((parse_bits[starts] == 0x2).sum(), 0)
+
+    def test_write_elf(self) -> None:
+        words = CorpusGenerator(self.db).generate(64)
+        path = os.path.join(self.tmp_dir.name, "corpus.elf")
+        CorpusGenerator.write_elf(words, path, 0x1000)
+        with open(path, "rb") as f:
+            elf = f.read()
+        self.assertEqual(b"\x7fELF\x01\x01", elf[:6])
+        self.assertEqual(164, struct.unpack_from("<H", elf, 18)[0])
+        sh_off, _, _, _, _, sh_ent_size, _, _ = struct.unpack_from("<IIHHHHHH", elf, 0x20)
+        _, sh_type, flags, addr, offset, size = struct.unpack_from("<IIIIII", elf, sh_off + sh_ent_size)
+        self.assertEqual((1, 0x6, 0x1000), (sh_type, flags, addr))
+        self.assertEqual(words.astype("<u4").tobytes(), elf[offset : offset + size])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from LLVMImporter import LLVMImporter
+from UnexpectedException import UnexpectedException
+
+try:
+    import numpy as np
+
+    from CorpusGenerator import CorpusGenerator
+    from ElfDisassembler import disassemble, get_exec_sections, get_packet_chunks
+    from InstructionDatabase import InstructionDatabase
+    from ReferenceDecoder import ReferenceDecoder
+
+    numpy_missing = False
+except ImportError:
+    numpy_missing = True
+
+
+@unittest.skipIf(numpy_missing, "numpy is not installed")
+class TestElfDisassembler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp_dir.name, "hexagon.db")
+        LLVMImporter(False, test_mode=True).write_instruction_db(cls.db_path)
+        with InstructionDatabase(cls.db_path) as db:
+            cls.words = CorpusGenerator(db, 7).generate(5000, loop_ratio=0.2)
+            cls.decoder = ReferenceDecoder.from_db(db)
+        cls.elf_path = os.path.join(cls.tmp_dir.name, "corpus.elf")
+        CorpusGenerator.write_elf(cls.words, cls.elf_path, 0x2000)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp_dir.cleanup()
+
+    def run_disassembler(self, **kwargs) -> str:
+        out = io.StringIO()
+        disassemble(self.elf_path, self.db_path, out, **kwargs)
+        return out.getvalue()
+
+    def test_sections(self) -> None:
+        with open(self.elf_path, "rb") as f:
+            elf = f.read()
+        sections = get_exec_sections(elf)
+        self.assertEqual([(".text", 0x2000, len(self.words))], [(s.name, s.addr, s.words) for s in sections])
+        with self.assertRaises(UnexpectedException):
+            get_exec_sections(b"\x7fELF\x02\x01" + bytes(64))
+
+    def test_packet_chunks(self) -> None:
+        chunks = get_packet_chunks(self.words, 100)
+        self.assertEqual(len(self.words), sum([count for _, count in chunks]))
+        for start, count in chunks:
+            self.assertGreaterEqual(count, 100 if start + count < len(self.words) else 1)
+            # Each chunk ends with the last word of a packet.
+            self.assertIn((int(self.words[start + count - 1]) >> 14) & 0x3, [0b00, 0b11])
+
+    def test_text(self) -> None:
+        lines = self.run_disassembler(jobs=1, chunk_words=333).splitlines()
+        self.assertEqual(["", "Disassembly of section .text:", ""], lines[:3])
+        lines = lines[3:]
+        self.assertEqual(len(self.words), len(lines))
+        decoded = self.decoder.decode(self.words, 0x2000)
+        for i, line in enumerate(lines):
+            self.assertEqual("0x{:08x} {:08x}".format(0x2000 + 4 * i, int(self.words[i])), line[:19])
+            self.assertIn(self.decoder.text(decoded, i), line)
+        self.assertTrue(any([line.endswith(":endloop0") for line in lines]))
+
+    def test_parallel(self) -> None:
+        self.assertEqual(self.run_disassembler(jobs=1), self.run_disassembler(jobs=2, chunk_words=100))
+
+    def test_json(self) -> None:
+        entries = [json.loads(line) for line in self.run_disassembler(jobs=2, out_format="json").splitlines()]
+        self.assertEqual(len(self.words), len(entries))
+        decoded = self.decoder.decode(self.words, 0x2000)
+        for i, entry in enumerate(entries):
+            self.assertEqual(int(decoded.pkt_addrs[i]), entry["pkt_addr"])
+            self.assertEqual(self.decoder.name(decoded, i), entry["name"])
+            self.assertEqual(self.decoder.text(decoded, i), entry["text"])
+            self.assertEqual(".text", entry["section"])
+
+
+if __name__ == "__main__":
+    unittest.main()
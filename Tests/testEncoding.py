@@ -94,3 +94,11 @@ class TestInstructionEncoding(unittest.TestCase):
             "{ 0xe, 0 }, { 0xc, 16 }",
             SparseMask(InstructionEncoding(self.json["A4_ext"]["Inst"]).operand_masks["Ii"]).c_template,
         )
+        self.assertEqual(
+            "((hi_u32 >> 13) & 0x1) | (((hi_u32 >> 16) & 0x7f) << 1)",
+            SparseMask(InstructionEncoding(self.json["A2_combineii"]["Inst"]).operand_masks["II"]).c_extract(),
+        )
+        self.assertEqual(
+            "(hi_u32 & 0x3fff) | (((hi_u32 >> 16) & 0xfff) << 14)",
+            SparseMask(InstructionEncoding(self.json["A4_ext"]["Inst"]).operand_masks["Ii"]).c_extract(),
+        )
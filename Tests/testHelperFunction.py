@@ -2,11 +2,31 @@
 #
 # SPDX-License-Identifier: LGPL-3.0-only
 
+import argparse
+import json
+import os
+import tempfile
 import unittest
 
 from bitarray import bitarray
 
-from helperFunctions import bitarray_to_uint, list_to_bitarray, list_to_int
+import helperFunctions
+from helperFunctions import (
+    bitarray_to_uint,
+    list_to_bitarray,
+    list_to_int,
+    log,
+    log_enabled,
+    LogLevel,
+    parse_log_arg,
+    set_log_json_sink,
+    set_log_level,
+)
+
+
+class NotFormattable:
+    def __format__(self, format_spec):
+        raise AssertionError("Formatted a message which is not logged.")
 
 
 class TestHelperFunction(unittest.TestCase):
@@ -60,3 +80,40 @@ class TestHelperFunction(unittest.TestCase):
 
         n = list_to_int([0, 1, 1], endian="big")
         self.assertEqual(3, n)
+
+    def test_log_levels(self):
+        default = helperFunctions.LOG_LEVEL
+        try:
+            log("Dropped: {}", LogLevel.VERBOSE, NotFormattable(), subsystem="encoding")
+            self.assertFalse(log_enabled(LogLevel.VERBOSE, "encoding"))
+
+            set_log_level(LogLevel.VERBOSE, "encoding")
+            self.assertTrue(log_enabled(LogLevel.VERBOSE, "encoding"))
+            self.assertFalse(log_enabled(LogLevel.VERBOSE, "syntax"))
+            self.assertFalse(log_enabled(LogLevel.VERBOSE))
+            log("Dropped: {}", LogLevel.VERBOSE, NotFormattable(), subsystem="syntax")
+        finally:
+            helperFunctions.LOG_SUBSYSTEM_LEVELS.clear()
+            set_log_level(default)
+
+    def test_log_json_sink(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log.jsonl")
+            set_log_json_sink(path)
+            try:
+                log("A {} message", LogLevel.WARNING, "test", subsystem="importer")
+                log("Dropped", LogLevel.VERBOSE)
+            finally:
+                set_log_json_sink(None)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(1, len(records))
+        self.assertEqual("WARNING", records[0]["level"])
+        self.assertEqual("importer", records[0]["subsystem"])
+        self.assertEqual("A test message", records[0]["msg"])
+
+    def test_parse_log_arg(self):
+        self.assertEqual(("encoding", LogLevel.VERBOSE), parse_log_arg("encoding=verbose"))
+        for value in ["encoding", "unknown=DEBUG", "encoding=LOUD", "encoding=DEBUG=1"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_log_arg(value)
@@ -4,7 +4,10 @@
 
 import unittest
 
-from InstructionTemplate import InstructionTemplate
+from AsmString import AsmString, TokenType
+from Instruction import Instruction
+from InstructionTemplate import InstructionTemplate, LoopMembership
+from LLVMImporter import LLVMImporter
 from UnexpectedException import UnexpectedException
 from helperFunctions import normalize_llvm_syntax
 
@@ -57,6 +60,40 @@ class TestInstruction(unittest.TestCase):
             normalize_llvm_syntax("$Rx16 = add($Rx16in,#$II) ; $Rd16 = memw($Rs16+#$Ii)"),
         )
 
+    def test_asm_string_tokens(self) -> None:
+        asm_string = AsmString("if ($Pv4.new) memw($Rs32+$Ru32<<#$Ii) = $Nt8.new")
+        self.assertEqual(["Pv4", "Rs32", "Ru32", "Ii", "Nt8"], asm_string.operand_names)
+        self.assertEqual(["if", "new", "memw", "new"], asm_string.words)
+        self.assertEqual("if (Pv.new) memw(Rs+Ru<<Ii) = Nt.new", asm_string.normalized)
+        operands = [t for t in asm_string.tokens if t.type == TokenType.OPERAND]
+        self.assertEqual(["$Pv4", "$Rs32", "$Ru32", "#$Ii", "$Nt8"], [t.llvm_text for t in operands])
+        # Numbers and '#' without an operand are literals.
+        asm_string = AsmString("$Rdd8 = combine(#0,##$Ii)")
+        self.assertEqual(["Rdd8", "Ii"], asm_string.operand_names)
+        self.assertEqual("Rdd = combine(#0,Ii)", asm_string.normalized)
+        self.assertEqual(
+            [
+                TokenType.OPERAND,
+                TokenType.LITERAL,
+                TokenType.WORD,
+                TokenType.LITERAL,
+                TokenType.OPERAND,
+                TokenType.LITERAL,
+            ],
+            [t.type for t in asm_string.tokens],
+        )
+
+    def test_get_loop_membership(self) -> None:
+        self.assertEqual(LoopMembership.HEX_LOOP_0, Instruction.get_loop_membership(AsmString("loop0($Ii,#$II)")))
+        self.assertEqual(
+            LoopMembership.HEX_LOOP_1, Instruction.get_loop_membership(AsmString("p3 = sp1loop1($Ii,$Rs32)"))
+        )
+        self.assertEqual(
+            LoopMembership.HEX_LOOP_0 | LoopMembership.HEX_ENDS_LOOP_0,
+            Instruction.get_loop_membership(AsmString("endloop0")),
+        )
+        self.assertEqual(LoopMembership.HEX_NO_LOOP, Instruction.get_loop_membership(AsmString("jump $Ii")))
+
     def test_get_syntax_operand_indices(self) -> None:
         syntax = "$RDD8 = combine($RS16,#0) ; $Rd16 = add($Rs16,#$n1)"
         operands = [
@@ -69,7 +106,7 @@ class TestInstruction(unittest.TestCase):
         correct_order = {"RDD8": 0, "RS16": 1, "Rd16": 2, "Rs16": 3, "n1": 4}
         self.assertEqual(
             correct_order,
-            InstructionTemplate.get_syntax_operand_indices(syntax, operands),
+            InstructionTemplate.get_syntax_operand_indices(AsmString(syntax), operands),
         )
 
         syntax = "$Rd32 = add($Rs32,#$Ii)"
@@ -77,7 +114,7 @@ class TestInstruction(unittest.TestCase):
         correct_order = {"Rd32": 0, "Rs32": 1, "Ii": 2}
         self.assertEqual(
             correct_order,
-            InstructionTemplate.get_syntax_operand_indices(syntax, operands),
+            InstructionTemplate.get_syntax_operand_indices(AsmString(syntax), operands),
         )
 
         syntax = "$Rx16 = add($Rx16in,#$II) ; $Rd16 = memw($Rs16+#$Ii)"
@@ -99,14 +136,24 @@ class TestInstruction(unittest.TestCase):
         }
         self.assertEqual(
             correct_order,
-            InstructionTemplate.get_syntax_operand_indices(syntax, operands),
+            InstructionTemplate.get_syntax_operand_indices(AsmString(syntax), operands),
         )
 
         syntax = "$Rd32 = add($Rs32,#$Ii)"
         operands = [["", "Ii"], ["", "Ii"], ["", "Rs32"]]
         with self.assertRaises(UnexpectedException) as context:
-            InstructionTemplate.get_syntax_operand_indices(syntax, operands)
+            InstructionTemplate.get_syntax_operand_indices(AsmString(syntax), operands)
         self.assertTrue(
             "Two operands with the same name given.\n" + "Syntax $Rd32 = add($Rs32,#$Ii), op: Ii"
             in str(context.exception)
         )
+
+    def test_released_llvm_record(self) -> None:
+        interface = LLVMImporter(False, test_mode=True)
+        for instr in [interface.normal_instructions["A2_addi"], interface.sub_instructions["SA1_seti"]]:
+            self.assertFalse(hasattr(instr, "__dict__"))
+            self.assertIsNone(instr.llvm_instr)
+            self.assertIsNone(instr.llvm_in_out_operands)
+            for op in instr.operands.values():
+                self.assertFalse(hasattr(op, "__dict__"))
+        self.assertEqual(0xB, interface.normal_instructions["A2_addi"].encoding.get_i_class())
@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import os
+import tempfile
+import unittest
+
+from InstructionDatabase import InstructionDatabase
+from InstructionTemplate import InsnFeature
+from LLVMImporter import LLVMImporter
+from UnexpectedException import UnexpectedException
+
+
+class TestInstructionDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.interface = LLVMImporter(False, test_mode=True)
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp_dir.name, "hexagon.db")
+        cls.interface.write_instruction_db(cls.path)
+        cls.db = InstructionDatabase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.db.close()
+        cls.tmp_dir.cleanup()
+
+    def test_find(self) -> None:
+        self.assertEqual(len(self.interface.normal_instructions) + len(self.interface.sub_instructions), len(self.db))
+        instr = self.interface.normal_instructions["A2_addi"]
+        entry = self.db.find("A2_addi")
+        self.assertEqual(instr.syntax, entry.syntax)
+        self.assertEqual(instr.encoding.instruction_mask, entry.mask)
+        self.assertEqual(instr.encoding.op_code, entry.op_code)
+        self.assertEqual(0xB, entry.i_class)
+        self.assertFalse(entry.is_sub_instruction)
+        self.assertIn("has_extendable_imm", entry.flags)
+        self.assertEqual(["Rd", "Rs", "Ii"], [op.name for op in entry.operands])
+        self.assertEqual("IntRegs", entry.operands[0].reg_class)
+        self.assertIn("is_out_operand", entry.operands[0].flags)
+        self.assertEqual(16, entry.operands[2].width)
+        self.assertEqual(32, entry.operands[2].total_width)
+        self.assertEqual((" = add(,)", [0, 7, 8]), (entry.template_syntax, [op.syntax_offset for op in entry.operands]))
+        self.assertEqual(InsnFeature.CORE, entry.feature)
+        self.assertEqual(InsnFeature.HVX, self.db.find("V6_vaddw").feature)
+        self.assertIn("is_signed", entry.operands[2].flags)
+        self.assertIsNone(self.db.find("A2_does_not_exist"))
+
+        sub = self.db.find("SA1_addi")
+        self.assertTrue(sub.is_sub_instruction)
+        self.assertEqual("A", sub.namespace)
+        self.assertIsNone(sub.i_class)
+
+        call = self.db.find("J2_call")
+        self.assertIn("is_call", call.flags)
+        self.assertEqual(self.interface.normal_instructions["J2_call"].implicit_defs, call.implicit_defs)
+
+    def test_queries(self) -> None:
+        # The instructions of an i-class are in decoding order. Core, HVX and then system instructions.
+        features = list(InsnFeature)
+        i_class_2 = [
+            i.name
+            for i in sorted(self.interface.normal_instructions.values(), key=lambda i: features.index(i.feature))
+            if i.encoding.get_i_class() == 2
+        ]
+        self.assertEqual(i_class_2, [i.name for i in self.db.by_i_class(2)])
+        self.assertEqual(
+            sorted([i.name for i in self.interface.sub_instructions.values() if i.namespace.name == "L1"]),
+            sorted([i.name for i in self.db.by_namespace("L1")]),
+        )
+        self.assertEqual([], self.db.by_namespace("X"))
+
+        mask = self.interface.normal_instructions["A2_addi"].encoding.instruction_mask
+        self.assertIn("A2_addi", [i.name for i in self.db.by_mask(mask)])
+        self.assertTrue(all([i.mask == mask for i in self.db.by_mask(mask)]))
+
+        # R0 = add(R1,#0x10)
+        self.assertEqual("A2_addi", self.db.match(0xB001C200)[0].name)
+        # The core instructions behind invalid_decode are never probed by the C decoder.
+        core_0 = [i.name for i in self.db.by_i_class(0) if i.feature == InsnFeature.CORE]
+        unreachable = core_0[core_0.index("invalid_decode") :]
+        self.assertFalse(any(i.name in unreachable for i in self.db.match(0x00400000)))
+
+    def test_registers(self) -> None:
+        regs = self.db.registers("IntRegs")
+        self.assertEqual(32, len(regs))
+        self.assertEqual(list(range(32)), [r.hw_encoding for r in regs])
+        self.assertEqual(["sp"], regs[29].alias)
+        self.assertEqual("r29", regs[29].asm_name)
+        self.assertEqual(sum([len(r) for r in self.interface.hardware_regs.values()]), len(self.db.registers()))
+
+    def test_bad_file(self) -> None:
+        path = os.path.join(self.tmp_dir.name, "bad.db")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(UnexpectedException):
+            InstructionDatabase(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from InstructionDatabase import InstructionDatabase
+from LLVMImporter import LLVMImporter
+from PluginHarness import PluginHarness
+
+try:
+    import numpy as np  # noqa: F401
+
+    from CorpusGenerator import CorpusGenerator
+
+    numpy_missing = False
+except ImportError:
+    numpy_missing = True
+
+
+@unittest.skipIf(shutil.which("cc") is None, "No C compiler found")
+class TestPluginHarness(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.interface = LLVMImporter(False, test_mode=True)
+        cls.harness = PluginHarness(cls.interface)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.harness.close()
+
+    @staticmethod
+    def get_parse_bits(words) -> list:
+        return [(w >> 14) & 0x3 for w in words]
+
+    def assert_roundtrip(self, addr: int, text: str, expected: list) -> list:
+        """Assembles a packet, disassembles the words again and compares the text."""
+        words = self.harness.assemble([(addr, text)])[0]
+        self.assertIsNotNone(words, text)
+        self.assertEqual(expected, self.harness.text(words, addr))
+        return words
+
+    def test_asm_const_ext(self) -> None:
+        # The lower 6 bits are in the instruction. The extender holds all others.
+        words = self.assert_roundtrip(
+            0x1000, "R0 = add(R1,##0x12345678)", ["immext(##0x12345640)", "R0 = add(R1,##0x12345678)"]
+        )
+        self.assertEqual([0x01235159, 0xB001C700], words)
+        # Templates without extender are preferred.
+        self.assert_roundtrip(0x1000, "R0 = add(R1,##0x40)", ["R0 = add(R1,##0x40)"])
+
+    def test_asm_pc_relative(self) -> None:
+        # The offset is relative to the packet address. Not to the one of the instruction.
+        self.assert_roundtrip(0x2000, "jump 0x1000", ["jump 0x1000"])
+        self.assert_roundtrip(0x2000, "{ R0 = #0x1 ; jump 0x1000 }", ["R0 = ##0x1", "jump 0x1000"])
+        self.assert_roundtrip(0x2000, "jump 0x12345678", ["immext(##0x12343640)", "jump 0x12345678"])
+
+    def test_asm_new_value(self) -> None:
+        words = self.assert_roundtrip(
+            0x1000,
+            "{ R1 = add(R2,#0x1) ; R3 = #0x5 ; memw(R0+#0x0) = R1.new }",
+            ["R1 = add(R2,##0x1)", "R3 = ##0x5", "memw(R0+##0x0) = R1.new"],
+        )
+        # The producer is two instructions ahead.
+        self.assertEqual(4, (words[2] >> 8) & 0x7)
+        # Constant extenders are no producers.
+        words = self.assert_roundtrip(
+            0x1000,
+            "{ R1 = ##0x12345678 ; R2 = #0x1 ; memw(R0+#0x0) = R1.new }",
+            ["immext(##0x12345640)", "R1 = ##0x12345678", "R2 = ##0x1", "memw(R0+##0x0) = R1.new"],
+        )
+        self.assertEqual(4, (words[3] >> 8) & 0x7)
+        # No instruction of the packet produces R1.
+        self.assertEqual([None], self.harness.assemble([(0x1000, "{ R2 = #0x1 ; memw(R0+#0x0) = R1.new }")]))
+
+    def test_asm_endloop(self) -> None:
+        words = self.assert_roundtrip(0x2000, "{ R0 = #0x1 ; R1 = #0x2 }:endloop0", ["R0 = ##0x1", "R1 = ##0x2"])
+        self.assertEqual([0b10, 0b11], self.get_parse_bits(words))
+        words = self.assert_roundtrip(
+            0x2000, "{ R0 = #0x1 ; R1 = #0x2 ; R2 = #0x3 }:endloop1", ["R0 = ##0x1", "R1 = ##0x2", "R2 = ##0x3"]
+        )
+        self.assertEqual([0b01, 0b10, 0b11], self.get_parse_bits(words))
+        words = self.assert_roundtrip(
+            0x2000, "{ R0 = #0x1 ; R1 = #0x2 ; R2 = #0x3 }:endloop01", ["R0 = ##0x1", "R1 = ##0x2", "R2 = ##0x3"]
+        )
+        self.assertEqual([0b10, 0b10, 0b11], self.get_parse_bits(words))
+        # The parse bits of the second instruction mark the end of loop 1.
+        self.assertEqual([None], self.harness.assemble([(0x2000, "{ R0 = #0x1 ; R1 = #0x2 }:endloop1")]))
+
+    def test_asm_sign(self) -> None:
+        self.assert_roundtrip(0x1000, "R0 = add(R1,#-1)", ["R0 = add(R1,##-0x1)"])
+        self.assert_roundtrip(0x1000, "R0 = add(R1,-0x10)", ["R0 = add(R1,##-0x10)"])
+        self.assert_roundtrip(0x1000, "memw(R29+#-8) = R1", ["memw(SP+##-0x8) = R1"])
+        # A '-' after a register is no sign.
+        self.assertEqual([None], self.harness.assemble([(0x1000, "R0 = add(R1 -1)")]))
+
+    @unittest.skipIf(numpy_missing, "numpy is not installed")
+    def test_asm_roundtrip_corpus(self) -> None:
+        addr = 0x1000
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "hexagon.db")
+            self.interface.write_instruction_db(path)
+            with InstructionDatabase(path) as db:
+                words = CorpusGenerator(db, 4).generate(20000, ext_ratio=0.3, new_ratio=0.3, loop_ratio=0.2).tolist()
+        text = self.harness.text(words, addr)
+        parse_bits = self.get_parse_bits(words)
+        # Packets without duplexes and invalid instructions. The assembler adds the constant extenders itself.
+        packets = []
+        start = 0
+        for i, bits in enumerate(parse_bits):
+            if bits != 0b11 and bits != 0b00 and i - start < 3:
+                continue
+            insns = [t for t in text[start : i + 1] if not t.startswith("immext")]
+            if bits == 0b11 and "invalid" not in insns:
+                loop = ["", ":endloop0", ":endloop1", ":endloop01"][
+                    (parse_bits[start] == 0b10) | (i > start and parse_bits[start + 1] == 0b10) << 1
+                ]
+                packets.append((start, i + 1, "{ " + " ; ".join(insns) + " }" + loop))
+            start = i + 1
+        # Replace each packet with the assembled one. An extended immediate which fits into its operand is encoded
+        # without extender. Those packets are kept. Otherwise the addresses of all following ones change.
+        replaced = 0
+        for (start, end, pkt_text), pkt_words in zip(
+            packets, self.harness.assemble([(addr + s * 4, t) for s, _, t in packets])
+        ):
+            self.assertIsNotNone(pkt_words, pkt_text)
+            if len(pkt_words) == end - start:
+                words[start:end] = pkt_words
+                replaced += 1
+        self.assertGreater(replaced, len(packets) * 0.9)
+        self.assertEqual(text, self.harness.text(words, addr))
+        self.assertEqual(parse_bits, self.get_parse_bits(words))
+
+    def assert_redecode(self, words, addr: int) -> None:
+        insns = self.harness.insns(words, addr)
+        self.assertEqual(insns, self.harness.insns(words, addr, redecode=True))
+
+    def test_redecode(self) -> None:
+        # Extended immediate, chained extenders, extended duplex.
+        self.assert_redecode([0xB426F4F4, 0x0000400F, 0x0000C001, 0xB426F4F4, 0x00007FFF, 0x2A002001], 0x1000)
+
+    @unittest.skipIf(numpy_missing, "numpy is not installed")
+    def test_redecode_corpus(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "hexagon.db")
+            self.interface.write_instruction_db(path)
+            with InstructionDatabase(path) as db:
+                words = CorpusGenerator(db, 3).generate(20000, ext_ratio=0.3, new_ratio=0.3, loop_ratio=0.2)
+        self.assert_redecode(words, 0x1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
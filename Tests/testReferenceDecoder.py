@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from InstructionDatabase import InstructionDatabase
+from LLVMImporter import LLVMImporter
+
+try:
+    import numpy as np
+
+    from CorpusGenerator import CorpusGenerator
+    from PluginHarness import PluginHarness
+    from ReferenceDecoder import ReferenceDecoder
+
+    numpy_missing = False
+except ImportError:
+    numpy_missing = True
+
+
+@unittest.skipIf(numpy_missing, "numpy is not installed")
+class TestReferenceDecoder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = LLVMImporter(False, test_mode=True)
+        self.decoder = ReferenceDecoder(
+            self.interface.normal_instructions,
+            self.interface.sub_instructions,
+            self.interface.hardware_regs,
+        )
+
+    def test_decode_normal(self) -> None:
+        words = [0xB426F4F4, 0xBBDA5659, 0xBC0DDCB6]
+        decoded = self.decoder.decode(words, 0x1000)
+        self.assertEqual(["A2_addi"] * 3, [self.decoder.name(decoded, i) for i in range(3)])
+        self.assertEqual("R20 = add(R6,##0x43a7)", self.decoder.text(decoded, 0))
+        self.assertEqual("R25 = add(R26,##-0x434e)", self.decoder.text(decoded, 1))
+        self.assertEqual("R22 = add(R13,##-0x3f1b)", self.decoder.text(decoded, 2))
+        self.assertEqual([0x1000, 0x1004, 0x1004], decoded.pkt_addrs.tolist())
+
+    def test_decode_duplex(self) -> None:
+        decoded = self.decoder.decode([0x2A002001])
+        self.assertTrue(decoded.is_duplex[0])
+        self.assertEqual("SA1_seti;SA1_addi", self.decoder.name(decoded, 0))
+        self.assertEqual("R0 = ##0x20 ; R1 = add(R1,##0x0)", self.decoder.text(decoded, 0))
+
+    def test_extend_duplex(self) -> None:
+        # Only the high sub-instruction is decoded at the address after the extender.
+        decoded = self.decoder.decode([0x00007FFF, 0x2A002001])
+        self.assertEqual("R0 = ##0xfffe0 ; R1 = add(R1,##0x0)", self.decoder.text(decoded, 1))
+
+    def test_extend_chained(self) -> None:
+        # The immediate of the second extender is extended by the first one.
+        decoded = self.decoder.decode([0x0000400F, 0x0000C001, 0xB426F4F4])
+        self.assertEqual("immext(##0x3c1)", self.decoder.text(decoded, 1))
+        self.assertEqual("R20 = add(R6,##0x3e7)", self.decoder.text(decoded, 2))
+
+    def test_decode_invalid(self) -> None:
+        decoded = self.decoder.decode([0x00000000])
+        self.assertEqual(-1, decoded.ids[0, 0])
+        self.assertEqual("invalid", self.decoder.text(decoded, 0))
+
+    def test_decode_invalid_duplex(self) -> None:
+        # Duplex class 15 is reserved.
+        decoded = self.decoder.decode([0xE0002000])
+        self.assertTrue(decoded.is_duplex[0])
+        self.assertEqual("invalid ; invalid", self.decoder.text(decoded, 0))
+
+    def test_pkt_max_insns(self) -> None:
+        # A packet ends after four instructions even without end parse bits.
+        decoded = self.decoder.decode([0xB42674F4] * 6, 0x1000)
+        self.assertEqual([0x1000] * 4 + [0x1010] * 2, decoded.pkt_addrs.tolist())
+
+    def test_config(self) -> None:
+        decoder = ReferenceDecoder(
+            self.interface.normal_instructions,
+            self.interface.sub_instructions,
+            self.interface.hardware_regs,
+            show_hash=False,
+            sign_nums=False,
+        )
+        decoded = decoder.decode([0xBBDA5659])
+        self.assertEqual("R25 = add(R26,0xffffbcb2)", decoder.text(decoded, 0))
+
+    def test_from_db(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "hexagon.db")
+            self.interface.write_instruction_db(path)
+            with InstructionDatabase(path) as db:
+                db_decoder = ReferenceDecoder.from_db(db)
+        # The database orders the templates by i-class. So only the order inside of each table is the same.
+        for c in range(0x10):
+            self.assertEqual(
+                [self.decoder.templates[t].name for t in self.decoder.normal_tables[c].indices],
+                [db_decoder.templates[t].name for t in db_decoder.normal_tables[c].indices],
+            )
+        words = np.random.default_rng(1).integers(0, 1 << 32, 5000, dtype=np.uint32)
+        decoded = self.decoder.decode(words, 0x1000)
+        db_decoded = db_decoder.decode(words, 0x1000)
+        self.assertEqual(
+            [[self.decoder.templates[t].name if t >= 0 else None for t in ids] for ids in decoded.ids.tolist()],
+            [[db_decoder.templates[t].name if t >= 0 else None for t in ids] for ids in db_decoded.ids.tolist()],
+        )
+        for i in range(len(words)):
+            self.assertEqual(self.decoder.text(decoded, i), db_decoder.text(db_decoded, i))
+
+
+@unittest.skipIf(numpy_missing, "numpy is not installed")
+@unittest.skipIf(shutil.which("cc") is None, "No C compiler found")
+class TestReferenceDecoderPlugin(unittest.TestCase):
+    """Compares the ReferenceDecoder with the generated C decoder."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.interface = LLVMImporter(False, test_mode=True)
+        cls.decoder = ReferenceDecoder(
+            cls.interface.normal_instructions, cls.interface.sub_instructions, cls.interface.hardware_regs
+        )
+        cls.harness = PluginHarness(cls.interface)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.harness.close()
+
+    def test_corpus_text(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "hexagon.db")
+            self.interface.write_instruction_db(path)
+            with InstructionDatabase(path) as db:
+                words = CorpusGenerator(db, 2).generate(20000, ext_ratio=0.3, new_ratio=0.3, loop_ratio=0.2)
+        decoded = self.decoder.decode(words, 0x1000)
+        self.assertEqual([self.decoder.text(decoded, i) for i in range(len(words))], self.harness.text(words, 0x1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@
 
 import unittest
 
+from HardwareRegister import HardwareRegister
 from Instruction import Instruction
 from LLVMImporter import LLVMImporter
 
@@ -39,3 +40,16 @@ class TestRegister(unittest.TestCase):
         self.assertEqual(2, instr.operands["Ru32"].syntax_index)
         self.assertEqual(3, instr.operands["Ii"].syntax_index)
         self.assertEqual(4, instr.operands["Nt8"].syntax_index)
+
+    def test_remap_reg_bits(self):
+        self.assertEqual(7, HardwareRegister.remap_reg_bits("GeneralSubRegs", 7))
+        self.assertEqual(0x10, HardwareRegister.remap_reg_bits("GeneralSubRegs", 8))
+        self.assertEqual(6, HardwareRegister.remap_reg_bits("GeneralDoubleLow8Regs", 3))
+        self.assertEqual(0x10, HardwareRegister.remap_reg_bits("GeneralDoubleLow8Regs", 4))
+        self.assertEqual(7, HardwareRegister.remap_reg_bits("ModRegs", 1))
+        self.assertEqual(13, HardwareRegister.remap_reg_bits("IntRegs", 13))
+
+    def test_reg_operand_bits(self):
+        bits = self.interface.get_reg_operand_bits()
+        self.assertEqual(5, bits["IntRegs"])
+        self.assertEqual(4, bits["GeneralSubRegs"])
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import unittest
+
+from LLVMImporter import LLVMImporter
+
+
+class TestRegisterSets(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = LLVMImporter(False, test_mode=True)
+        self.reg_sets = self.interface.reg_sets
+
+    def test_get_set(self) -> None:
+        self.assertEqual(0x2, self.reg_sets.get_set("R1").bits["gpr"])
+        # Double registers are split into their sub-registers.
+        self.assertEqual(0xC, self.reg_sets.get_set("D1").bits["gpr"])
+        self.assertEqual(0xF, self.reg_sets.get_set("P3_0").bits["pred"])
+        self.assertTrue(self.reg_sets.get_set("G0").is_empty())
+
+    def test_implicit_sets(self) -> None:
+        call = self.interface.normal_instructions["J2_call"]
+        index = self.reg_sets.get_implicit_index(call.implicit_defs)
+        self.assertNotEqual(0, index)
+        defs = self.reg_sets.implicit_sets[index]
+        self.assertTrue(defs.bits["gpr"] & (1 << 31))
+        self.assertEqual(0, self.reg_sets.get_implicit_index([]))
+        self.assertIn(".implicit_write = {}".format(index), call.get_template_in_c(self.reg_sets))
+
+    def test_in_operand_flag(self) -> None:
+        self.assertIn("HEX_OP_TEMPLATE_FLAG_REG_IN", self.interface.normal_instructions["A2_addi"].get_template_in_c())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+from TblgenCache import TblgenCache
+
+# Stand-in for llvm-tblgen. Writes the number of its runs as json to the -o path.
+STAND_IN_TBLGEN = """#!{python}
+import sys
+with open("{runs}", "a") as f:
+    f.write("x")
+with open("{runs}") as f:
+    runs = len(f.read())
+with open(sys.argv[sys.argv.index("-o") + 1], "w") as f:
+    f.write('{{"runs": %d}}' % runs)
+"""
+
+
+class TestTblgenCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.hexagon_dir = os.path.join(self.tmp.name, "Hexagon")
+        self.include_dir = os.path.join(self.tmp.name, "include")
+        os.makedirs(self.hexagon_dir)
+        os.makedirs(self.include_dir)
+        self.write(os.path.join(self.hexagon_dir, "Hexagon.td"), "include Target.td")
+        self.write(os.path.join(self.include_dir, "Target.td"), "class Target;")
+
+        self.tblgen = os.path.join(self.tmp.name, "tblgen")
+        self.write(self.tblgen, STAND_IN_TBLGEN.format(python=sys.executable, runs=self.tmp.name + "/runs"))
+        os.chmod(self.tblgen, os.stat(self.tblgen).st_mode | stat.S_IEXEC)
+        self.cache = TblgenCache(os.path.join(self.tmp.name, "cache"), self.hexagon_dir, self.include_dir, self.tblgen)
+        self.out = os.path.join(self.tmp.name, "Hexagon.json")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    @staticmethod
+    def write(path: str, content: str) -> None:
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read_out(self) -> str:
+        with open(self.out) as f:
+            return f.read()
+
+    def test_reuse_json(self) -> None:
+        self.assertTrue(self.cache.generate_json("abcdef0123456789", self.out))
+        self.assertEqual('{"runs": 1}', self.read_out())
+        os.remove(self.out)
+        self.assertTrue(self.cache.generate_json("abcdef0123456789", self.out))
+        self.assertEqual('{"runs": 1}', self.read_out())
+        # Forced run
+        self.assertTrue(self.cache.generate_json("abcdef0123456789", self.out, use_cache=False))
+        self.assertEqual('{"runs": 2}', self.read_out())
+
+    def test_key(self) -> None:
+        key = self.cache.get_key("abcdef0123456789")
+        self.assertTrue(key.startswith("abcdef012345-"))
+        self.assertNotEqual(key, self.cache.get_key("0123456789abcdef"))
+        # Uncommitted changes of included .td files
+        self.write(os.path.join(self.include_dir, "Target.td"), "class Target; class Register;")
+        self.assertNotEqual(key, self.cache.get_key("abcdef0123456789"))
+
+    def test_key_tblgen_binary(self) -> None:
+        key = self.cache.get_key("abcdef0123456789")
+        # Another tblgen binary under the same path.
+        with open(self.tblgen, "a") as f:
+            f.write("# rebuilt\n")
+        self.assertNotEqual(key, self.cache.get_key("abcdef0123456789"))
+
+    def test_failed_tblgen(self) -> None:
+        self.cache.tblgen = os.path.join(self.tmp.name, "false")
+        self.write(self.cache.tblgen, "#!/bin/sh\nexit 1\n")
+        os.chmod(self.cache.tblgen, os.stat(self.cache.tblgen).st_mode | stat.S_IEXEC)
+        self.assertFalse(self.cache.generate_json("abcdef0123456789", self.out))
+        self.assertFalse(os.path.exists(self.cache.cache_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
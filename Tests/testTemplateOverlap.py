@@ -0,0 +1,35 @@
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import unittest
+
+from LLVMImporter import LLVMImporter
+from TemplateOverlap import get_overlapping_pairs
+
+
+class TestTemplateOverlap(unittest.TestCase):
+    def setUp(self) -> None:
+        self.interface = LLVMImporter(False, test_mode=True)
+
+    def test_overlapping_pairs(self) -> None:
+        encodings = [
+            (0xF0000000, 0x10000000),  # 0001 ....
+            (0xFF000000, 0x12000000),  # 0001 0010 .... -> shadowed by 0
+            (0x0F000000, 0x02000000),  # .... 0010 .... -> overlaps with 0 and 1
+            (0xF0000000, 0x20000000),  # 0010 ....      -> overlaps with 2
+            (0x00000000, 0x00000000),  # Matches everything -> overlaps with all
+        ]
+        overlapping, shadowing = get_overlapping_pairs(encodings)
+        self.assertEqual([(0, 1), (0, 2), (1, 2), (2, 3), (0, 4), (1, 4), (2, 4), (3, 4)], overlapping)
+        self.assertEqual([(0, 1)], shadowing)
+
+    def test_overlap_index(self) -> None:
+        index = self.interface.overlap_index
+        self.assertIn("UNDOCUMENTED_SA2_TFRSI", index.get_overlapping("SA1_seti"))
+        self.assertIn(["SA1_seti", "UNDOCUMENTED_SA2_TFRSI"], index.get_index()["sub_A"]["overlaps"])
+        self.assertNotIn("invalid_decode", index.get_index()["normal_0x0"]["templates"])
+
+
+if __name__ == "__main__":
+    unittest.main()
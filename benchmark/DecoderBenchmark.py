@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+
+import argparse
+import json
+import os
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from helperFunctions import log, LogLevel  # noqa: E402
+from PluginHarness import build_plugin  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+# Measurements are machine specific. So the baseline is a local file and not checked in.
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.local.json")
+
+MODES = ["disasm", "analysis", "mixed"]
+
+ELF_SHF_EXECINSTR = 0x4
+
+
+def get_elf_code(path: str) -> tuple:
+    """Returns the address of the first executable section and the concatenated bytes of all executable sections
+    of a 32bit little endian ELF file.
+    """
+    with open(path, "rb") as f:
+        elf = f.read()
+    if elf[:4] != b"\x7fELF" or elf[4] != 1 or elf[5] != 1:
+        raise ValueError("{} is not a 32bit little endian ELF file.".format(path))
+    sh_off, _, _, _, _, sh_ent_size, sh_num, _ = struct.unpack_from("<IIHHHHHH", elf, 0x20)
+    code = b""
+    addr = None
+    for i in range(sh_num):
+        _, sh_type, flags, sh_addr, offset, size = struct.unpack_from("<IIIIII", elf, sh_off + i * sh_ent_size)
+        if sh_type != 1 or not flags & ELF_SHF_EXECINSTR:  # SHT_PROGBITS
+            continue
+        addr = sh_addr if addr is None else addr
+        code += elf[offset : offset + size]
+    return addr or 0, code
+
+
+def synthetic_random(rng: random.Random, n: int) -> bytes:
+    """Uniformly random words. Mostly invalid instructions and broken packets."""
+    return rng.randbytes(n * 4)
+
+
+def get_inputs(args) -> dict:
+    """Returns the benchmark inputs as name -> (address, code)."""
+    inputs = dict()
+    for path in args.binaries:
+        inputs[os.path.basename(path)] = get_elf_code(path)
+    if os.path.exists(args.db):
+        from CorpusGenerator import CorpusGenerator
+        from InstructionDatabase import InstructionDatabase
+
+        with InstructionDatabase(args.db) as db:
+            # Plain packets of random instructions and duplexes.
+            valid = CorpusGenerator(db, args.seed).generate(
+                args.words, ext_ratio=0, new_ratio=0, duplex_ratio=args.duplex_ratio, loop_ratio=0
+            )
+            corpus = CorpusGenerator(db, args.seed).generate(args.words, duplex_ratio=args.duplex_ratio)
+        inputs["synthetic-valid"] = (0, valid.astype("<u4").tobytes())
+        inputs["synthetic-corpus"] = (0, corpus.astype("<u4").tobytes())
+    else:
+        log("{} not found. Skip the synthetic-valid and synthetic-corpus inputs.".format(args.db), LogLevel.WARNING)
+    inputs["synthetic-random"] = (0, synthetic_random(random.Random(args.seed), args.words))
+    return inputs
+
+
+def run(bench_bin: str, inputs: dict, repeats: int) -> dict:
+    """Runs each input in each mode and returns name -> mode -> metrics."""
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (addr, code) in inputs.items():
+            path = os.path.join(tmp, name + ".bin")
+            with open(path, "wb") as f:
+                f.write(code)
+            results[name] = dict()
+            for mode in MODES:
+                out = subprocess.run(
+                    [bench_bin, path, mode, str(repeats), hex(addr)], check=True, capture_output=True, text=True
+                ).stdout
+                m = dict(kv.split("=") for kv in out.split())
+                insns, packets, ns = int(m["insns"]), int(m["packets"]), int(m["ns"])
+                results[name][mode] = {
+                    "insns": insns,
+                    "packets": packets,
+                    "insn_per_s": round(insns / (ns / 1e9)),
+                    "ns_per_packet": round(ns / max(packets, 1), 1),
+                }
+    return results
+
+
+def print_results(results: dict, baseline: dict) -> None:
+    header = "{:<22} {:<9} {:>10} {:>14} {:>14}".format("input", "mode", "insns", "insn/s", "ns/packet")
+    if baseline:
+        header += " {:>10}".format("vs. base")
+    print(header)
+    for name, modes in results.items():
+        for mode, r in modes.items():
+            line = "{:<22} {:<9} {:>10} {:>14,} {:>14.1f}".format(
+                name, mode, r["insns"], r["insn_per_s"], r["ns_per_packet"]
+            )
+            base = baseline.get(name, dict()).get(mode)
+            if base:
+                line += " {:>+9.1f}%".format((r["insn_per_s"] / base["insn_per_s"] - 1) * 100)
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Benchmark the generated Hexagon decoder.")
+    parser.add_argument(
+        "--rizin-dir",
+        default=os.path.join(ROOT_DIR, "rizin/librz"),
+        help="The librz directory with the generated plugin (default: the generator output).",
+    )
+    parser.add_argument(
+        "--binaries",
+        nargs="*",
+        default=[os.path.join(ROOT_DIR, "test-bins/hexagon-hello-loop"), os.path.join(ROOT_DIR, "test-bins/main.o")],
+        help="ELF files whose executable sections are decoded.",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join(ROOT_DIR, "hexagon.db"),
+        help="Instruction database (LLVMImporter.py --export-db). The synthetic valid inputs are generated "
+        "from it with CorpusGenerator.py. One with constant extenders, new-value stores and hardware loops.",
+    )
+    parser.add_argument("--words", type=int, default=1 << 20, help="Number of words of each synthetic input.")
+    parser.add_argument("--duplex-ratio", type=float, default=0.2, help="Ratio of packets ending with a duplex.")
+    parser.add_argument("--seed", type=int, default=0x6865)
+    parser.add_argument("--repeats", type=int, default=5, help="The fastest of the repetitions is reported.")
+    parser.add_argument("--cc", default=os.environ.get("CC", "cc"))
+    parser.add_argument("--cflags", default="-O2 -DNDEBUG", help="Compiler flags (space separated).")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Write the results to benchmark/baseline.local.json."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        bench_bin = os.path.join(build_dir, "bench_decoder")
+        build_plugin(
+            bench_bin, args.rizin_dir, os.path.join(BENCH_DIR, "bench_decoder.c"), args.cc, args.cflags.split()
+        )
+        results = run(bench_bin, get_inputs(args), args.repeats)
+
+    baseline = dict()
+    if os.path.exists(BASELINE_PATH) and not args.save_baseline:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"cc": args.cc, "cflags": args.cflags, "words": args.words, "results": results}, f, indent=2)
+            f.write("\n")
+        log("Baseline written to {}".format(BASELINE_PATH))
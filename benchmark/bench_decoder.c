@@ -0,0 +1,139 @@
+// SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+// SPDX-License-Identifier: LGPL-3.0-only
+
+/**
+ * \file bench_decoder.c
+ * Measures the decoding throughput of the generated Hexagon plugins.
+ *
+ * Usage: bench_decoder <file> <disasm|analysis|mixed> <repeats> [address]
+ *
+ * <file> holds the raw little endian instruction words. They are decoded linearly,
+ * the way rizin does it with "pd" or "aa". Every repetition uses fresh plugin instances.
+ * The fastest repetition is printed as: "insns=<n> packets=<n> ns=<n>"
+ */
+
+#include <rz_asm.h>
+#include <rz_analysis.h>
+#include <time.h>
+
+extern RzAsmPlugin rz_asm_plugin_hexagon;
+extern RzAnalysisPlugin rz_analysis_plugin_hexagon;
+
+typedef enum {
+	BENCH_DISASM = 1 << 0,
+	BENCH_ANALYSIS = 1 << 1,
+	BENCH_MIXED = BENCH_DISASM | BENCH_ANALYSIS,
+} BenchMode;
+
+static ut64 now_ns() {
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return (ut64)ts.tv_sec * 1000000000 + ts.tv_nsec;
+}
+
+static ut8 *read_file(const char *path, size_t *size) {
+	FILE *f = fopen(path, "rb");
+	if (!f) {
+		return NULL;
+	}
+	fseek(f, 0, SEEK_END);
+	long len = ftell(f);
+	fseek(f, 0, SEEK_SET);
+	ut8 *buf = len > 0 ? malloc(len) : NULL;
+	if (!buf || fread(buf, 1, len, f) != (size_t)len) {
+		free(buf);
+		fclose(f);
+		return NULL;
+	}
+	fclose(f);
+	*size = len;
+	return buf;
+}
+
+/**
+ * \brief Decodes all words once with new plugin instances.
+ *
+ * \return ut64 The time spent decoding in ns. 0 on failure.
+ */
+static ut64 bench_run(const ut8 *buf, size_t size, BenchMode mode, ut32 addr) {
+	RzAsm a = { 0 };
+	RzAnalysis analysis = { 0 };
+	if ((rz_asm_plugin_hexagon.init && !rz_asm_plugin_hexagon.init(&a.plugin_data)) ||
+		(rz_analysis_plugin_hexagon.init && !rz_analysis_plugin_hexagon.init(&analysis.plugin_data))) {
+		return 0;
+	}
+
+	ut64 start = now_ns();
+	for (size_t i = 0; i + 4 <= size; i += 4) {
+		if (mode & BENCH_DISASM) {
+			RzAsmOp op = { 0 };
+			a.pc = addr + i;
+			rz_asm_plugin_hexagon.disassemble(&a, &op, buf + i, 4);
+			rz_strbuf_fini(&op.buf_asm);
+			free(op.asm_toks);
+		}
+		if (mode & BENCH_ANALYSIS) {
+			RzAnalysisOp op = { 0 };
+			rz_analysis_plugin_hexagon.op(&analysis, &op, addr + i, buf + i, 4, RZ_ANALYSIS_OP_MASK_ALL);
+			free(op.mnemonic);
+		}
+	}
+	ut64 elapsed = now_ns() - start;
+
+	if (rz_asm_plugin_hexagon.fini) {
+		rz_asm_plugin_hexagon.fini(a.plugin_data);
+	}
+	if (rz_analysis_plugin_hexagon.fini) {
+		rz_analysis_plugin_hexagon.fini(analysis.plugin_data);
+	}
+	return elapsed ? elapsed : 1;
+}
+
+int main(int argc, char **argv) {
+	if (argc < 4) {
+		fprintf(stderr, "Usage: %s <file> <disasm|analysis|mixed> <repeats> [address]\n", argv[0]);
+		return 1;
+	}
+	BenchMode mode;
+	if (!strcmp(argv[2], "disasm")) {
+		mode = BENCH_DISASM;
+	} else if (!strcmp(argv[2], "analysis")) {
+		mode = BENCH_ANALYSIS;
+	} else if (!strcmp(argv[2], "mixed")) {
+		mode = BENCH_MIXED;
+	} else {
+		fprintf(stderr, "Unknown mode: %s\n", argv[2]);
+		return 1;
+	}
+	int repeats = atoi(argv[3]);
+	ut32 addr = argc > 4 ? strtoul(argv[4], NULL, 0) : 0;
+
+	size_t size = 0;
+	ut8 *buf = read_file(argv[1], &size);
+	if (!buf) {
+		fprintf(stderr, "Could not read %s\n", argv[1]);
+		return 1;
+	}
+
+	ut64 insns = size / 4;
+	ut64 packets = 0;
+	for (size_t i = 0; i + 4 <= size; i += 4) {
+		ut8 parse_bits = (rz_read_le32(buf + i) >> 14) & 0x3;
+		// Parse bits 0b11 end a packet, 0b00 marks a duplex which always ends a packet.
+		packets += (parse_bits == 0x3 || parse_bits == 0x0);
+	}
+
+	ut64 best = UT64_MAX;
+	for (int r = 0; r < repeats; r++) {
+		ut64 t = bench_run(buf, size, mode, addr);
+		if (!t) {
+			fprintf(stderr, "Plugin initialization failed.\n");
+			free(buf);
+			return 1;
+		}
+		best = RZ_MIN(best, t);
+	}
+	printf("insns=%" PFMT64u " packets=%" PFMT64u " ns=%" PFMT64u "\n", insns, packets, best);
+	free(buf);
+	return 0;
+}
@@ -0,0 +1,221 @@
+// SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+// SPDX-License-Identifier: LGPL-3.0-only
+
+/**
+ * \file check_decoder.c
+ * Checks the generated Hexagon plugin with the rizin shim. It is driven by PluginHarness.py.
+ *
+ * Usage: check_decoder <check> <file> [address]
+ *
+ * <file> holds the raw little endian instruction words. They are decoded linearly, like rizin does it with "pd".
+ *
+ * text: Prints "<address> <text>" of every word. The text has no packet indicators.
+ *       Duplexes are printed as "<high> ; <low>".
+ * insns: Prints "<address> <text> |" and the operands ("<type>:<attr>:<shift>:<value>") of every instruction.
+ *        Sub-instructions are printed in their own lines.
+ * redecode: Like insns. But the instructions are decoded again with hex_insn_redecode() before they are printed.
+ *
+ * Usage: check_decoder asm <file>
+ *
+ * asm: <file> holds one packet per line as "<address> <text>". Each packet is assembled with hexagon_assemble_packet()
+ *      and its words are printed in a line. Or "error" if it could not be assembled.
+ */
+
+#include <rz_asm.h>
+#include "hexagon.h"
+#include "hexagon_insn.h"
+#include "hexagon_arch.h"
+
+extern RzAsmPlugin rz_asm_plugin_hexagon;
+
+static ut8 *read_file(const char *path, size_t *size) {
+	FILE *f = fopen(path, "rb");
+	if (!f) {
+		return NULL;
+	}
+	fseek(f, 0, SEEK_END);
+	long len = ftell(f);
+	fseek(f, 0, SEEK_SET);
+	// Null terminated for the text of the asm check.
+	ut8 *buf = len > 0 ? malloc(len + 1) : NULL;
+	if (!buf || fread(buf, 1, len, f) != (size_t)len) {
+		free(buf);
+		fclose(f);
+		return NULL;
+	}
+	fclose(f);
+	buf[len] = '\0';
+	*size = len;
+	return buf;
+}
+
+/**
+ * \brief Returns the buffered instruction container at \p addr and its packet. Or NULL if it is not buffered.
+ */
+static HexInsnContainer *get_hic(HexState *state, ut32 addr, RZ_OUT HexPkt **pkt) {
+	for (size_t i = 0; i < HEXAGON_STATE_PKTS; i++) {
+		RzListIter *it;
+		HexInsnContainer *hic;
+		rz_list_foreach (state->pkts[i].bin, it, hic) {
+			if (hic->addr == addr) {
+				*pkt = &state->pkts[i];
+				return hic;
+			}
+		}
+	}
+	return NULL;
+}
+
+/**
+ * \brief Writes the text of \p hic without packet indicators into \p sb.
+ */
+static void get_infix_text(const HexState *state, const HexInsnContainer *hic, RZ_OUT RzStrBuf *sb) {
+	if (hic->is_duplex) {
+		rz_strbuf_set(sb, hex_str_arena_get(state, hic->bin.sub[0]->text_infix));
+		rz_strbuf_append(sb, " ; ");
+		rz_strbuf_append(sb, hex_str_arena_get(state, hic->bin.sub[1]->text_infix));
+	} else {
+		rz_strbuf_set(sb, hex_str_arena_get(state, hic->bin.insn->text_infix));
+	}
+}
+
+static void print_insn(const HexState *state, const HexInsn *hi) {
+	printf("%08" PFMT32x " %s |", hi->addr, hex_str_arena_get(state, hi->text_infix));
+	for (size_t i = 0; i < hi->op_count; i++) {
+		const HexOp *op = &hi->ops[i];
+		st64 value = op->type == HEX_OP_TYPE_IMM ? op->op.imm : op->op.reg;
+		printf(" %u:%u:%u:%" PFMT64d, op->type, op->attr, op->shift, value);
+	}
+	printf("\n");
+}
+
+/**
+ * \brief Prints \p hi. If \p redecode is set a copy of it is decoded again and printed instead.
+ */
+static bool check_insn(HexState *state, const HexInsnContainer *hic, const HexPkt *pkt, const HexInsn *hi, bool redecode) {
+	if (!redecode) {
+		print_insn(state, hi);
+		return true;
+	}
+	HexInsn copy = *hi;
+	if (!hex_insn_redecode(state, hic, pkt, &copy) && hi->identifier != HEX_INS_INVALID_DECODE) {
+		fprintf(stderr, "Redecoding failed at 0x%" PFMT32x "\n", hi->addr);
+		return false;
+	}
+	print_insn(state, &copy);
+	return true;
+}
+
+static int check_text(const ut8 *buf, size_t size, ut32 addr) {
+	RzAsm a = { 0 };
+	if (!rz_asm_plugin_hexagon.init(&a.plugin_data)) {
+		return 1;
+	}
+	HexState *state = a.plugin_data;
+	RzStrBuf sb;
+	rz_strbuf_init(&sb);
+	for (size_t i = 0; i + 4 <= size; i += 4) {
+		RzAsmOp op = { 0 };
+		a.pc = addr + i;
+		rz_asm_plugin_hexagon.disassemble(&a, &op, buf + i, 4);
+		rz_strbuf_fini(&op.buf_asm);
+		free(op.asm_toks);
+		HexPkt *pkt;
+		HexInsnContainer *hic = get_hic(state, addr + i, &pkt);
+		if (!hic) {
+			fprintf(stderr, "No instruction buffered at 0x%" PFMT32x "\n", (ut32)(addr + i));
+			rz_strbuf_fini(&sb);
+			rz_asm_plugin_hexagon.fini(a.plugin_data);
+			return 1;
+		}
+		get_infix_text(state, hic, &sb);
+		printf("%08" PFMT32x " %s\n", (ut32)(addr + i), rz_strbuf_get(&sb));
+	}
+	rz_strbuf_fini(&sb);
+	rz_asm_plugin_hexagon.fini(a.plugin_data);
+	return 0;
+}
+
+static int check_insns(const ut8 *buf, size_t size, ut32 addr, bool redecode) {
+	RzAsm a = { 0 };
+	if (!rz_asm_plugin_hexagon.init(&a.plugin_data)) {
+		return 1;
+	}
+	HexState *state = a.plugin_data;
+	int ret = 0;
+	for (size_t i = 0; i + 4 <= size && !ret; i += 4) {
+		RzAsmOp op = { 0 };
+		a.pc = addr + i;
+		rz_asm_plugin_hexagon.disassemble(&a, &op, buf + i, 4);
+		rz_strbuf_fini(&op.buf_asm);
+		free(op.asm_toks);
+		HexPkt *pkt;
+		HexInsnContainer *hic = get_hic(state, addr + i, &pkt);
+		if (!hic) {
+			fprintf(stderr, "No instruction buffered at 0x%" PFMT32x "\n", (ut32)(addr + i));
+			ret = 1;
+		} else if (hic->is_duplex) {
+			ret = !check_insn(state, hic, pkt, hic->bin.sub[0], redecode) ||
+				!check_insn(state, hic, pkt, hic->bin.sub[1], redecode);
+		} else {
+			ret = !check_insn(state, hic, pkt, hic->bin.insn, redecode);
+		}
+	}
+	rz_asm_plugin_hexagon.fini(a.plugin_data);
+	return ret;
+}
+
+static int check_asm(char *text) {
+	char *line = text;
+	while (*line) {
+		char *line_end = strchr(line, '\n');
+		if (line_end) {
+			*line_end = '\0';
+		}
+		char *pkt_text;
+		ut32 addr = strtoul(line, &pkt_text, 0);
+		ut32 words[4];
+		int count = hexagon_assemble_packet(pkt_text, addr, words, RZ_ARRAY_SIZE(words));
+		if (count < 0) {
+			printf("error");
+		}
+		for (int i = 0; i < count; i++) {
+			printf(i ? " %08" PFMT32x : "%08" PFMT32x, words[i]);
+		}
+		printf("\n");
+		if (!line_end) {
+			break;
+		}
+		line = line_end + 1;
+	}
+	return 0;
+}
+
+int main(int argc, char **argv) {
+	if (argc < 3) {
+		fprintf(stderr, "Usage: %s text|insns|redecode|asm <file> [address]\n", argv[0]);
+		return 1;
+	}
+	ut32 addr = argc > 3 ? strtoul(argv[3], NULL, 0) : 0;
+	size_t size = 0;
+	ut8 *buf = read_file(argv[2], &size);
+	if (!buf) {
+		fprintf(stderr, "Could not read %s\n", argv[2]);
+		return 1;
+	}
+	int ret;
+	if (!strcmp(argv[1], "text")) {
+		ret = check_text(buf, size, addr);
+	} else if (!strcmp(argv[1], "insns")) {
+		ret = check_insns(buf, size, addr, false);
+	} else if (!strcmp(argv[1], "redecode")) {
+		ret = check_insns(buf, size, addr, true);
+	} else if (!strcmp(argv[1], "asm")) {
+		ret = check_asm((char *)buf);
+	} else {
+		fprintf(stderr, "Unknown check: %s\n", argv[1]);
+		ret = 1;
+	}
+	free(buf);
+	return ret;
+}
@@ -0,0 +1,270 @@
+// SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+// SPDX-License-Identifier: LGPL-3.0-only
+
+/**
+ * \file rz_shim.c
+ * Implementation of the rizin API subset declared in rz_shim.h.
+ * The token string is not tokenized. So the regex cost of rizin is not part of the measurements.
+ */
+#include "rz_shim.h"
+#include <stdarg.h>
+#include <time.h>
+
+ut64 rz_time_now(void) {
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return (ut64)ts.tv_sec * 1000000 + ts.tv_nsec / 1000;
+}
+
+RzList *rz_list_newf(RzListFree f) {
+	RzList *l = calloc(1, sizeof(RzList));
+	l->free = f;
+	return l;
+}
+RzList *rz_list_new(void) {
+	return rz_list_newf(NULL);
+}
+static void list_unlink(RzList *l, RzListIter *it) {
+	if (it->p)
+		it->p->n = it->n;
+	else
+		l->head = it->n;
+	if (it->n)
+		it->n->p = it->p;
+	else
+		l->tail = it->p;
+	l->length--;
+}
+void rz_list_purge(RzList *l) {
+	if (!l)
+		return;
+	RzListIter *it = l->head;
+	while (it) {
+		RzListIter *n = it->n;
+		if (l->free)
+			l->free(it->data);
+		free(it);
+		it = n;
+	}
+	l->head = l->tail = NULL;
+	l->length = 0;
+}
+void rz_list_free(RzList *l) {
+	rz_list_purge(l);
+	free(l);
+}
+ut32 rz_list_length(const RzList *l) {
+	return l ? l->length : 0;
+}
+void *rz_list_get_n(const RzList *l, ut32 n) {
+	RzListIter *it = l ? l->head : NULL;
+	for (; it && n; n--)
+		it = it->n;
+	return it ? it->data : NULL;
+}
+void *rz_list_get_top(const RzList *l) {
+	return l && l->tail ? l->tail->data : NULL;
+}
+RzListIter *rz_list_append(RzList *l, void *d) {
+	RzListIter *it = calloc(1, sizeof(RzListIter));
+	it->data = d;
+	it->p = l->tail;
+	if (l->tail)
+		l->tail->n = it;
+	else
+		l->head = it;
+	l->tail = it;
+	l->length++;
+	return it;
+}
+RzListIter *rz_list_insert(RzList *l, ut32 n, void *d) {
+	if (n >= l->length)
+		return rz_list_append(l, d);
+	RzListIter *at = l->head;
+	for (; n; n--)
+		at = at->n;
+	RzListIter *it = calloc(1, sizeof(RzListIter));
+	it->data = d;
+	it->n = at;
+	it->p = at->p;
+	if (at->p)
+		at->p->n = it;
+	else
+		l->head = it;
+	at->p = it;
+	l->length++;
+	return it;
+}
+bool rz_list_delete_data(RzList *l, void *d) {
+	for (RzListIter *it = l->head; it; it = it->n) {
+		if (it->data == d) {
+			list_unlink(l, it);
+			if (l->free)
+				l->free(d);
+			free(it);
+			return true;
+		}
+	}
+	return false;
+}
+void *rz_list_pop_head(RzList *l) {
+	RzListIter *it = l->head;
+	if (!it)
+		return NULL;
+	void *d = it->data;
+	list_unlink(l, it);
+	free(it);
+	return d;
+}
+RzPVector *rz_pvector_new(void (*f)(void *)) {
+	(void)f;
+	return calloc(1, sizeof(RzPVector));
+}
+void **rz_pvector_push(RzPVector *v, void *x) {
+	v->a = realloc(v->a, sizeof(void *) * (v->len + 1));
+	v->a[v->len] = x;
+	return &v->a[v->len++];
+}
+void rz_pvector_free(RzPVector *v) {
+	if (v) {
+		free(v->a);
+		free(v);
+	}
+}
+void rz_strbuf_init(RzStrBuf *s) {
+	memset(s, 0, sizeof(*s));
+}
+bool rz_strbuf_set(RzStrBuf *s, const char *t) {
+	free(s->ptr);
+	s->ptr = strdup(t ? t : "");
+	s->len = strlen(s->ptr);
+	return true;
+}
+bool rz_strbuf_setbin(RzStrBuf *s, const ut8 *b, size_t l) {
+	free(s->ptr);
+	s->ptr = malloc(l + 1);
+	memcpy(s->ptr, b, l);
+	s->ptr[l] = 0;
+	s->len = l;
+	return true;
+}
+bool rz_strbuf_append_n(RzStrBuf *s, const char *t, size_t l) {
+	s->ptr = realloc(s->ptr, s->len + l + 1);
+	memcpy(s->ptr + s->len, t, l);
+	s->len += l;
+	s->ptr[s->len] = 0;
+	return true;
+}
+bool rz_strbuf_append(RzStrBuf *s, const char *t) {
+	return rz_strbuf_append_n(s, t, strlen(t));
+}
+bool rz_strbuf_appendf(RzStrBuf *s, const char *f, ...) {
+	char tmp[1024];
+	va_list ap;
+	va_start(ap, f);
+	vsnprintf(tmp, sizeof(tmp), f, ap);
+	va_end(ap);
+	return rz_strbuf_append(s, tmp);
+}
+char *rz_strbuf_get(RzStrBuf *s) {
+	return s->ptr ? s->ptr : "";
+}
+void rz_strbuf_fini(RzStrBuf *s) {
+	free(s->ptr);
+	s->ptr = NULL;
+	s->len = 0;
+}
+const char *rz_hex_ut2st_str(ut32 v, char *buf, int len) {
+	snprintf(buf, len, "%s0x%x", (st32)v < 0 ? "-" : "", (st32)v < 0 ? -(st32)v : v);
+	return buf;
+}
+void *rz_regex_new(const char *p, const char *f) {
+	(void)p;
+	(void)f;
+	return (void *)1;
+}
+void rz_asm_token_pattern_free(void *p) {
+	RzAsmTokenPattern *t = p;
+	if (t) {
+		free(t->pattern);
+		free(t);
+	}
+}
+RzAsmTokenString *rz_asm_tokenize_asm_regex(RzStrBuf *asm_str, RzPVector *patterns) {
+	(void)patterns;
+	RzAsmTokenString *t = calloc(1, sizeof(RzAsmTokenString));
+	t->str = asm_str;
+	return t;
+}
+#define MAX_NODES 64
+struct cfg_impl {
+	RzConfig c;
+	RzConfigNode nodes[MAX_NODES];
+	int n;
+};
+RzConfig *rz_config_new(void *user) {
+	struct cfg_impl *c = calloc(1, sizeof(*c));
+	c->c.user = user;
+	return &c->c;
+}
+void rz_config_free(RzConfig *c) {
+	free(c);
+}
+RzConfigNode *rz_config_node_get(RzConfig *c, const char *n) {
+	struct cfg_impl *ci = (struct cfg_impl *)c;
+	for (int i = 0; i < ci->n; i++)
+		if (!strcmp(ci->nodes[i].name, n))
+			return &ci->nodes[i];
+	return NULL;
+}
+static RzConfigNode *config_node_get_or_new(RzConfig *c, const char *n) {
+	struct cfg_impl *ci = (struct cfg_impl *)c;
+	RzConfigNode *node = rz_config_node_get(c, n);
+	if (!node) {
+		node = &ci->nodes[ci->n++];
+		node->name = strdup(n);
+	}
+	return node;
+}
+RzConfigNode *rz_config_set(RzConfig *c, const char *n, const char *v) {
+	RzConfigNode *node = config_node_get_or_new(c, n);
+	node->value = strdup(v);
+	node->i_value = !strcmp(v, "true") ? 1 : strtoull(v, NULL, 0);
+	// Like rizin: The setter gets the user of the configuration and the node with the new value.
+	if (node->setter && !node->setter(c->user, node)) {
+		return NULL;
+	}
+	return node;
+}
+RzConfigNode *rz_config_set_cb(RzConfig *c, const char *n, const char *v, RzConfigCallback cb) {
+	config_node_get_or_new(c, n)->setter = cb;
+	return rz_config_set(c, n, v);
+}
+RzConfigNode *rz_config_set_i_cb(RzConfig *c, const char *n, ut64 v, RzConfigCallback cb) {
+	char b[32];
+	snprintf(b, sizeof(b), "%llu", (unsigned long long)v);
+	return rz_config_set_cb(c, n, b, cb);
+}
+RzConfigNode *rz_config_set_i(RzConfig *c, const char *n, ut64 v) {
+	return rz_config_set_i_cb(c, n, v, NULL);
+}
+RzConfigNode *rz_config_set_b(RzConfig *c, const char *n, bool b) {
+	return rz_config_set_cb(c, n, b ? "true" : "false", NULL);
+}
+bool rz_config_get_b(RzConfig *c, const char *n) {
+	RzConfigNode *x = rz_config_node_get(c, n);
+	return x && x->i_value;
+}
+ut64 rz_config_get_i(RzConfig *c, const char *n) {
+	RzConfigNode *x = rz_config_node_get(c, n);
+	return x ? x->i_value : 0;
+}
+RzConfigNode *rz_config_desc(RzConfig *c, const char *n, const char *d) {
+	(void)d;
+	return rz_config_node_get(c, n);
+}
+bool rz_config_lock(RzConfig *c, bool l) {
+	(void)c;
+	(void)l;
+	return true;
+}
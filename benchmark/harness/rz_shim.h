@@ -0,0 +1,391 @@
+// SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+// SPDX-License-Identifier: LGPL-3.0-only
+
+/**
+ * \file rz_shim.h
+ * Minimal subset of the rizin API used by the generated Hexagon plugin.
+ * It only exists to compile the plugin outside of the rizin tree for benchmarking.
+ * The semantics follow rizin, but nothing is optimized or complete.
+ */
+
+#ifndef RZ_SHIM_H
+#define RZ_SHIM_H
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <limits.h>
+#include <strings.h>
+typedef uint8_t ut8;
+typedef uint16_t ut16;
+typedef uint32_t ut32;
+typedef unsigned long long ut64;
+typedef int8_t st8;
+typedef int16_t st16;
+typedef int32_t st32;
+typedef long long st64;
+#define UT64_MAX UINT64_MAX
+#define UT8_MAX  UINT8_MAX
+#define UT16_MAX UINT16_MAX
+#define ST32_MAX INT32_MAX
+#define PFMT32x  "x"
+#define PFMT64x  "llx"
+#define PFMT64d  "lld"
+#define PFMT32u  "u"
+#define PFMT32d  "d"
+#define PFMT64u  "llu"
+#define UT32_MAX UINT32_MAX
+#define ST64_MAX INT64_MAX
+#define RZ_API
+#define RZ_IPI
+#define RZ_OWN
+#define RZ_BORROW
+#define RZ_NONNULL
+#define RZ_NULLABLE
+#define RZ_INOUT
+#define RZ_OUT
+#define RZ_IN
+#define RZ_DEPRECATE
+#define RZ_UNUSED        __attribute__((unused))
+#define RZ_VERSION       "0.0"
+#define RZ_PLUGIN_INCORE 0
+#define RZ_MIN(a, b)     ((a) < (b) ? (a) : (b))
+#define RZ_MAX(a, b)     ((a) > (b) ? (a) : (b))
+#define RZ_ARRAY_SIZE(x) (sizeof(x) / sizeof((x)[0]))
+#define RZ_NEW0(x)       (x *)calloc(1, sizeof(x))
+#define RZ_NEW(x)        (x *)malloc(sizeof(x))
+#define RZ_FREE(x) \
+	do { \
+		free(x); \
+		x = NULL; \
+	} while (0)
+#define RZ_LOG_FATAL(...)   fprintf(stderr, __VA_ARGS__)
+#define RZ_LOG_WARN(...)    fprintf(stderr, __VA_ARGS__)
+#define RZ_LOG_ERROR(...)   fprintf(stderr, __VA_ARGS__)
+#define RZ_LOG_INFO(...)    fprintf(stderr, __VA_ARGS__)
+#define RZ_LOG_VERBOSE(...) fprintf(stderr, __VA_ARGS__)
+#define RZ_LOG_DEBUG(...)   fprintf(stderr, __VA_ARGS__)
+#define eprintf(...)        fprintf(stderr, __VA_ARGS__)
+#define rz_return_val_if_fail(c, v) \
+	do { \
+		if (!(c)) \
+			return v; \
+	} while (0)
+#define rz_return_if_fail(c) \
+	do { \
+		if (!(c)) \
+			return; \
+	} while (0)
+#define rz_warn_if_reached() \
+	do { \
+	} while (0)
+#define rz_warn_if_fail(c) \
+	do { \
+		(void)(c); \
+	} while (0)
+#define rz_num_bitmask(x)    (((ut64)1 << (x)) - 1)
+#define RZ_LIB_TYPE_ASM      1
+#define RZ_LIB_TYPE_ANALYSIS 2
+static inline ut32 rz_read_le32(const void *b) {
+	ut32 v;
+	memcpy(&v, b, 4);
+	return v;
+}
+static inline void rz_write_le32(void *b, ut32 v) {
+	memcpy(b, &v, 4);
+}
+#define rz_str_casecmp strcasecmp
+ut64 rz_time_now(void);
+typedef void (*RzListFree)(void *);
+typedef struct rz_list_iter_t {
+	void *data;
+	struct rz_list_iter_t *n, *p;
+} RzListIter;
+typedef struct rz_list_t {
+	RzListIter *head, *tail;
+	RzListFree free;
+	ut32 length;
+} RzList;
+#define rz_list_foreach(list, it, pos) \
+	if (list) \
+		for (it = (list)->head; it && (pos = it->data, 1); it = it->n)
+#define rz_list_foreach_prev(list, it, pos) \
+	if (list) \
+		for (it = (list)->tail; it && (pos = it->data, 1); it = it->p)
+RzList *rz_list_newf(RzListFree f);
+RzList *rz_list_new(void);
+void rz_list_free(RzList *l);
+void rz_list_purge(RzList *l);
+ut32 rz_list_length(const RzList *l);
+void *rz_list_get_n(const RzList *l, ut32 n);
+void *rz_list_get_top(const RzList *l);
+RzListIter *rz_list_append(RzList *l, void *d);
+RzListIter *rz_list_insert(RzList *l, ut32 n, void *d);
+bool rz_list_delete_data(RzList *l, void *d);
+void *rz_list_pop_head(RzList *l);
+typedef struct {
+	void **a;
+	size_t len;
+} RzPVector;
+typedef struct {
+	void *a;
+	size_t len;
+	size_t elem_size;
+} RzVector;
+RzPVector *rz_pvector_new(void (*f)(void *));
+void **rz_pvector_push(RzPVector *v, void *x);
+void rz_pvector_free(RzPVector *v);
+#define rz_pvector_foreach(vec, it) for (it = (void *)(vec)->a; it != (void *)((vec)->a + (vec)->len); it++)
+typedef struct {
+	char *ptr;
+	char buf[64];
+	size_t len;
+} RzStrBuf;
+void rz_strbuf_init(RzStrBuf *s);
+bool rz_strbuf_set(RzStrBuf *s, const char *t);
+bool rz_strbuf_setbin(RzStrBuf *s, const ut8 *b, size_t l);
+bool rz_strbuf_append(RzStrBuf *s, const char *t);
+bool rz_strbuf_append_n(RzStrBuf *s, const char *t, size_t l);
+bool rz_strbuf_appendf(RzStrBuf *s, const char *f, ...);
+char *rz_strbuf_get(RzStrBuf *s);
+void rz_strbuf_fini(RzStrBuf *s);
+const char *rz_hex_ut2st_str(ut32 v, char *buf, int len);
+void *rz_regex_new(const char *p, const char *f);
+typedef int RzTypeCond;
+#define RZ_TYPE_COND_AL            0
+#define RZ_TYPE_COND_HEX_SCL_TRUE  1
+#define RZ_TYPE_COND_HEX_SCL_FALSE 2
+#define RZ_TYPE_COND_HEX_VEC_TRUE  3
+#define RZ_TYPE_COND_HEX_VEC_FALSE 4
+#define RZ_TYPE_COND_EXCEPTION     5
+typedef bool (*RzConfigCallback)(void *user, void *data);
+typedef struct rz_config_node_t {
+	char *name;
+	void *data;
+	ut64 i_value;
+	char *value;
+	RzConfigCallback setter;
+} RzConfigNode;
+typedef struct rz_config_t {
+	void *user;
+} RzConfig;
+RzConfig *rz_config_new(void *user);
+void rz_config_free(RzConfig *c);
+RzConfigNode *rz_config_node_get(RzConfig *c, const char *n);
+RzConfigNode *rz_config_set(RzConfig *c, const char *n, const char *v);
+RzConfigNode *rz_config_set_b(RzConfig *c, const char *n, bool b);
+RzConfigNode *rz_config_set_cb(RzConfig *c, const char *n, const char *v, RzConfigCallback cb);
+RzConfigNode *rz_config_set_i_cb(RzConfig *c, const char *n, ut64 v, RzConfigCallback cb);
+RzConfigNode *rz_config_set_i(RzConfig *c, const char *n, ut64 v);
+bool rz_config_get_b(RzConfig *c, const char *n);
+ut64 rz_config_get_i(RzConfig *c, const char *n);
+RzConfigNode *rz_config_desc(RzConfig *c, const char *n, const char *d);
+bool rz_config_lock(RzConfig *c, bool l);
+#define SETCB(key, val, cb, desc) rz_config_set_cb(cfg, key, val, cb)
+typedef enum { RZ_ASM_TOKEN_UNKNOWN,
+	RZ_ASM_TOKEN_MNEMONIC,
+	RZ_ASM_TOKEN_OPERATOR,
+	RZ_ASM_TOKEN_NUMBER,
+	RZ_ASM_TOKEN_REGISTER,
+	RZ_ASM_TOKEN_SEPARATOR,
+	RZ_ASM_TOKEN_META } RzAsmTokenType;
+typedef struct {
+	RzAsmTokenType type;
+	char *pattern;
+	void *regex;
+} RzAsmTokenPattern;
+typedef struct {
+	RzStrBuf *str;
+	RzVector tokens;
+	ut32 op_type;
+} RzAsmTokenString;
+void rz_asm_token_pattern_free(void *p);
+RzAsmTokenString *rz_asm_tokenize_asm_regex(RzStrBuf *asm_str, RzPVector *patterns);
+typedef struct rz_asm_op_t {
+	int size;
+	RzStrBuf buf;
+	RzStrBuf buf_asm;
+	RzAsmTokenString *asm_toks;
+} RzAsmOp;
+typedef struct rz_asm_t {
+	ut64 pc;
+	int bits;
+	bool utf8;
+	struct rz_asm_plugin_t *cur;
+	void *plugin_data;
+	void *core;
+	RzConfig *config;
+} RzAsm;
+typedef struct rz_asm_plugin_t {
+	const char *name, *arch, *author, *license, *desc, *cpus;
+	int bits, endian;
+	bool (*init)(void **user);
+	bool (*fini)(void *user);
+	int (*disassemble)(RzAsm *a, RzAsmOp *op, const ut8 *buf, int len);
+	int (*assemble)(RzAsm *a, RzAsmOp *op, const char *buf);
+	RzConfig *(*get_config)(void);
+	char *(*mnemonics)(RzAsm *a, int id, bool json);
+} RzAsmPlugin;
+typedef struct {
+	ut32 type;
+	st64 imm;
+	ut64 delta;
+	ut64 base;
+	ut64 mul;
+	void *reg;
+	void *regdelta;
+	int memref;
+	bool absolute;
+	ut64 plugin_specific;
+} RzAnalysisValue;
+typedef enum {
+	RZ_ANALYSIS_OP_TYPE_COND = 0x80000000,
+	RZ_ANALYSIS_OP_TYPE_NULL = 0,
+	RZ_ANALYSIS_OP_TYPE_JMP = 1,
+	RZ_ANALYSIS_OP_TYPE_UJMP = 2,
+	RZ_ANALYSIS_OP_TYPE_RJMP,
+	RZ_ANALYSIS_OP_TYPE_CALL,
+	RZ_ANALYSIS_OP_TYPE_RET,
+	RZ_ANALYSIS_OP_TYPE_CRET,
+	RZ_ANALYSIS_OP_TYPE_CJMP,
+	RZ_ANALYSIS_OP_TYPE_ILL,
+	RZ_ANALYSIS_OP_TYPE_NOP,
+	RZ_ANALYSIS_OP_TYPE_TRAP,
+	RZ_ANALYSIS_OP_TYPE_UNK,
+	RZ_ANALYSIS_OP_TYPE_LOAD,
+	RZ_ANALYSIS_OP_TYPE_STORE,
+	RZ_ANALYSIS_OP_TYPE_MOV,
+	RZ_ANALYSIS_OP_TYPE_ADD,
+	RZ_ANALYSIS_OP_TYPE_SUB,
+	RZ_ANALYSIS_OP_TYPE_CMP,
+	RZ_ANALYSIS_OP_TYPE_UCALL,
+	RZ_ANALYSIS_OP_TYPE_RCALL,
+	RZ_ANALYSIS_OP_TYPE_UCJMP,
+	RZ_ANALYSIS_OP_TYPE_RCJMP,
+	RZ_ANALYSIS_OP_TYPE_CMOV,
+	RZ_ANALYSIS_OP_TYPE_SHL,
+	RZ_ANALYSIS_OP_TYPE_SHR,
+	RZ_ANALYSIS_OP_TYPE_SAR,
+	RZ_ANALYSIS_OP_TYPE_AND,
+	RZ_ANALYSIS_OP_TYPE_OR,
+	RZ_ANALYSIS_OP_TYPE_XOR,
+	RZ_ANALYSIS_OP_TYPE_NOT,
+	RZ_ANALYSIS_OP_TYPE_MUL,
+	RZ_ANALYSIS_OP_TYPE_DIV,
+	RZ_ANALYSIS_OP_TYPE_MOD,
+	RZ_ANALYSIS_OP_TYPE_PUSH,
+	RZ_ANALYSIS_OP_TYPE_POP,
+	RZ_ANALYSIS_OP_TYPE_LEA,
+	RZ_ANALYSIS_OP_TYPE_SWI,
+	RZ_ANALYSIS_OP_TYPE_IO,
+	RZ_ANALYSIS_OP_TYPE_SYNC,
+	RZ_ANALYSIS_OP_TYPE_ROR,
+	RZ_ANALYSIS_OP_TYPE_ROL,
+	RZ_ANALYSIS_OP_TYPE_ABS,
+	RZ_ANALYSIS_OP_TYPE_CPL,
+	RZ_ANALYSIS_OP_TYPE_CRYPTO,
+	RZ_ANALYSIS_OP_TYPE_LENGTH,
+	RZ_ANALYSIS_OP_TYPE_CAST,
+	RZ_ANALYSIS_OP_TYPE_NEW,
+	RZ_ANALYSIS_OP_TYPE_CASE,
+	RZ_ANALYSIS_OP_TYPE_SWITCH,
+	RZ_ANALYSIS_OP_TYPE_UPUSH,
+	RZ_ANALYSIS_OP_TYPE_RPUSH,
+	RZ_ANALYSIS_OP_TYPE_CCALL,
+	RZ_ANALYSIS_OP_TYPE_UCCALL,
+	RZ_ANALYSIS_OP_TYPE_MJMP,
+	RZ_ANALYSIS_OP_TYPE_IRJMP,
+	RZ_ANALYSIS_OP_TYPE_IRCALL,
+	RZ_ANALYSIS_OP_TYPE_ACMP,
+	RZ_ANALYSIS_OP_TYPE_UNDEFINED
+} _RzAnalysisOpType;
+#define RZ_ANALYSIS_OP_PREFIX_HWLOOP_END 0x1000
+typedef enum { RZ_ANALYSIS_OP_MASK_BASIC = 0,
+	RZ_ANALYSIS_OP_MASK_ESIL = 1,
+	RZ_ANALYSIS_OP_MASK_VAL = 2,
+	RZ_ANALYSIS_OP_MASK_HINT = 4,
+	RZ_ANALYSIS_OP_MASK_OPEX = 8,
+	RZ_ANALYSIS_OP_MASK_DISASM = 16,
+	RZ_ANALYSIS_OP_MASK_IL = 32,
+	RZ_ANALYSIS_OP_MASK_ALL = 63 } RzAnalysisOpMask;
+typedef enum { RZ_ANALYSIS_STACK_NULL,
+	RZ_ANALYSIS_STACK_NOP,
+	RZ_ANALYSIS_STACK_INC } RzAnalysisStackOp;
+typedef enum { RZ_ANALYSIS_OP_DIR_READ = 1,
+	RZ_ANALYSIS_OP_DIR_WRITE = 2,
+	RZ_ANALYSIS_OP_DIR_EXEC = 4,
+	RZ_ANALYSIS_OP_DIR_REF = 8 } RzAnalysisOpDirection;
+typedef struct rz_analysis_op_t {
+	char *mnemonic;
+	ut64 addr;
+	ut32 type;
+	ut64 prefix;
+	ut32 type2;
+	int stackop;
+	int cond;
+	int size;
+	int nopcode;
+	int cycles;
+	int failcycles;
+	int family;
+	int id;
+	bool eob;
+	bool sign;
+	int delay;
+	ut64 jump;
+	ut64 fail;
+	int direction;
+	st64 ptr;
+	ut64 val;
+	int ptrsize;
+	st64 stackptr;
+	int refptr;
+	RzAnalysisValue analysis_vals[6];
+	RzAnalysisValue *dst;
+	RzStrBuf esil;
+	RzStrBuf opex;
+	const char *reg;
+	const char *ireg;
+	int scale;
+	ut64 disp;
+	void *il_op;
+} RzAnalysisOp;
+typedef struct rz_analysis_t {
+	int pcalign;
+	int bits;
+	struct rz_analysis_plugin_t *cur;
+	void *plugin_data;
+	RzConfig *config;
+	void *core;
+} RzAnalysis;
+typedef struct rz_analysis_plugin_t {
+	const char *name, *desc, *license, *arch, *author, *version, *cpus;
+	int bits, esil;
+	bool (*init)(void **user);
+	bool (*fini)(void *user);
+	int (*op)(RzAnalysis *a, RzAnalysisOp *op, ut64 addr, const ut8 *data, int len, RzAnalysisOpMask mask);
+	char *(*get_reg_profile)(RzAnalysis *a);
+	int (*archinfo)(RzAnalysis *a, int query);
+	char *(*get_cc)(RzAnalysis *a);
+} RzAnalysisPlugin;
+typedef struct rz_core_t {
+	RzConfig *config;
+	RzAsm *rasm;
+	RzAnalysis *analysis;
+} RzCore;
+typedef struct rz_lib_struct_t {
+	int type;
+	void *data;
+	const char *version;
+} RzLibStruct;
+typedef struct rz_arch_t {
+	int dummy;
+} RzArch;
+#define RZ_ANALYSIS_ARCHINFO_MIN_OP_SIZE      0
+#define RZ_ANALYSIS_ARCHINFO_MAX_OP_SIZE      1
+#define RZ_ANALYSIS_ARCHINFO_TEXT_ALIGN       2
+#define RZ_ANALYSIS_ARCHINFO_DATA_ALIGN       3
+#define RZ_ANALYSIS_ARCHINFO_CAN_USE_POINTERS 4
+#define RZ_ANALYSIS_ARCHINFO_ALIGN            2
+#endif
@@ -1,6 +1,33 @@
 // SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
 // SPDX-License-Identifier: LGPL-3.0-only
 
+/**
+ * \brief Allocates the decoder state of this RzAnalysis instance.
+ *
+ * \param user Pointer to RzAnalysis.plugin_data. It is set to the new state.
+ * \return bool True on success. False otherwise.
+ */
+static bool hexagon_analysis_init(void **user) {
+	rz_return_val_if_fail(user, false);
+	HexState *state = hexagon_state_new();
+	if (!state) {
+		return false;
+	}
+	*user = state; // user = RzAnalysis.plugin_data
+	return true;
+}
+
+/**
+ * \brief Frees the decoder state of this RzAnalysis instance.
+ *
+ * \param user The state (RzAnalysis.plugin_data).
+ * \return bool Always true.
+ */
+static bool hexagon_analysis_fini(void *user) {
+	hexagon_state_free(user);
+	return true;
+}
+
 RZ_API int hexagon_v6_op(RzAnalysis *analysis, RzAnalysisOp *op, ut64 addr, const ut8 *buf, int len, RzAnalysisOpMask mask) {
 	rz_return_val_if_fail(analysis && op && buf, -1);
 	if (len < 4) {
@@ -10,9 +37,13 @@ RZ_API int hexagon_v6_op(RzAnalysis *analysis, RzAnalysisOp *op, ut64 addr, cons
 		analysis->pcalign = 0x4;
 	}
 
+	HexState *state = analysis->plugin_data;
+	if (!state) {
+		return -1;
+	}
 	HexReversedOpcode rev = { .action = HEXAGON_ANALYSIS, .ana_op = op, .asm_op = NULL };
 
-	hexagon_reverse_opcode(NULL, &rev, buf, addr);
+	hexagon_reverse_opcode(state, NULL, &rev, buf, addr);
 
 	return op->size;
 }
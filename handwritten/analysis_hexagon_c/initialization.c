@@ -7,6 +7,8 @@ RzAnalysisPlugin rz_analysis_plugin_hexagon = {
 	.license = "LGPL3",
 	.arch = "hexagon",
 	.bits = 32,
+	.init = hexagon_analysis_init,
+	.fini = hexagon_analysis_fini,
 	.op = hexagon_v6_op,
 	.esil = false,
 	.get_reg_profile = get_reg_profile,
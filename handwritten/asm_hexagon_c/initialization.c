@@ -1,14 +1,17 @@
 // SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
 // SPDX-License-Identifier: LGPL-3.0-only
 
+/**
+ * \brief Returns new token patterns for the tokenization of the disassembly. Each state owns its patterns.
+ *
+ * \return The patterns ordered by priority or NULL in case of failure.
+ */
 static RZ_OWN RzPVector /* RzAsmTokenPattern */ *get_token_patterns() {
-	static RzPVector *pvec = NULL;
-	if (pvec) {
-		return pvec;
+	RzPVector *pvec = rz_pvector_new(rz_asm_token_pattern_free);
+	if (!pvec) {
+		return NULL;
 	}
 
-	pvec = rz_pvector_new(rz_asm_token_pattern_free);
-
 	RzAsmTokenPattern *pat = RZ_NEW0(RzAsmTokenPattern);
 	pat->type = RZ_ASM_TOKEN_META;
 	pat->pattern = strdup(
@@ -110,60 +113,37 @@ static void compile_token_patterns(RZ_INOUT RzPVector /* RzAsmTokenPattern* */ *
 }
 
 /**
- * \brief Setter for the plugins RzConfig nodes.
+ * \brief Allocates the decoder state of this RzAsm instance.
  *
- * \param user The user of the RzConfig node. If this callback is called by Core \p user = RzCore.
- * If it is called by the plugins config setup \p user = HexState.
- * \param data The node to set. Again, if called by RzCore \p date = Node from RzCore config.
- * If it is called by the plugins config setup \p data = a plugins config node.
- * \return bool True if the config was set. False otherwise.
+ * \param user Pointer to RzAsm.plugin_data. It is set to the new state.
+ * \return bool True on success. False otherwise.
  */
-static bool hex_cfg_set(void *user, void *data) {
-	rz_return_val_if_fail(user && data, false);
-	HexState *state = hexagon_get_state();
+static bool hexagon_init(void **user) {
+	rz_return_val_if_fail(user, false);
+	HexState *state = hexagon_state_new();
 	if (!state) {
 		return false;
 	}
-	RzConfig *pcfg = state->cfg;
-
-	RzConfigNode *cnode = (RzConfigNode *)data; // Config node from core.
-	RzConfigNode *pnode = rz_config_node_get(pcfg, cnode->name); // Config node of plugin.
-	if (pnode == cnode) {
-		return true;
-	}
-	if (cnode) {
-		pnode->i_value = cnode->i_value;
-		pnode->value = cnode->value;
-		return true;
-	}
-	return false;
-}
-
-static bool hexagon_init(void **user) {
-	HexState *state = hexagon_get_state();
-	rz_return_val_if_fail(state, false);
-
-	*user = state; // user = RzAsm.plugin_data
-	state->cfg = rz_config_new(state);
-	rz_return_val_if_fail(state->cfg, false);
-
-	RzConfig *cfg = state->cfg; // Rename for SETCB macros.
-	// Add nodes
-	SETCB("plugins.hexagon.imm.hash", "true", &hex_cfg_set, "Display ## before 32bit immediates and # before immidiates with other width.");
-	SETCB("plugins.hexagon.imm.sign", "true", &hex_cfg_set, "True: Print them with sign. False: Print signed immediates in unsigned representation.");
-	SETCB("plugins.hexagon.sdk", "false", &hex_cfg_set, "Print packet syntax in objdump style.");
-	SETCB("plugins.hexagon.reg.alias", "true", &hex_cfg_set, "Print the alias of registers (Alias from C0 = SA0).");
-
 	state->token_patterns = get_token_patterns();
+	if (!state->token_patterns) {
+		hexagon_state_free(state);
+		return false;
+	}
 	compile_token_patterns(state->token_patterns);
 
+	*user = state; // user = RzAsm.plugin_data
 	return true;
 }
 
-RZ_API RZ_BORROW RzConfig *hexagon_get_config() {
-	HexState *state = hexagon_get_state();
-	rz_return_val_if_fail(state, NULL);
-	return state->cfg;
+/**
+ * \brief Frees the decoder state of this RzAsm instance.
+ *
+ * \param user The state (RzAsm.plugin_data).
+ * \return bool Always true.
+ */
+static bool hexagon_fini(void *user) {
+	hexagon_state_free(user);
+	return true;
 }
 
 /**
@@ -180,10 +160,38 @@ static int disassemble(RzAsm *a, RzAsmOp *op, const ut8 *buf, int l) {
 	if (l < 4) {
 		return -1;
 	}
+	HexState *state = a->plugin_data;
+	if (!state) {
+		return -1;
+	}
 	ut32 addr = (ut32)a->pc;
 	HexReversedOpcode rev = { .action = HEXAGON_DISAS, .ana_op = NULL, .asm_op = op };
 
-	hexagon_reverse_opcode(a, &rev, buf, addr);
+	hexagon_reverse_opcode(state, a, &rev, buf, addr);
+	return op->size;
+}
+
+/**
+ * \brief Assembles a packet or a single instruction (see hexagon_assemble_packet()).
+ *
+ * \param a The current RzAsm struct.
+ * \param op The RzAsmOp which is filled with the encoded packet.
+ * \param str The text of the packet.
+ * \return int Size of the encoded packet. Or -1 if it could not be assembled.
+ */
+static int assemble(RzAsm *a, RzAsmOp *op, const char *str) {
+	rz_return_val_if_fail(a && op && str, -1);
+	ut32 words[4];
+	int count = hexagon_assemble_packet(str, (ut32)a->pc, words, RZ_ARRAY_SIZE(words));
+	if (count < 0) {
+		return -1;
+	}
+	ut8 buf[sizeof(words)];
+	for (int i = 0; i < count; i++) {
+		rz_write_le32(buf + i * 4, words[i]);
+	}
+	rz_strbuf_setbin(&op->buf, buf, count * 4);
+	op->size = count * 4;
 	return op->size;
 }
 
@@ -195,7 +203,9 @@ RzAsmPlugin rz_asm_plugin_hexagon = {
 	.bits = 32,
 	.desc = "Qualcomm Hexagon (QDSP6) V6",
 	.init = &hexagon_init,
+	.fini = &hexagon_fini,
 	.disassemble = &disassemble,
+	.assemble = &assemble,
 	.get_config = &hexagon_get_config,
 };
 
@@ -63,6 +63,7 @@ static inline bool is_endloop01_pkt(const ut8 pb_hi_0, const ut8 pb_hi_1) {
  * \return Pointer to instruction or NULL if none was found.
  */
 static HexInsnContainer *hex_get_hic_at_addr(HexState *state, const ut32 addr) {
+	HEX_PROF_INC(state, hic_lookups);
 	HexPkt *p;
 	for (ut8 i = 0; i < HEXAGON_STATE_PKTS; ++i) {
 		p = &state->pkts[i];
@@ -71,6 +72,7 @@ static HexInsnContainer *hex_get_hic_at_addr(HexState *state, const ut32 addr) {
 		rz_list_foreach (p->bin, iter, hic) {
 			if (addr == hic->addr) {
 				p->last_access = rz_time_now();
+				HEX_PROF_INC(state, hic_hits);
 				return hic;
 			}
 		}
@@ -110,6 +112,22 @@ RZ_API ut8 hexagon_get_pkt_index_of_addr(const ut32 addr, const HexPkt *p) {
 	return UT8_MAX;
 }
 
+/**
+ * \brief Sets the producer of the instruction container at \p addr.
+ * Nt.new operands of the following instructions in the packet refer to it.
+ *
+ * \param p The packet of the instruction container.
+ * \param addr The address of the instruction container.
+ * \param producer The output register of the instruction container, HEX_PRODUCER_NONE or HEX_PRODUCER_EXT.
+ */
+RZ_API void hex_pkt_set_producer(RZ_NONNULL HexPkt *p, const ut32 addr, const ut8 producer) {
+	rz_return_if_fail(p);
+	ut8 k = hexagon_get_pkt_index_of_addr(addr, p);
+	if (k < RZ_ARRAY_SIZE(p->producers)) {
+		p->producers[k] = producer;
+	}
+}
+
 /**
  * \brief Clears a packet and sets its attributes to invalid values.
  *
@@ -119,6 +137,7 @@ static void hex_clear_pkt(RZ_NONNULL HexPkt *p) {
 	p->last_instr_present = false;
 	p->is_valid = false;
 	p->last_access = 0;
+	memset(p->producers, HEX_PRODUCER_NONE, sizeof(p->producers));
 	rz_list_purge(p->bin);
 }
 
@@ -231,31 +250,370 @@ static ut8 get_state_pkt_index(HexState *state, const HexPkt *p) {
 }
 
 /**
- * \brief Initializes each packet of the state once.
+ * \brief Initializes a string arena. It starts with the reserved strings HEX_STR_EMPTY and HEX_STR_INVALID.
+ *
+ * \param arena The arena to initialize.
+ * \return bool True on success. False otherwise.
+ */
+static bool hex_str_arena_init(RZ_OUT HexStrArena *arena) {
+	arena->buf = malloc(HEX_STR_ARENA_INIT_SIZE);
+	if (!arena->buf) {
+		RZ_LOG_FATAL("Could not allocate memory for the string arena!");
+		return false;
+	}
+	memcpy(arena->buf, HEX_STR_ARENA_RESERVED, sizeof(HEX_STR_ARENA_RESERVED));
+	arena->size = sizeof(HEX_STR_ARENA_RESERVED);
+	arena->capacity = HEX_STR_ARENA_INIT_SIZE;
+	return true;
+}
+
+/**
+ * \brief Returns the instructions of an instruction container which reference text in the arena.
+ *
+ * \param hic The instruction container.
+ * \param insns Set to the instructions. Unused entries are NULL.
+ */
+static void hex_get_hic_insns(const HexInsnContainer *hic, RZ_OUT HexInsn *insns[2]) {
+	// sub[0] and insn share their memory.
+	insns[0] = hic->bin.sub[0];
+	insns[1] = hic->is_duplex ? hic->bin.sub[1] : NULL;
+}
+
+/**
+ * \brief Moves the strings of all buffered instructions into a new buffer and drops all others.
+ * The new buffer has at least \p needed free bytes.
+ *
+ * \param state The state which owns the arena.
+ * \param needed The number of bytes which have to be free after compaction.
+ * \return bool True on success. False otherwise.
+ */
+static bool hex_str_arena_compact(HexState *state, const ut32 needed) {
+	HexStrArena *arena = &state->text;
+	HexInsn *insns[2];
+	HexInsnContainer *hic;
+	RzListIter *it;
+	ut32 live = sizeof(HEX_STR_ARENA_RESERVED);
+	for (ut8 i = 0; i < HEXAGON_STATE_PKTS; ++i) {
+		rz_list_foreach (state->pkts[i].bin, it, hic) {
+			hex_get_hic_insns(hic, insns);
+			for (ut8 k = 0; k < 2; ++k) {
+				if (insns[k] && insns[k]->text_infix >= sizeof(HEX_STR_ARENA_RESERVED)) {
+					live += strlen(arena->buf + insns[k]->text_infix) + 1;
+				}
+			}
+		}
+	}
+	ut32 capacity = arena->capacity;
+	// Keep at least half of the arena free. Otherwise it would be compacted too often.
+	while ((ut64)live + needed > capacity / 2) {
+		capacity *= 2;
+	}
+	char *buf = malloc(capacity);
+	if (!buf) {
+		RZ_LOG_FATAL("Could not allocate memory for the string arena!");
+		return false;
+	}
+	memcpy(buf, HEX_STR_ARENA_RESERVED, sizeof(HEX_STR_ARENA_RESERVED));
+	ut32 size = sizeof(HEX_STR_ARENA_RESERVED);
+	for (ut8 i = 0; i < HEXAGON_STATE_PKTS; ++i) {
+		rz_list_foreach (state->pkts[i].bin, it, hic) {
+			hex_get_hic_insns(hic, insns);
+			for (ut8 k = 0; k < 2; ++k) {
+				if (!insns[k] || insns[k]->text_infix < sizeof(HEX_STR_ARENA_RESERVED)) {
+					continue;
+				}
+				ut32 len = strlen(arena->buf + insns[k]->text_infix) + 1;
+				memcpy(buf + size, arena->buf + insns[k]->text_infix, len);
+				insns[k]->text_infix = size;
+				size += len;
+			}
+		}
+	}
+	free(arena->buf);
+	arena->buf = buf;
+	arena->size = size;
+	arena->capacity = capacity;
+	return true;
+}
+
+/**
+ * \brief Adds a string to the string arena of a state.
+ * The returned offset is valid as long as an instruction buffered in the state references it.
+ * Offsets of other instructions can change if the arena is compacted.
  *
- * \return The initialized state of the plugins.
+ * \param state The state which owns the arena.
+ * \param str The string to add.
+ * \return ut32 The offset of the string in the arena. HEX_STR_EMPTY on failure.
+ */
+RZ_API ut32 hex_str_arena_add(HexState *state, const char *str) {
+	rz_return_val_if_fail(state && str, HEX_STR_EMPTY);
+	HexStrArena *arena = &state->text;
+	ut32 len = strlen(str) + 1;
+	if (len == 1) {
+		return HEX_STR_EMPTY;
+	}
+	if ((ut64)arena->size + len > arena->capacity && !hex_str_arena_compact(state, len)) {
+		return HEX_STR_EMPTY;
+	}
+	ut32 offset = arena->size;
+	memcpy(arena->buf + offset, str, len);
+	arena->size += len;
+	return offset;
+}
+
+/**
+ * \brief Returns the string at \p offset of the string arena of a state.
+ *
+ * \param state The state which owns the arena.
+ * \param offset The offset of the string.
+ * \return const char* The string.
+ */
+RZ_API const char *hex_str_arena_get(const HexState *state, const ut32 offset) {
+	rz_return_val_if_fail(state && offset < state->text.size, "");
+	return state->text.buf + offset;
+}
+
+#ifdef HEX_PROFILE
+static const char *hex_prof_timer_names[HEX_PROF_TIMER_COUNT] = {
+	[HEX_PROF_DECODE] = "decode",
+	[HEX_PROF_NEW_REG] = ".new resolution",
+	[HEX_PROF_TEXT] = "text rendering",
+	[HEX_PROF_TOKENIZE] = "tokenization",
+};
+
+/**
+ * \brief Writes the counters and timers of a state in a human readable form into \p sb.
+ *
+ * \param state The state of which the counters are written.
+ * \param sb The string buffer to append the counters to.
+ */
+RZ_API void hex_prof_dump(const HexState *state, RZ_OUT RzStrBuf *sb) {
+	rz_return_if_fail(state && sb);
+	const HexProfile *prof = &state->prof;
+	// Avoid division by zero.
+	double words = prof->words ? prof->words : 1;
+	double lookups = prof->hic_lookups ? prof->hic_lookups : 1;
+	rz_strbuf_appendf(sb, "HexState %p\n", state);
+	rz_strbuf_appendf(sb, "  words decoded:    %" PFMT64u "\n", prof->words);
+	rz_strbuf_appendf(sb, "  templates probed: %" PFMT64u " (%.2f per word)\n", prof->templates_probed, prof->templates_probed / words);
+	rz_strbuf_appendf(sb, "  hic lookups:      %" PFMT64u " (%.2f%% hits)\n", prof->hic_lookups, 100.0 * prof->hic_hits / lookups);
+	rz_strbuf_appendf(sb, "  packets evicted:  %" PFMT64u "\n", prof->pkts_evicted);
+	for (size_t i = 0; i < HEX_PROF_TIMER_COUNT; i++) {
+		rz_strbuf_appendf(sb, "  ticks %-16s %" PFMT64u " (%.1f per word)\n", hex_prof_timer_names[i], prof->ticks[i], prof->ticks[i] / words);
+	}
+}
+
+/**
+ * \brief Sets all counters and timers of a state to 0.
+ *
+ * \param state The state to reset.
+ */
+RZ_API void hex_prof_reset(HexState *state) {
+	rz_return_if_fail(state);
+	memset(&state->prof, 0, sizeof(state->prof));
+}
+
+/**
+ * \brief Dumps the counters of a state to stderr or resets them.
+ *
+ * \param state The state. Nothing is done if it is NULL.
+ * \param action "dump" or "reset".
+ */
+static void hex_prof_do(RZ_NULLABLE HexState *state, const char *action) {
+	if (!state) {
+		return;
+	}
+	if (!strcmp(action, "reset")) {
+		hex_prof_reset(state);
+		return;
+	}
+	RzStrBuf sb;
+	rz_strbuf_init(&sb);
+	hex_prof_dump(state, &sb);
+	eprintf("%s", rz_strbuf_get(&sb));
+	rz_strbuf_fini(&sb);
+}
+
+/**
+ * \brief Setter of plugins.hexagon.profile. "dump" prints the counters of the states of the
+ * RzAsm and RzAnalysis instance of the core to stderr. "reset" sets them to 0.
+ *
+ * \param user The RzCore if the node is set by the core. NULL if it is set by the plugins config setup.
+ * \param data The config node which was set.
+ * \return bool True if the value is valid. False otherwise.
+ */
+static bool hex_cfg_profile(void *user, void *data) {
+	rz_return_val_if_fail(data, false);
+	RzConfigNode *node = (RzConfigNode *)data;
+	if (!node->value || !*node->value) {
+		return true;
+	}
+	if (strcmp(node->value, "dump") && strcmp(node->value, "reset")) {
+		RZ_LOG_ERROR("plugins.hexagon.profile: Unknown action \"%s\". Use \"dump\" or \"reset\".\n", node->value);
+		return false;
+	}
+	RzCore *core = (RzCore *)user;
+	if (!core) {
+		return true;
+	}
+	// Only the instances which use this plugin have a HexState as plugin data.
+	if (core->rasm && core->rasm->cur && !strcmp(core->rasm->cur->name, "hexagon")) {
+		hex_prof_do(core->rasm->plugin_data, node->value);
+	}
+	if (core->analysis && core->analysis->cur && !strcmp(core->analysis->cur->name, "hexagon")) {
+		hex_prof_do(core->analysis->plugin_data, node->value);
+	}
+	return true;
+}
+#endif
+
+/**
+ * \brief Setter for the plugins RzConfig nodes.
+ *
+ * \param user The user of the RzConfig node. If this callback is called by Core \p user = RzCore.
+ * If it is called by the plugins config setup \p user = NULL.
+ * \param data The node to set. Again, if called by RzCore \p date = Node from RzCore config.
+ * If it is called by the plugins config setup \p data = a plugins config node.
+ * \return bool True if the config was set. False otherwise.
+ */
+static bool hex_cfg_set(void *user, void *data) {
+	rz_return_val_if_fail(data, false);
+	if (!user) {
+		// Called by hex_cfg_init() while the plugin configuration is created.
+		// There is nothing to copy and hexagon_get_config() would wait for hex_cfg_init() to return.
+		return true;
+	}
+	RzConfig *pcfg = hexagon_get_config();
+	if (!pcfg) {
+		return false;
+	}
+
+	RzConfigNode *cnode = (RzConfigNode *)data; // Config node from core.
+	RzConfigNode *pnode = rz_config_node_get(pcfg, cnode->name); // Config node of plugin.
+	if (!pnode || pnode == cnode) {
+		return true;
+	}
+	pnode->i_value = cnode->i_value;
+	pnode->value = cnode->value;
+	return true;
+}
+
+/**
+ * \brief The plugin configuration. Shared by all decoder states, which only read it.
+ * It must be process wide because RzAsmPlugin.get_config() gets no plugin instance.
+ * It is only written once by hex_cfg_init().
  */
-RZ_API HexState *hexagon_get_state() {
-	static HexState *state = NULL;
-	if (state) {
-		return state;
+static RzConfig *hex_cfg = NULL;
+
+/**
+ * \brief Creates the plugin configuration. Called only once by hexagon_get_config().
+ */
+static void hex_cfg_init() {
+	RzConfig *cfg = rz_config_new(NULL);
+	if (!cfg) {
+		RZ_LOG_FATAL("Could not allocate memory for the plugin configuration!");
+		return;
 	}
+	// Add nodes
+	SETCB("plugins.hexagon.imm.hash", "true", &hex_cfg_set, "Display ## before 32bit immediates and # before immidiates with other width.");
+	SETCB("plugins.hexagon.imm.sign", "true", &hex_cfg_set, "True: Print them with sign. False: Print signed immediates in unsigned representation.");
+	SETCB("plugins.hexagon.sdk", "false", &hex_cfg_set, "Print packet syntax in objdump style.");
+	SETCB("plugins.hexagon.reg.alias", "true", &hex_cfg_set, "Print the alias of registers (Alias from C0 = SA0).");
+	SETCB("plugins.hexagon.decode.hvx", "true", &hex_cfg_set, "Decode HVX instructions. Disable it for scalar only code.");
+	SETCB("plugins.hexagon.decode.system", "true", &hex_cfg_set, "Decode system instructions which are not part of LLVM.");
+#ifdef HEX_PROFILE
+	SETCB("plugins.hexagon.profile", "", &hex_cfg_profile, "Instrumented build. dump: Print the decoder counters of this core to stderr. reset: Set them to 0.");
+#endif
+	hex_cfg = cfg;
+}
+
+#if __WINDOWS__
+static INIT_ONCE hex_cfg_once = INIT_ONCE_STATIC_INIT;
 
-	state = calloc(1, sizeof(HexState));
+static BOOL CALLBACK hex_cfg_init_once(PINIT_ONCE once, PVOID param, PVOID *context) {
+	hex_cfg_init();
+	return TRUE;
+}
+#else
+static pthread_once_t hex_cfg_once = PTHREAD_ONCE_INIT;
+#endif
+
+/**
+ * \brief Returns the plugin configuration. It is created on the first call.
+ * Concurrent first calls (e.g. of two new plugin instances) wait until it is created once.
+ *
+ * \return The plugins configuration or NULL in case of failure.
+ */
+RZ_API RZ_BORROW RzConfig *hexagon_get_config() {
+#if __WINDOWS__
+	InitOnceExecuteOnce(&hex_cfg_once, hex_cfg_init_once, NULL, NULL);
+#else
+	pthread_once(&hex_cfg_once, hex_cfg_init);
+#endif
+	return hex_cfg;
+}
+
+/**
+ * \brief Allocates a new decoder state and initializes each of its packets.
+ * Every plugin instance (RzAsm, RzAnalysis) owns its own state. So instances
+ * never share packets or constant extenders and can decode concurrently.
+ *
+ * \return The initialized state or NULL in case of failure.
+ */
+RZ_API RZ_OWN HexState *hexagon_state_new() {
+	HexState *state = RZ_NEW0(HexState);
 	if (!state) {
 		RZ_LOG_FATAL("Could not allocate memory for HexState!");
+		return NULL;
 	}
 	for (int i = 0; i < HEXAGON_STATE_PKTS; ++i) {
 		state->pkts[i].bin = rz_list_newf((RzListFree)hex_insn_container_free);
 		if (!state->pkts[i].bin) {
 			RZ_LOG_FATAL("Could not initialize instruction list!");
+			hexagon_state_free(state);
+			return NULL;
 		}
 		hex_clear_pkt(&(state->pkts[i]));
 	}
 	state->const_ext_l = rz_list_newf((RzListFree)hex_const_ext_free);
+	state->cfg = hexagon_get_config();
+	if (!state->const_ext_l || !state->cfg || !hex_str_arena_init(&state->text)) {
+		hexagon_state_free(state);
+		return NULL;
+	}
+	// The decoder only dereferences the nodes. So disabled features cost no config lookup.
+	state->feature_cfg[HEX_FEATURE_HVX] = rz_config_node_get(state->cfg, "plugins.hexagon.decode.hvx");
+	state->feature_cfg[HEX_FEATURE_SYSTEM] = rz_config_node_get(state->cfg, "plugins.hexagon.decode.system");
 	return state;
 }
 
+/**
+ * \brief Frees a decoder state and all the packets it buffers.
+ *
+ * \param state The state to free.
+ */
+RZ_API void hexagon_state_free(RZ_NULLABLE HexState *state) {
+	if (!state) {
+		return;
+	}
+#ifdef HEX_PROFILE
+	if (state->prof.words) {
+		RzStrBuf sb;
+		rz_strbuf_init(&sb);
+		hex_prof_dump(state, &sb);
+		eprintf("%s", rz_strbuf_get(&sb));
+		rz_strbuf_fini(&sb);
+	}
+#endif
+	for (int i = 0; i < HEXAGON_STATE_PKTS; ++i) {
+		rz_list_free(state->pkts[i].bin);
+	}
+	rz_list_free(state->const_ext_l);
+	rz_pvector_free(state->token_patterns);
+	free(state->text.buf);
+	free(state);
+}
+
 /**
  * \brief Checks if the packet has 4 instructions set.
  *
@@ -383,92 +741,98 @@ static char *get_pkt_indicator(const bool utf8, const bool sdk, const bool prefi
 }
 
 /**
- * \brief Sets the instruction container testual disassmebly by concatinating text prefix, infix and postfix.
+ * \brief Writes the instruction container textual disassembly by concatenating text prefix, infix and postfix.
  *
+ * \param state The state which holds the text of the instruction container.
  * \param hic The instruction container.
+ * \param sb The string buffer to write the text to.
  */
-void hex_set_hic_text(RZ_INOUT HexInsnContainer *hic) {
-	rz_return_if_fail(hic);
+RZ_API void hex_get_hic_text(const HexState *state, const HexInsnContainer *hic, RZ_OUT RzStrBuf *sb) {
+	rz_return_if_fail(state && hic && sb);
+	const HexPktInfo *pi = &hic->pkt_info;
+	rz_strbuf_set(sb, pi->text_prefix);
 	if (hic->is_duplex) {
 		rz_return_if_fail(hic->bin.sub[0] && hic->bin.sub[1]);
-		snprintf(hic->text, sizeof(hic->text), "%s%s%s%s%s", hic->pkt_info.text_prefix, hic->bin.sub[0]->text_infix, " ; ", hic->bin.sub[1]->text_infix, hic->pkt_info.text_postfix);
+		rz_strbuf_append(sb, hex_str_arena_get(state, hic->bin.sub[0]->text_infix));
+		rz_strbuf_append(sb, " ; ");
+		rz_strbuf_append(sb, hex_str_arena_get(state, hic->bin.sub[1]->text_infix));
 	} else {
-		snprintf(hic->text, sizeof(hic->text), "%s%s%s", hic->pkt_info.text_prefix, hic->bin.insn->text_infix, hic->pkt_info.text_postfix);
+		rz_strbuf_append(sb, hex_str_arena_get(state, hic->bin.insn->text_infix));
 	}
+	rz_strbuf_append(sb, pi->text_postfix);
+	rz_strbuf_append(sb, pi->text_eloop);
 }
 
 /**
  * \brief Sets the packet related information in an instruction.
  *
+ * \param state The state to operate on.
  * \param hi The instruction.
  * \param p The packet the instruction belongs to.
  * \param k The index of the instruction within the packet.
  */
-static void hex_set_pkt_info(const RzAsm *rz_asm, RZ_INOUT HexInsnContainer *hic, const HexPkt *p, const ut8 k, const bool update_text) {
-	rz_return_if_fail(hic && p);
+static void hex_set_pkt_info(HexState *state, RZ_INOUT HexInsnContainer *hic, const HexPkt *p, const ut8 k) {
+	rz_return_if_fail(state && hic && p);
 	bool is_first = (k == 0);
 	HexPktInfo *hi_pi = &hic->pkt_info;
-	HexState *state = hexagon_get_state();
 	bool sdk_form = rz_config_get_b(state->cfg, "plugins.hexagon.sdk");
 
-	strncpy(hi_pi->text_postfix, "", 16);
+	hi_pi->text_postfix = "";
+	hi_pi->text_eloop = "";
 	// Parse instr. position in pkt
 	if (is_first && is_last_instr(hic->parse_bits)) { // Single instruction packet.
 		hi_pi->first_insn = true;
 		hi_pi->last_insn = true;
 		if (p->is_valid) {
-			strncpy(hi_pi->text_prefix, get_pkt_indicator(rz_asm->utf8, sdk_form, true, SINGLE_IN_PKT), 8);
+			hi_pi->text_prefix = get_pkt_indicator(state->utf8, sdk_form, true, SINGLE_IN_PKT);
 			if (sdk_form) {
-				strncpy(hi_pi->text_postfix, get_pkt_indicator(rz_asm->utf8, sdk_form, false, SINGLE_IN_PKT), 8);
+				hi_pi->text_postfix = get_pkt_indicator(state->utf8, sdk_form, false, SINGLE_IN_PKT);
 			}
 		} else {
-			strncpy(hi_pi->text_prefix, HEX_PKT_UNK, 8);
+			hi_pi->text_prefix = HEX_PKT_UNK;
 		}
 	} else if (is_first) {
 		hi_pi->first_insn = true;
 		hi_pi->last_insn = false;
 		if (p->is_valid) {
-			strncpy(hi_pi->text_prefix, get_pkt_indicator(rz_asm->utf8, sdk_form, true, FIRST_IN_PKT), 8);
+			hi_pi->text_prefix = get_pkt_indicator(state->utf8, sdk_form, true, FIRST_IN_PKT);
 		} else {
-			strncpy(hi_pi->text_prefix, HEX_PKT_UNK, 8);
+			hi_pi->text_prefix = HEX_PKT_UNK;
 		}
 	} else if (is_last_instr(hic->parse_bits)) {
 		hi_pi->first_insn = false;
 		hi_pi->last_insn = true;
 		if (p->is_valid) {
-			strncpy(hi_pi->text_prefix, get_pkt_indicator(rz_asm->utf8, sdk_form, true, LAST_IN_PKT), 8);
+			hi_pi->text_prefix = get_pkt_indicator(state->utf8, sdk_form, true, LAST_IN_PKT);
 			if (sdk_form) {
-				strncpy(hi_pi->text_postfix, get_pkt_indicator(rz_asm->utf8, sdk_form, false, LAST_IN_PKT), 8);
+				hi_pi->text_postfix = get_pkt_indicator(state->utf8, sdk_form, false, LAST_IN_PKT);
 			}
 
 			switch (hex_get_loop_flag(p)) {
 			default:
 				break;
 			case HEX_LOOP_01:
-				strncat(hi_pi->text_postfix, get_pkt_indicator(rz_asm->utf8, sdk_form, false, ELOOP_01_PKT), 23 - strlen(hi_pi->text_postfix));
+				hi_pi->text_eloop = get_pkt_indicator(state->utf8, sdk_form, false, ELOOP_01_PKT);
 				break;
 			case HEX_LOOP_0:
-				strncat(hi_pi->text_postfix, get_pkt_indicator(rz_asm->utf8, sdk_form, false, ELOOP_0_PKT), 23 - strlen(hi_pi->text_postfix));
+				hi_pi->text_eloop = get_pkt_indicator(state->utf8, sdk_form, false, ELOOP_0_PKT);
 				break;
 			case HEX_LOOP_1:
-				strncat(hi_pi->text_postfix, get_pkt_indicator(rz_asm->utf8, sdk_form, false, ELOOP_1_PKT), 23 - strlen(hi_pi->text_postfix));
+				hi_pi->text_eloop = get_pkt_indicator(state->utf8, sdk_form, false, ELOOP_1_PKT);
 				break;
 			}
 		} else {
-			strncpy(hi_pi->text_prefix, HEX_PKT_UNK, 8);
+			hi_pi->text_prefix = HEX_PKT_UNK;
 		}
 	} else {
 		hi_pi->first_insn = false;
 		hi_pi->last_insn = false;
 		if (p->is_valid) {
-			strncpy(hi_pi->text_prefix, get_pkt_indicator(rz_asm->utf8, sdk_form, true, MID_IN_PKT), 8);
+			hi_pi->text_prefix = get_pkt_indicator(state->utf8, sdk_form, true, MID_IN_PKT);
 		} else {
-			strncpy(hi_pi->text_prefix, HEX_PKT_UNK, 8);
+			hi_pi->text_prefix = HEX_PKT_UNK;
 		}
 	}
-	if (update_text) {
-        hex_set_hic_text(hic);
-	}
 }
 
 /**
@@ -525,7 +889,7 @@ static void make_next_packet_valid(HexState *state, const HexPkt *pkt) {
 			RzListIter *it = NULL;
 			ut8 k = 0;
 			rz_list_foreach (p->bin, it, hi) {
-				hex_set_pkt_info(&state->rz_asm, hi, p, k, true);
+				hex_set_pkt_info(state, hi, p, k);
 				++k;
 			}
 			p->last_access = rz_time_now();
@@ -576,16 +940,21 @@ static HexInsnContainer *hex_add_to_pkt(HexState *state, const HexInsnContainer
 	HexInsnContainer *hic = hexagon_alloc_instr_container();
 	hex_copy_insn_container(hic, new_hic);
 	rz_list_insert(p->bin, k, hic);
+	if (k < RZ_ARRAY_SIZE(p->producers)) {
+		// Producers of the following instructions move one index up.
+		memmove(&p->producers[k + 1], &p->producers[k], RZ_ARRAY_SIZE(p->producers) - k - 1);
+		p->producers[k] = HEX_PRODUCER_NONE;
+	}
 
 	if (k == 0) {
 		p->pkt_addr = hic->addr;
 	}
 	p->last_instr_present |= is_last_instr(hic->parse_bits);
 	ut32 p_l = rz_list_length(p->bin);
-	hex_set_pkt_info(&state->rz_asm, hic, p, k, false);
+	hex_set_pkt_info(state, hic, p, k);
 	if (k == 0 && p_l > 1) {
 		// Update the instruction which was previously the first one.
-		hex_set_pkt_info(&state->rz_asm, rz_list_get_n(p->bin, 1), p, 1, true);
+		hex_set_pkt_info(state, rz_list_get_n(p->bin, 1), p, 1);
 	}
 	p->last_access = rz_time_now();
 	if (p->last_instr_present) {
@@ -604,6 +973,7 @@ static HexInsnContainer *hex_add_to_pkt(HexState *state, const HexInsnContainer
  * \return HexInsnContainer* Pointer to the copied instruction container on the heap.
  */
 static HexInsnContainer *hex_to_new_pkt(HexState *state, const HexInsnContainer *new_hic, const HexPkt *p, RZ_INOUT HexPkt *new_p) {
+	HEX_PROF_ADD(state, pkts_evicted, rz_list_length(new_p->bin) > 0);
 	hex_clear_pkt(new_p);
 
 	HexInsnContainer *hic = hexagon_alloc_instr_container();
@@ -616,7 +986,7 @@ static HexInsnContainer *hex_to_new_pkt(HexState *state, const HexInsnContainer
 	new_p->is_valid = (p->is_valid || p->last_instr_present);
 	new_p->pkt_addr = hic->addr;
 	new_p->last_access = rz_time_now();
-	hex_set_pkt_info(&state->rz_asm, hic, new_p, 0, false);
+	hex_set_pkt_info(state, hic, new_p, 0);
 	if (new_p->last_instr_present) {
 		make_next_packet_valid(state, new_p);
 	}
@@ -632,6 +1002,7 @@ static HexInsnContainer *hex_to_new_pkt(HexState *state, const HexInsnContainer
  */
 static HexInsnContainer *hex_add_to_stale_pkt(HexState *state, const HexInsnContainer *new_hic) {
 	HexPkt *p = hex_get_stale_pkt(state);
+	HEX_PROF_ADD(state, pkts_evicted, rz_list_length(p->bin) > 0);
 	hex_clear_pkt(p);
 
 	HexInsnContainer *hic = hexagon_alloc_instr_container();
@@ -642,7 +1013,7 @@ static HexInsnContainer *hex_add_to_stale_pkt(HexState *state, const HexInsnCont
 	p->pkt_addr = new_hic->addr;
 	// p->is_valid = true; // Setting it true also detects a lot of data as valid assembly.
 	p->last_access = rz_time_now();
-	hex_set_pkt_info(&state->rz_asm, hic, p, 0, false);
+	hex_set_pkt_info(state, hic, p, 0);
 	if (p->last_instr_present) {
 		make_next_packet_valid(state, p);
 	}
@@ -725,31 +1096,22 @@ static HexInsnContainer *hex_add_hic_to_state(HexState *state, const HexInsnCont
  * \brief Set the up a new instruction container.
  *
  * \param hic The instruction container to set up.
- * \param rz_reverse RzAsmOp and RzAnalysisOp which could have some data, which needs to be copied.
  * \param addr The address of the instruction container.
  * \param parse_bits The parse bits of the instruction container.
  */
-static void setup_new_hic(HexInsnContainer *hic, const HexReversedOpcode *rz_reverse, const ut32 addr, const ut8 parse_bits) {
+static void setup_new_hic(HexInsnContainer *hic, const ut32 addr, const ut8 parse_bits) {
 	hic->identifier = HEX_INS_INVALID_DECODE;
 	hic->addr = addr;
 	hic->parse_bits = parse_bits;
-	if (rz_reverse->asm_op) {
-		memcpy(&(hic->asm_op), rz_reverse->asm_op, sizeof(RzAsmOp));
-	}
-	if (rz_reverse->ana_op) {
-		memcpy(&(hic->ana_op), rz_reverse->ana_op, sizeof(RzAnalysisOp));
-	}
 
 	hic->ana_op.val = UT64_MAX;
-	for (ut8 i = 0; i < 6; ++i) {
+	for (ut8 i = 0; i < RZ_ARRAY_SIZE(hic->ana_op.analysis_vals); ++i) {
 		hic->ana_op.analysis_vals[i].imm = ST64_MAX;
 	}
 	hic->ana_op.jump = UT64_MAX;
 	hic->ana_op.fail = UT64_MAX;
 	hic->ana_op.ptr = UT64_MAX;
 
-	hic->asm_op.size = 4;
-	hic->ana_op.size = 4;
 	if (parse_bits == 0b00) {
 		hic->bin.sub[0] = hexagon_alloc_instr();
 		hic->bin.sub[1] = hexagon_alloc_instr();
@@ -758,6 +1120,74 @@ static void setup_new_hic(HexInsnContainer *hic, const HexReversedOpcode *rz_rev
 	}
 }
 
+/**
+ * \brief Writes the disassembly of an instruction container into the RzAsmOp of the caller.
+ *
+ * \param state The state to operate on.
+ * \param hic The instruction container.
+ * \param asm_op The RzAsmOp to write to.
+ */
+static void hex_set_asm_op(HexState *state, const HexInsnContainer *hic, RZ_OUT RzAsmOp *asm_op) {
+	asm_op->size = 4;
+	HEX_PROF_START(t_text);
+	hex_get_hic_text(state, hic, &asm_op->buf_asm);
+	HEX_PROF_STOP(state, HEX_PROF_TEXT, t_text);
+	HEX_PROF_START(t_tokenize);
+	asm_op->asm_toks = rz_asm_tokenize_asm_regex(&asm_op->buf_asm, state->token_patterns);
+	HEX_PROF_STOP(state, HEX_PROF_TOKENIZE, t_tokenize);
+	asm_op->asm_toks->op_type = hic->ana_op.type;
+}
+
+/**
+ * \brief Writes the analysis information of an instruction container into the RzAnalysisOp of the caller.
+ * All other members of ana_op are left untouched.
+ *
+ * \param hic The instruction container.
+ * \param ana_op The RzAnalysisOp to write to.
+ */
+static void hex_set_analysis_op(const HexInsnContainer *hic, RZ_OUT RzAnalysisOp *ana_op) {
+	const HexAnalysisInfo *info = &hic->ana_op;
+	ana_op->addr = hic->addr;
+	ana_op->size = 4;
+	ana_op->type = info->type;
+	ana_op->prefix = info->prefix;
+	ana_op->cond = info->cond;
+	ana_op->id = info->id;
+	ana_op->eob = info->eob;
+	ana_op->jump = info->jump;
+	ana_op->fail = info->fail;
+	ana_op->ptr = info->ptr;
+	ana_op->refptr = info->refptr;
+	ana_op->direction = info->direction;
+	ana_op->val = info->val;
+	for (ut8 i = 0; i < RZ_ARRAY_SIZE(info->analysis_vals); ++i) {
+		ana_op->analysis_vals[i].imm = info->analysis_vals[i].imm;
+		ana_op->analysis_vals[i].plugin_specific = info->analysis_vals[i].plugin_specific;
+	}
+}
+
+/**
+ * \brief Writes the result of an instruction container into the rizin structs in rz_reverse.
+ *
+ * \param state The state to operate on.
+ * \param hic The instruction container.
+ * \param rz_reverse Rizin core structs which store asm and analysis information.
+ */
+static void hex_set_rz_reverse(HexState *state, const HexInsnContainer *hic, HexReversedOpcode *rz_reverse) {
+	switch (rz_reverse->action) {
+	default:
+		hex_set_asm_op(state, hic, rz_reverse->asm_op);
+		hex_set_analysis_op(hic, rz_reverse->ana_op);
+		return;
+	case HEXAGON_DISAS:
+		hex_set_asm_op(state, hic, rz_reverse->asm_op);
+		return;
+	case HEXAGON_ANALYSIS:
+		hex_set_analysis_op(hic, rz_reverse->ana_op);
+		return;
+	}
+}
+
 static inline bool imm_is_scaled(const HexOpAttr attr) {
 	return (attr & HEX_OP_IMM_SCALED);
 }
@@ -810,6 +1240,7 @@ RZ_API void hex_extend_op(HexState *state, RZ_INOUT HexOp *op, const bool set_ne
 	if (ce) {
 		op->op.imm = imm_is_scaled(op->attr) ? (op->op.imm >> op->shift) : op->op.imm;
 		op->op.imm = ((op->op.imm & 0x3F) | ce->const_ext);
+		op->attr |= HEX_OP_CONST_EXT;
 		rz_list_delete_data(state->const_ext_l, ce);
 		return;
 	}
@@ -818,45 +1249,28 @@ RZ_API void hex_extend_op(HexState *state, RZ_INOUT HexOp *op, const bool set_ne
 /**
  * \brief Reverses a given opcode and copies the result into one of the rizin structs in rz_reverse.
  *
+ * \param state The state of the plugin instance which reverses the opcode.
+ * \param rz_asm The RzAsm struct of the caller or NULL if called by the analysis plugin.
  * \param rz_reverse Rizin core structs which store asm and analysis information.
  * \param buf The buffer which stores the current opcode.
  * \param addr The address of the current opcode.
  */
-RZ_API void hexagon_reverse_opcode(const RzAsm *rz_asm, HexReversedOpcode *rz_reverse, const ut8 *buf, const ut64 addr) {
-	HexState *state = hexagon_get_state();
-	if (!state) {
-		RZ_LOG_FATAL("HexState was NULL.");
-	}
+RZ_API void hexagon_reverse_opcode(HexState *state, const RzAsm *rz_asm, HexReversedOpcode *rz_reverse, const ut8 *buf, const ut64 addr) {
+	rz_return_if_fail(state && rz_reverse && buf);
 	if (rz_asm) {
-		memcpy(&state->rz_asm, rz_asm, sizeof(RzAsm));
+		state->utf8 = rz_asm->utf8;
 	}
 	HexInsnContainer *hic = hex_get_hic_at_addr(state, addr);
 	if (hic) {
-		// Opcode was already reversed and is still in the state. Copy the result and return.
-		switch (rz_reverse->action) {
-		default:
-			memcpy(rz_reverse->asm_op, &(hic->asm_op), sizeof(RzAsmOp));
-			memcpy(rz_reverse->ana_op, &(hic->ana_op), sizeof(RzAnalysisOp));
-			rz_strbuf_set(&rz_reverse->asm_op->buf_asm, hic->text);
-			rz_reverse->asm_op->asm_toks = rz_asm_tokenize_asm_regex(&rz_reverse->asm_op->buf_asm, state->token_patterns);
-            rz_reverse->asm_op->asm_toks->op_type = hic->ana_op.type;
-			return;
-		case HEXAGON_DISAS:
-			memcpy(rz_reverse->asm_op, &(hic->asm_op), sizeof(RzAsmOp));
-			rz_strbuf_set(&rz_reverse->asm_op->buf_asm, hic->text);
-            rz_reverse->asm_op->asm_toks = rz_asm_tokenize_asm_regex(&rz_reverse->asm_op->buf_asm, state->token_patterns);
-            rz_reverse->asm_op->asm_toks->op_type = hic->ana_op.type;
-			return;
-		case HEXAGON_ANALYSIS:
-			memcpy(rz_reverse->ana_op, &(hic->ana_op), sizeof(RzAnalysisOp));
-			return;
-		}
+		// Opcode was already reversed and is still in the state. Set the result and return.
+		hex_set_rz_reverse(state, hic, rz_reverse);
+		return;
 	}
 
 	ut32 data = rz_read_le32(buf);
 	ut8 parse_bits = (data & HEX_PARSE_BITS_MASK) >> 14;
 	HexInsnContainer hic_new = { 0 };
-	setup_new_hic(&hic_new, rz_reverse, addr, parse_bits);
+	setup_new_hic(&hic_new, addr, parse_bits);
 	// Add to state
 	hic = hex_add_hic_to_state(state, &hic_new);
 	if (!hic) {
@@ -865,24 +1279,9 @@ RZ_API void hexagon_reverse_opcode(const RzAsm *rz_asm, HexReversedOpcode *rz_re
 	HexPkt *p = hex_get_pkt(state, hic->addr);
 
 	// Do disasassembly and analysis
+	HEX_PROF_INC(state, words);
+	HEX_PROF_START(t_decode);
 	hexagon_disasm_instruction(state, data, hic, p);
-
-	switch (rz_reverse->action) {
-	default:
-		memcpy(rz_reverse->asm_op, &hic->asm_op, sizeof(RzAsmOp));
-		memcpy(rz_reverse->ana_op, &hic->ana_op, sizeof(RzAnalysisOp));
-		rz_strbuf_set(&rz_reverse->asm_op->buf_asm, hic->text);
-        rz_reverse->asm_op->asm_toks = rz_asm_tokenize_asm_regex(&rz_reverse->asm_op->buf_asm, state->token_patterns);
-        rz_reverse->asm_op->asm_toks->op_type = hic->ana_op.type;
-		break;
-	case HEXAGON_DISAS:
-		memcpy(rz_reverse->asm_op, &hic->asm_op, sizeof(RzAsmOp));
-		rz_strbuf_set(&rz_reverse->asm_op->buf_asm, hic->text);
-        rz_reverse->asm_op->asm_toks = rz_asm_tokenize_asm_regex(&rz_reverse->asm_op->buf_asm, state->token_patterns);
-        rz_reverse->asm_op->asm_toks->op_type = hic->ana_op.type;
-		break;
-	case HEXAGON_ANALYSIS:
-		memcpy(rz_reverse->ana_op, &hic->ana_op, sizeof(RzAnalysisOp));
-		break;
-	}
+	HEX_PROF_STOP(state, HEX_PROF_DECODE, t_decode);
+	hex_set_rz_reverse(state, hic, rz_reverse);
 }
@@ -4,6 +4,12 @@
 #include <rz_asm.h>
 #include <rz_analysis.h>
 #include <rz_util.h>
+#ifdef HEX_PROFILE
+#include <rz_core.h>
+#endif
+#if !__WINDOWS__
+#include <pthread.h>
+#endif
 #include "hexagon.h"
 #include "hexagon_insn.h"
 #include "hexagon_arch.h"
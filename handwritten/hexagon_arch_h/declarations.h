@@ -23,14 +23,28 @@
 #define HEX_PKT_ELOOP_1_SDK ":endloop1"
 #define HEX_PKT_ELOOP_0_SDK ":endloop0"
 
+// Strings every arena starts with. The offsets of them are HEX_STR_EMPTY and HEX_STR_INVALID.
+#define HEX_STR_ARENA_RESERVED "\0invalid"
+#define HEX_STR_EMPTY   0
+#define HEX_STR_INVALID 1
+
 RZ_API HexInsn *hexagon_alloc_instr();
 RZ_API void hex_insn_free(RZ_NULLABLE HexInsn *i);
 RZ_API HexInsnContainer *hexagon_alloc_instr_container();
 RZ_API void hex_insn_container_free(RZ_NULLABLE HexInsnContainer *c);
 RZ_API void hex_const_ext_free(HexConstExt *ce);
-RZ_API HexState *hexagon_get_state();
-RZ_API void hexagon_reverse_opcode(const RzAsm *rz_asm, HexReversedOpcode *rz_reverse, const ut8 *buf, const ut64 addr);
+RZ_API RZ_OWN HexState *hexagon_state_new();
+RZ_API void hexagon_state_free(RZ_NULLABLE HexState *state);
+RZ_API RZ_BORROW RzConfig *hexagon_get_config();
+RZ_API void hexagon_reverse_opcode(HexState *state, const RzAsm *rz_asm, HexReversedOpcode *rz_reverse, const ut8 *buf, const ut64 addr);
 RZ_API ut8 hexagon_get_pkt_index_of_addr(const ut32 addr, const HexPkt *p);
+RZ_API void hex_pkt_set_producer(RZ_NONNULL HexPkt *p, const ut32 addr, const ut8 producer);
 RZ_API HexLoopAttr hex_get_loop_flag(const HexPkt *p);
-void hex_set_hic_text(RZ_INOUT HexInsnContainer *hic);
+RZ_API void hex_get_hic_text(const HexState *state, const HexInsnContainer *hic, RZ_OUT RzStrBuf *sb);
+RZ_API ut32 hex_str_arena_add(HexState *state, const char *str);
+RZ_API const char *hex_str_arena_get(const HexState *state, const ut32 offset);
 RZ_API void hex_copy_insn_container(RZ_OUT HexInsnContainer *dest, const HexInsnContainer *src);
+#ifdef HEX_PROFILE
+RZ_API void hex_prof_dump(const HexState *state, RZ_OUT RzStrBuf *sb);
+RZ_API void hex_prof_reset(HexState *state);
+#endif
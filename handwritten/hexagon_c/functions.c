@@ -3,6 +3,7 @@
 
 /**
  * \brief Resolves the 3 bit value of an Nt.new reg to the general register of the producer.
+ * The output registers of the producers are taken from the producer table of the packet.
  *
  * \param addr The address of the current instruction.
  * \param reg_num Bits of Nt.new reg.
@@ -17,42 +18,77 @@ int resolve_n_register(const int reg_num, const ut32 addr, const HexPkt *p) {
 
 	ut8 ahead = (reg_num >> 1);
 	ut8 i = hexagon_get_pkt_index_of_addr(addr, p);
-	if (i == UT8_MAX) {
+	if (i == UT8_MAX || i == 0) {
+		// The current instruction is the first one (yet) in the packet. There is no producer.
 		return UT32_MAX;
 	}
 
-	ut8 prod_i = i; // Producer index
-	HexInsnContainer *hic;
-	RzListIter *it;
-	rz_list_foreach_prev(p->bin, it, hic) {
-		if (ahead == 0) {
-			break;
-		}
-		if (hic->addr < addr) {
-			if (hic->identifier == HEX_INS_A4_EXT) {
-				--prod_i;
-				continue;
-			}
+	ut8 prod_i = RZ_MIN(i, RZ_ARRAY_SIZE(p->producers)); // Producer index
+	while (ahead > 0 && prod_i > 0) {
+		--prod_i;
+		// Constant extenders are skipped.
+		if (p->producers[prod_i] != HEX_PRODUCER_EXT) {
 			--ahead;
-			--prod_i;
 		}
 	}
-
-	hic = rz_list_get_n(p->bin, prod_i);
-
-	if (!hic || !hic->bin.insn || (hic->is_duplex && (!hic->bin.sub[0] || !hic->bin.sub[1]))) {
-        // This case happens if the current instruction (with the .new register)
-        // is yet the only one in the packet.
+	ut8 producer = p->producers[prod_i];
+	if (producer == HEX_PRODUCER_NONE || producer == HEX_PRODUCER_EXT) {
 		return UT32_MAX;
 	}
-	if (hic->identifier == HEX_INS_A4_EXT) {
-		return UT32_MAX;
+	return producer;
+}
+
+/**
+ * \brief Adds all registers of \p src to \p dest.
+ *
+ * \param dest The set to add the registers to.
+ * \param src The registers to add.
+ */
+RZ_API void hex_reg_set_union(RZ_INOUT HexRegSet *dest, const HexRegSet *src) {
+	rz_return_if_fail(dest && src);
+	dest->gpr |= src->gpr;
+	dest->ctr |= src->ctr;
+	dest->vec |= src->vec;
+	dest->pred |= src->pred;
+	dest->vpred |= src->vpred;
+}
+
+/**
+ * \brief Checks if two register sets have a register in common.
+ * E.g. if the registers written by one instruction are read by another one.
+ *
+ * \param a The first set.
+ * \param b The second set.
+ * \return true At least one register is in both sets.
+ * \return false The sets are disjoint.
+ */
+RZ_API bool hex_reg_set_intersects(const HexRegSet *a, const HexRegSet *b) {
+	rz_return_val_if_fail(a && b, false);
+	return (a->gpr & b->gpr) || (a->ctr & b->ctr) || (a->vec & b->vec) || (a->pred & b->pred) || (a->vpred & b->vpred);
+}
+
+/**
+ * \brief Checks if the address of a load or store is known after decoding.
+ * This is the case for absolute addresses and constant extended GP relative ones.
+ * The address is then the immediate operand hi->ops[hi->mem.offset].
+ *
+ * \param hi The decoded instruction.
+ * \return true The instruction accesses memory at an absolute address.
+ * \return false The address depends on register values or the instruction accesses no memory.
+ */
+RZ_API bool hex_mem_addr_is_absolute(const HexInsn *hi) {
+	rz_return_val_if_fail(hi, false);
+	if (!hi->mem.size || hi->mem.offset == HEX_MEM_NO_OP) {
+		return false;
 	}
-	HexInsn *hi = !hic->is_duplex ? hic->bin.insn : (hic->bin.sub[0]->addr == addr ? hic->bin.sub[0] : hic->bin.sub[1]);
-	for (ut8 k = 0; k < hi->op_count; ++k) {
-		if (hi->ops[k].attr & HEX_OP_REG_OUT) {
-			return hi->ops[k].op.reg;
-		}
+	switch (hi->mem.mode) {
+	default:
+		return false;
+	case HEX_ADDR_MODE_ABS:
+	case HEX_ADDR_MODE_ABS_SET:
+		return true;
+	case HEX_ADDR_MODE_GP_REL:
+		// The GP is ignored if the offset is constant extended.
+		return hi->ops[hi->mem.offset].attr & HEX_OP_CONST_EXT;
 	}
-	return UT32_MAX;
 }
@@ -0,0 +1,536 @@
+// SPDX-FileCopyrightText: 2021 Rot127 <unisono@quyllur.org>
+// SPDX-License-Identifier: LGPL-3.0-only
+
+// The assembler. It looks up the templates which can encode an instruction text in the generated hex_asm_index
+// (see AssemblerIndex.py) and encodes the operands into the first template they fit in.
+
+#define HEX_ASM_MAX_TOKENS   64
+#define HEX_ASM_MAX_KEY      256
+#define HEX_ASM_MAX_REG_NAME 16
+#define HEX_ASM_MAX_WORDS    4
+
+typedef enum {
+	HEX_ASM_TOKEN_WORD,
+	HEX_ASM_TOKEN_REG,
+	HEX_ASM_TOKEN_NUM,
+	HEX_ASM_TOKEN_PUNCT,
+	HEX_ASM_TOKEN_OPERAND,
+} HexAsmTokenType;
+
+typedef struct {
+	HexAsmTokenType type;
+	const char *text; ///< Not null terminated. "%r" or "%i" for operands.
+	size_t len;
+	union {
+		st64 num; ///< HEX_ASM_TOKEN_NUM
+		const char *reg; ///< HEX_ASM_TOKEN_REG: The name of the register (not the alias).
+		ut8 op; ///< HEX_ASM_TOKEN_OPERAND: Index of the operand in HexInsnTemplate.ops
+	};
+} HexAsmToken;
+
+typedef struct {
+	HexAsmToken tokens[HEX_ASM_MAX_TOKENS];
+	size_t count;
+} HexAsmTokens;
+
+typedef struct {
+	ut32 addr; ///< Address of the packet.
+	ut32 words[HEX_ASM_MAX_WORDS];
+	ut8 producers[HEX_ASM_MAX_WORDS]; ///< Same as HexPkt.producers
+	size_t count;
+} HexAsmPkt;
+
+static inline bool hex_asm_is_digit(const char c) {
+	return c >= '0' && c <= '9';
+}
+
+static inline bool hex_asm_is_xdigit(const char c) {
+	return hex_asm_is_digit(c) || (c >= 'a' && c <= 'f') || (c >= 'A' && c <= 'F');
+}
+
+static inline bool hex_asm_is_ident_start(const char c) {
+	return (c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || c == '_';
+}
+
+static inline bool hex_asm_is_space(const char c) {
+	return c == ' ' || c == '\t' || c == '\n' || c == '\r' || c == '\v' || c == '\f';
+}
+
+/**
+ * \brief Returns the name of the register \p s (a name or alias of \p len characters, any case). Or NULL if it is none.
+ */
+static const char *hex_asm_reg_lookup(const char *s, size_t len) {
+	char name[HEX_ASM_MAX_REG_NAME];
+	if (len >= sizeof(name)) {
+		return NULL;
+	}
+	for (size_t i = 0; i < len; i++) {
+		name[i] = (s[i] >= 'a' && s[i] <= 'z') ? s[i] - 'a' + 'A' : s[i];
+	}
+	name[len] = '\0';
+	return hex_get_canonical_reg_name(name);
+}
+
+/**
+ * \brief Parses the number at \p s. It starts with a digit or '-'.
+ *
+ * \return The number of characters of the number. Or 0 if it is out of range.
+ */
+static size_t hex_asm_parse_num(const char *s, size_t len, RZ_OUT st64 *num) {
+	size_t i = s[0] == '-' ? 1 : 0;
+	bool is_hex = i + 2 < len && s[i] == '0' && (s[i + 1] == 'x' || s[i + 1] == 'X') && hex_asm_is_xdigit(s[i + 2]);
+	ut64 val = 0;
+	if (is_hex) {
+		for (i += 2; i < len && hex_asm_is_xdigit(s[i]); i++) {
+			if (val > (UT32_MAX >> 4)) {
+				return 0;
+			}
+			char c = s[i];
+			val = (val << 4) | (hex_asm_is_digit(c) ? c - '0' : ((c | 0x20) - 'a' + 10));
+		}
+	} else {
+		for (; i < len && hex_asm_is_digit(s[i]); i++) {
+			val = val * 10 + (s[i] - '0');
+			if (val > UT32_MAX) {
+				return 0;
+			}
+		}
+	}
+	*num = s[0] == '-' ? -(st64)val : (st64)val;
+	return i;
+}
+
+/**
+ * \brief Splits \p len characters of \p s into tokens and appends them to \p toks.
+ * Must produce the same tokens as AssemblerIndex.tokenize() of the generator.
+ *
+ * \return False if there are too many tokens or a number is out of range. True otherwise.
+ */
+static bool hex_asm_tokenize(const char *s, size_t len, RZ_INOUT HexAsmTokens *toks) {
+	size_t i = 0;
+	while (i < len) {
+		char c = s[i];
+		if (hex_asm_is_space(c) || c == '#') {
+			i++;
+			continue;
+		}
+		if (toks->count >= HEX_ASM_MAX_TOKENS) {
+			return false;
+		}
+		HexAsmToken *t = &toks->tokens[toks->count];
+		const HexAsmToken *prev = toks->count ? &toks->tokens[toks->count - 1] : NULL;
+		t->text = s + i;
+		if (hex_asm_is_ident_start(c)) {
+			size_t end = i + 1;
+			while (end < len && (hex_asm_is_ident_start(s[end]) || hex_asm_is_digit(s[end]))) {
+				end++;
+			}
+			t->reg = hex_asm_reg_lookup(s + i, end - i);
+			t->type = t->reg ? HEX_ASM_TOKEN_REG : HEX_ASM_TOKEN_WORD;
+			if (t->reg && end + 1 < len && s[end] == ':' && hex_asm_is_digit(s[end + 1])) {
+				// Register pairs: R1:0, P3:0
+				size_t pair_end = end + 1;
+				while (pair_end < len && hex_asm_is_digit(s[pair_end])) {
+					pair_end++;
+				}
+				const char *pair = hex_asm_reg_lookup(s + i, pair_end - i);
+				if (pair) {
+					t->reg = pair;
+					end = pair_end;
+				}
+			}
+			t->len = end - i;
+		} else if (hex_asm_is_digit(c) ||
+			(c == '-' && i + 1 < len && hex_asm_is_digit(s[i + 1]) && (!prev || prev->type == HEX_ASM_TOKEN_PUNCT))) {
+			// A '-' only belongs to a number if no register, number or word is in front of it: "add(R0,#-1)"
+			t->type = HEX_ASM_TOKEN_NUM;
+			t->len = hex_asm_parse_num(s + i, len - i, &t->num);
+			if (!t->len) {
+				return false;
+			}
+		} else {
+			t->type = HEX_ASM_TOKEN_PUNCT;
+			t->len = 1;
+		}
+		i += t->len;
+		toks->count++;
+	}
+	return true;
+}
+
+/**
+ * \brief Splits the syntax of \p tpl into tokens. The operands are HEX_ASM_TOKEN_OPERAND tokens.
+ */
+static bool hex_asm_tokenize_template(const HexInsnTemplate *tpl, RZ_OUT HexAsmTokens *toks) {
+	size_t syntax_cur = 0;
+	size_t syntax_len = strlen(tpl->syntax);
+	toks->count = 0;
+	for (size_t i = 0; i < HEX_MAX_OPERANDS; i++) {
+		const HexOpTemplate *op = &tpl->ops[i];
+		HexOpTemplateType type = op->info & HEX_OP_TEMPLATE_TYPE_MASK;
+		if (type == HEX_OP_TEMPLATE_TYPE_NONE) {
+			break;
+		}
+		if (op->syntax > syntax_cur && op->syntax <= syntax_len) {
+			if (!hex_asm_tokenize(tpl->syntax + syntax_cur, op->syntax - syntax_cur, toks)) {
+				return false;
+			}
+			syntax_cur = op->syntax;
+		}
+		if (toks->count >= HEX_ASM_MAX_TOKENS) {
+			return false;
+		}
+		HexAsmToken *t = &toks->tokens[toks->count++];
+		t->type = HEX_ASM_TOKEN_OPERAND;
+		t->text = type == HEX_OP_TEMPLATE_TYPE_REG ? "%r" : "%i";
+		t->len = 2;
+		t->op = i;
+	}
+	return hex_asm_tokenize(tpl->syntax + syntax_cur, syntax_len - syntax_cur, toks);
+}
+
+/**
+ * \brief Builds the key of the tokens. Like AssemblerIndex.get_key() of the generator.
+ *
+ * \return False if the key does not fit into \p key. True otherwise.
+ */
+static bool hex_asm_get_key(const HexAsmTokens *toks, RZ_OUT char *key, size_t size) {
+	size_t k = 0;
+	for (size_t i = 0; i < toks->count; i++) {
+		const HexAsmToken *t = &toks->tokens[i];
+		const char *text = t->text;
+		size_t len = t->len;
+		if (t->type == HEX_ASM_TOKEN_REG) {
+			text = "%r";
+			len = 2;
+		} else if (t->type == HEX_ASM_TOKEN_NUM) {
+			text = "%i";
+			len = 2;
+		}
+		if (k + len + 2 > size) {
+			return false;
+		}
+		if (t->type == HEX_ASM_TOKEN_WORD && i > 0 && toks->tokens[i - 1].type == HEX_ASM_TOKEN_WORD) {
+			key[k++] = ' ';
+		}
+		for (size_t j = 0; j < len; j++) {
+			char c = text[j];
+			key[k++] = t->type == HEX_ASM_TOKEN_WORD && c >= 'A' && c <= 'Z' ? c - 'A' + 'a' : c;
+		}
+	}
+	key[k] = '\0';
+	return true;
+}
+
+static ut32 hex_asm_key_hash(const char *key) {
+	// 32bit FNV-1a
+	ut32 h = 0x811c9dc5;
+	for (; *key; key++) {
+		h = (h ^ (ut8)*key) * 0x01000193;
+	}
+	return h;
+}
+
+static const HexAsmIndexEntry *hex_asm_lookup(const char *key) {
+	size_t mask = RZ_ARRAY_SIZE(hex_asm_index) - 1;
+	for (size_t slot = hex_asm_key_hash(key) & mask;; slot = (slot + 1) & mask) {
+		const HexAsmIndexEntry *e = &hex_asm_index[slot];
+		if (!e->key) {
+			return NULL;
+		}
+		if (!strcmp(e->key, key)) {
+			return e;
+		}
+	}
+}
+
+/**
+ * \brief Inverse of hex_op_masks_extract(). Returns the bits of \p val placed at the positions described by \p masks.
+ */
+static ut32 hex_op_masks_insert(const HexOpMask *masks, ut32 val) {
+	ut8 off = 0;
+	ut32 r = 0;
+	for (size_t i = 0; i < HEX_OP_MASKS_MAX; i++) {
+		const HexOpMask *m = &masks[i];
+		if (!m->bits) {
+			break;
+		}
+		r |= ((val >> off) & rz_num_bitmask(m->bits)) << m->shift;
+		off += m->bits;
+	}
+	return r;
+}
+
+/**
+ * \brief Encodes the immediate \p value into \p word.
+ *
+ * \param allow_ext If set, values which do not fit into the operand are encoded with a constant extender.
+ * \param ext_value Set to the value of the constant extender if one is needed.
+ * \return True if the value could be encoded. False otherwise.
+ */
+static bool hex_asm_encode_imm(const HexOpTemplate *op, st64 value, bool allow_ext, RZ_INOUT ut32 *word, RZ_OUT bool *extended, RZ_OUT ut32 *ext_value) {
+	ut32 bits_total;
+	hex_op_masks_extract(op->masks, 0, &bits_total);
+	if (!bits_total || bits_total > 32) {
+		return false;
+	}
+	bool is_signed = op->info & HEX_OP_TEMPLATE_FLAG_IMM_SIGNED;
+	if (is_signed && value > ST32_MAX && value <= UT32_MAX) {
+		// Negative values are printed as 32bit hex numbers if plugins.hexagon.imm.sign is not set.
+		value = (st32)value;
+	}
+	st64 min = is_signed ? -(1ll << (bits_total - 1)) : 0;
+	st64 max = is_signed ? (1ll << (bits_total - 1)) - 1 : (st64)rz_num_bitmask(bits_total);
+	st64 field = value >> op->imm_scale;
+	if (!(value & rz_num_bitmask(op->imm_scale)) && field >= min && field <= max) {
+		*word |= hex_op_masks_insert(op->masks, field);
+		return true;
+	}
+	if (!allow_ext || !(op->info & HEX_OP_TEMPLATE_FLAG_IMM_EXTENDABLE) || bits_total < 6 || value < INT32_MIN || value > UT32_MAX) {
+		return false;
+	}
+	// The lower 6 bits are in the instruction. The extender holds all others (see hex_extend_op()).
+	*word |= hex_op_masks_insert(op->masks, value & 0x3f);
+	*extended = true;
+	*ext_value = (ut32)value & ~0x3f;
+	return true;
+}
+
+/**
+ * \brief Returns the bits of a .new register operand (Nt.new) which refers to the producer of \p reg in \p pkt.
+ * Inverse of resolve_n_register(). Returns -1 if no instruction of the packet produces \p reg.
+ */
+static int hex_asm_n_reg_bits(const HexAsmPkt *pkt, int reg) {
+	ut8 ahead = 0;
+	for (size_t i = pkt->count; i > 0; i--) {
+		ut8 producer = pkt->producers[i - 1];
+		if (producer == HEX_PRODUCER_EXT) {
+			// Constant extenders are skipped.
+			continue;
+		}
+		ahead++;
+		if (producer == reg) {
+			return ahead <= 3 ? ahead << 1 : -1;
+		}
+	}
+	return -1;
+}
+
+/**
+ * \brief Encodes the instruction \p in with the template \p tpl.
+ * The key of \p in must be the key of \p tpl.
+ *
+ * \param allow_ext Use a constant extender for immediates which do not fit into their operand.
+ * \param word The encoded instruction. Without parse bits.
+ * \param extended Set if the instruction needs a constant extender with the value \p ext_value.
+ * \return True if \p in could be encoded with \p tpl. False otherwise.
+ */
+static bool hex_asm_encode_insn(const HexInsnTemplate *tpl, const HexAsmTokens *in, bool allow_ext, const HexAsmPkt *pkt, RZ_OUT ut32 *word, RZ_OUT bool *extended, RZ_OUT ut32 *ext_value) {
+	HexAsmTokens tt;
+	if (!hex_asm_tokenize_template(tpl, &tt) || tt.count != in->count) {
+		return false;
+	}
+	*word = tpl->encoding.op;
+	*extended = false;
+	for (size_t i = 0; i < tt.count; i++) {
+		const HexAsmToken *t = &tt.tokens[i];
+		const HexAsmToken *v = &in->tokens[i];
+		switch (t->type) {
+		default:
+			// Words and punctuation are equal if the keys are.
+			break;
+		case HEX_ASM_TOKEN_REG:
+			// Registers fixed by the syntax: "jumpr R31", "allocframe(SP,#Ii):raw"
+			if (v->type != HEX_ASM_TOKEN_REG || strcmp(t->reg, v->reg)) {
+				return false;
+			}
+			break;
+		case HEX_ASM_TOKEN_NUM:
+			if (v->type != HEX_ASM_TOKEN_NUM || t->num != v->num) {
+				return false;
+			}
+			break;
+		case HEX_ASM_TOKEN_OPERAND: {
+			const HexOpTemplate *op = &tpl->ops[t->op];
+			switch (op->info & HEX_OP_TEMPLATE_TYPE_MASK) {
+			default:
+				return false;
+			case HEX_OP_TEMPLATE_TYPE_REG: {
+				if (v->type != HEX_ASM_TOKEN_REG) {
+					return false;
+				}
+				int reg = hex_get_reg_index_in_class(op->reg_cls, v->reg);
+				if (reg >= 0 && (op->info & HEX_OP_TEMPLATE_FLAG_REG_N_REG)) {
+					reg = hex_asm_n_reg_bits(pkt, reg);
+				}
+				if (reg < 0) {
+					return false;
+				}
+				// The register bits of the pair and quadruple classes are pre-remapped in the name tables.
+				*word |= hex_op_masks_insert(op->masks, reg);
+				break;
+			}
+			case HEX_OP_TEMPLATE_TYPE_IMM: {
+				if (v->type != HEX_ASM_TOKEN_NUM) {
+					return false;
+				}
+				st64 value = v->num;
+				if (op->info & HEX_OP_TEMPLATE_FLAG_IMM_PC_RELATIVE) {
+					value = (st32)((ut32)value - pkt->addr);
+				}
+				if (!hex_asm_encode_imm(op, value, allow_ext, word, extended, ext_value)) {
+					return false;
+				}
+				break;
+			}
+			case HEX_OP_TEMPLATE_TYPE_IMM_CONST:
+				if (v->type != HEX_ASM_TOKEN_NUM || v->num != -1) {
+					return false;
+				}
+				break;
+			}
+			break;
+		}
+		}
+	}
+	return true;
+}
+
+static bool hex_asm_pkt_push(RZ_INOUT HexAsmPkt *pkt, ut32 word, ut8 producer) {
+	if (pkt->count >= HEX_ASM_MAX_WORDS) {
+		RZ_LOG_ERROR("A packet has at most %d instructions.\n", HEX_ASM_MAX_WORDS);
+		return false;
+	}
+	pkt->words[pkt->count] = word;
+	pkt->producers[pkt->count] = producer;
+	pkt->count++;
+	return true;
+}
+
+/**
+ * \brief Assembles a single instruction and appends it (and its constant extender) to \p pkt.
+ */
+static bool hex_asm_insn(const char *text, size_t len, RZ_INOUT HexAsmPkt *pkt) {
+	HexAsmTokens in = { 0 };
+	char key[HEX_ASM_MAX_KEY];
+	if (!hex_asm_tokenize(text, len, &in) || !hex_asm_get_key(&in, key, sizeof(key))) {
+		RZ_LOG_ERROR("Could not parse \"%.*s\".\n", (int)len, text);
+		return false;
+	}
+	const HexAsmIndexEntry *e = hex_asm_lookup(key);
+	if (!e) {
+		RZ_LOG_ERROR("Unknown instruction \"%.*s\".\n", (int)len, text);
+		return false;
+	}
+	// Templates without constant extender are preferred. So the first pass does not allow them.
+	for (size_t pass = 0; pass < 2; pass++) {
+		for (size_t i = e->first; i < e->first + e->count; i++) {
+			const HexInsnTemplate *tpl = hex_asm_candidates[i];
+			ut32 word;
+			bool extended;
+			ut32 ext_value;
+			if (!hex_asm_encode_insn(tpl, &in, pass == 1, pkt, &word, &extended, &ext_value)) {
+				continue;
+			}
+			if (extended) {
+				if (!hex_asm_ext_template) {
+					return false;
+				}
+				const HexOpTemplate *ext_op = &hex_asm_ext_template->ops[0];
+				ut32 ext_word = hex_asm_ext_template->encoding.op | hex_op_masks_insert(ext_op->masks, ext_value >> ext_op->imm_scale);
+				if (!hex_asm_pkt_push(pkt, ext_word, HEX_PRODUCER_EXT)) {
+					return false;
+				}
+			}
+			ut8 producer = tpl->out_op != HEX_OP_TEMPLATE_NO_OUT ? hex_op_masks_extract(tpl->ops[tpl->out_op].masks, word, NULL) : HEX_PRODUCER_NONE;
+			return hex_asm_pkt_push(pkt, word, producer);
+		}
+	}
+	RZ_LOG_ERROR("The operands of \"%.*s\" can not be encoded.\n", (int)len, text);
+	return false;
+}
+
+/**
+ * \brief Assembles a packet.
+ *
+ * The instructions of a packet are enclosed in '{' '}' and separated by ';' or new lines.
+ * The closing bracket can be followed by ":endloop0", ":endloop1" or ":endloop01".
+ * The brackets can be omitted for a single instruction. Constant extenders are added if an immediate needs one.
+ * Duplex instructions are not generated.
+ *
+ * \param text The packet. E.g. "{ R0 = add(R1,#0x10); P0 = cmp.eq(R0,#0x20) }".
+ * \param addr The address of the packet. Used for PC relative immediates.
+ * \param words The encoded instructions, including the parse bits.
+ * \param max_words The size of \p words.
+ * \return The number of instructions written to \p words. Or -1 in case of an error.
+ */
+RZ_API int hexagon_assemble_packet(RZ_NONNULL const char *text, ut32 addr, RZ_OUT ut32 *words, size_t max_words) {
+	rz_return_val_if_fail(text && words, -1);
+	HexAsmPkt pkt = { .addr = addr };
+	const char *end = text + strlen(text);
+	const char *close = strrchr(text, '}');
+	HexLoopAttr loop = HEX_NO_LOOP;
+	if (close) {
+		const char *suffix = close + 1;
+		while (suffix < end && (hex_asm_is_space(*suffix) || *suffix == ':')) {
+			suffix++;
+		}
+		size_t suffix_len = end - suffix;
+		while (suffix_len && hex_asm_is_space(suffix[suffix_len - 1])) {
+			suffix_len--;
+		}
+		if (suffix_len == 8 && !strncmp(suffix, "endloop0", 8)) {
+			loop = HEX_LOOP_0;
+		} else if (suffix_len == 8 && !strncmp(suffix, "endloop1", 8)) {
+			loop = HEX_LOOP_1;
+		} else if (suffix_len == 9 && !strncmp(suffix, "endloop01", 9)) {
+			loop = HEX_LOOP_01;
+		} else if (suffix_len) {
+			RZ_LOG_ERROR("Unknown packet suffix \"%.*s\".\n", (int)suffix_len, suffix);
+			return -1;
+		}
+		end = close;
+	}
+	const char *s = text;
+	while (s < end && hex_asm_is_space(*s)) {
+		s++;
+	}
+	if (s < end && *s == '{') {
+		s++;
+	}
+	while (s < end) {
+		const char *stmt_end = s;
+		while (stmt_end < end && *stmt_end != ';' && *stmt_end != '\n') {
+			stmt_end++;
+		}
+		const char *c = s;
+		while (c < stmt_end && hex_asm_is_space(*c)) {
+			c++;
+		}
+		if (c < stmt_end && !hex_asm_insn(s, stmt_end - s, &pkt)) {
+			return -1;
+		}
+		s = stmt_end + 1;
+	}
+	if (!pkt.count || pkt.count > max_words) {
+		return -1;
+	}
+
+	// Parse bits: 0b01 for all instructions, 0b11 for the last one. The loop ends are marked with 0b10.
+	for (size_t i = 0; i < pkt.count; i++) {
+		pkt.words[i] = (pkt.words[i] & ~HEX_PARSE_BITS_MASK) | ((i == pkt.count - 1 ? 0x3 : 0x1) << 14);
+	}
+	size_t min_count = loop == HEX_NO_LOOP ? 1 : (loop == HEX_LOOP_0 ? 2 : 3);
+	if (pkt.count < min_count) {
+		RZ_LOG_ERROR("A packet ending a hardware loop needs at least %d instructions.\n", (int)min_count);
+		return -1;
+	}
+	if (loop == HEX_LOOP_0 || loop == HEX_LOOP_01) {
+		pkt.words[0] = (pkt.words[0] & ~HEX_PARSE_BITS_MASK) | (0x2 << 14);
+	}
+	if (loop == HEX_LOOP_1 || loop == HEX_LOOP_01) {
+		pkt.words[1] = (pkt.words[1] & ~HEX_PARSE_BITS_MASK) | (0x2 << 14);
+	}
+	memcpy(words, pkt.words, pkt.count * sizeof(ut32));
+	return pkt.count;
+}
@@ -98,29 +98,14 @@ static int get_jmp_target_imm_op_index(const HexInsnTemplate *tpl) {
 	return has_imm && i == 1 ? 0 : -1;
 }
 
-static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *state, ut32 hi_u32, RZ_INOUT HexInsn *hi, HexInsnContainer *hic, ut64 addr, HexPkt *pkt) {
-	bool print_reg_alias = rz_config_get_b(state->cfg, "plugins.hexagon.reg.alias");
-	bool show_hash = rz_config_get_b(state->cfg, "plugins.hexagon.imm.hash");
-	bool sign_nums = rz_config_get_b(state->cfg, "plugins.hexagon.imm.sign");
+/**
+ * \brief Decodes the operands of \p hi_u32 as described by the operand templates of \p tpl.
+ * The textual disassembly is built by copying tpl->syntax while inserting the operands at the right positions.
+ *
+ * \param sb The string buffer the textual disassembly is written to.
+ */
+static void hex_decode_ops(const HexInsnTemplate *tpl, HexState *state, const ut32 hi_u32, RZ_INOUT HexInsn *hi, const HexInsnContainer *hic, const ut64 addr, const HexPkt *pkt, const HexDecodeCfg *cfg, RZ_OUT RzStrBuf *sb) {
 	char signed_imm[HEX_MAX_OPERANDS][32];
-	// Find the right template
-	for (; tpl->id; tpl++) {
-		if ((hi_u32 & tpl->encoding.mask) == tpl->encoding.op) {
-			break;
-		}
-	}
-	if (!tpl->id) {
-		// unknown/invalid
-		return;
-	}
-	hi->addr = addr;
-	hi->identifier = tpl->id;
-	hi->opcode = hi_u32;
-	hi->pred = tpl->pred;
-
-	// textual disasm is built by copying tpl->syntax while inserting the ops at the right positions
-	RzStrBuf sb;
-	rz_strbuf_init(&sb);
 	size_t syntax_cur = 0;
 	size_t syntax_len = strlen(tpl->syntax);
 
@@ -133,7 +118,7 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 		}
 
 		if (op->syntax > syntax_cur && op->syntax <= syntax_len) {
-			rz_strbuf_append_n(&sb, tpl->syntax + syntax_cur, op->syntax - syntax_cur);
+			rz_strbuf_append_n(sb, tpl->syntax + syntax_cur, op->syntax - syntax_cur);
 			syntax_cur = op->syntax;
 		}
 
@@ -159,20 +144,20 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 				hex_extend_op(state, &hi->ops[i], false, addr);
 			}
 			// textual disasm
-			const char *h = show_hash ? ((op->info & HEX_OP_TEMPLATE_FLAG_IMM_DOUBLE_HASH) ? "##" : "#") : "";
+			const char *h = cfg->show_hash ? ((op->info & HEX_OP_TEMPLATE_FLAG_IMM_DOUBLE_HASH) ? "##" : "#") : "";
 			if (op->info & HEX_OP_TEMPLATE_FLAG_IMM_PC_RELATIVE) {
-				rz_strbuf_appendf(&sb, "0x%" PFMT32x, pkt->pkt_addr + (st32)hi->ops[i].op.imm);
+				rz_strbuf_appendf(sb, "0x%" PFMT32x, pkt->pkt_addr + (st32)hi->ops[i].op.imm);
 			} else if (op->info & HEX_OP_TEMPLATE_FLAG_IMM_SIGNED) {
-				if (sign_nums && ((st32)hi->ops[i].op.imm) < 0) {
+				if (cfg->sign_nums && ((st32)hi->ops[i].op.imm) < 0) {
 					char tmp[28] = { 0 };
 					rz_hex_ut2st_str(hi->ops[i].op.imm, tmp, 28);
 					snprintf(signed_imm[i], sizeof(signed_imm[i]), "%s%s", h, tmp);
 				} else {
 					snprintf(signed_imm[i], sizeof(signed_imm[i]), "%s0x%" PFMT32x, h, (st32)hi->ops[i].op.imm);
 				}
-				rz_strbuf_append(&sb, signed_imm[i]);
+				rz_strbuf_append(sb, signed_imm[i]);
 			} else {
-				rz_strbuf_appendf(&sb, "%s0x%" PFMT32x, h, (ut32)hi->ops[i].op.imm);
+				rz_strbuf_appendf(sb, "%s0x%" PFMT32x, h, (ut32)hi->ops[i].op.imm);
 			}
 			break;
 		}
@@ -180,7 +165,7 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 			hi->ops[i].type = HEX_OP_TYPE_IMM;
 			hi->ops[i].op.imm = -1;
 			// textual disasm
-			rz_strbuf_append(&sb, "-1");
+			rz_strbuf_append(sb, "-1");
 			break;
 		case HEX_OP_TEMPLATE_TYPE_REG:
 			hi->ops[i].type = HEX_OP_TYPE_REG;
@@ -197,9 +182,17 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 			// textual disasm
 			int regidx = hi->ops[i].op.reg;
 			if (op->info & HEX_OP_TEMPLATE_FLAG_REG_N_REG) {
+				HEX_PROF_START(t_new_reg);
 				regidx = resolve_n_register(hi->ops[i].op.reg, hic->addr, pkt);
+				HEX_PROF_STOP(state, HEX_PROF_NEW_REG, t_new_reg);
+			}
+			if (op->info & HEX_OP_TEMPLATE_FLAG_REG_IN) {
+				hex_reg_set_add(&hi->regs_read, op->reg_cls, regidx);
+			}
+			if (op->info & HEX_OP_TEMPLATE_FLAG_REG_OUT) {
+				hex_reg_set_add(&hi->regs_written, op->reg_cls, regidx);
 			}
-			rz_strbuf_append(&sb, hex_get_reg_in_class(op->reg_cls, regidx, print_reg_alias));
+			rz_strbuf_append(sb, hex_get_reg_in_class(op->reg_cls, regidx, cfg->reg_alias));
 			break;
 		default:
 			rz_warn_if_reached();
@@ -207,15 +200,79 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 		}
 	}
 
-	// Textual disassembly
 	if (syntax_len > syntax_cur) {
-		rz_strbuf_append_n(&sb, tpl->syntax + syntax_cur, syntax_len - syntax_cur);
+		rz_strbuf_append_n(sb, tpl->syntax + syntax_cur, syntax_len - syntax_cur);
 	}
-	strncpy(hi->text_infix, rz_strbuf_get(&sb), sizeof(hi->text_infix) - 1);
+}
+
+/**
+ * \brief Appends a signed immediate to the textual disassembly. Used by the specialized operand decoders.
+ */
+static inline void hex_append_signed_imm(RZ_OUT RzStrBuf *sb, const char *h, const st64 imm, const bool sign_nums) {
+	if (sign_nums && ((st32)imm) < 0) {
+		char tmp[28] = { 0 };
+		rz_hex_ut2st_str(imm, tmp, 28);
+		rz_strbuf_appendf(sb, "%s%s", h, tmp);
+	} else {
+		rz_strbuf_appendf(sb, "%s0x%" PFMT32x, h, (st32)imm);
+	}
+}
+
+#ifdef HEX_DECODE_SPECIALIZED
+// Generated. Calls the decoder of the template id and hex_decode_ops() for all others.
+static void hex_decode_ops_specialized(const HexInsnTemplate *tpl, HexState *state, const ut32 hi_u32, RZ_INOUT HexInsn *hi, const HexInsnContainer *hic, const ut64 addr, const HexPkt *pkt, const HexDecodeCfg *cfg, RZ_OUT RzStrBuf *sb);
+#endif
+
+/**
+ * \brief Decodes the operands and the textual disassembly of \p hi_u32 with the template \p tpl.
+ * It sets all members of \p hi, but does not touch the analysis information of \p hic.
+ */
+static void hex_decode_insn(const HexInsnTemplate *tpl, HexState *state, ut32 hi_u32, RZ_INOUT HexInsn *hi, const HexInsnContainer *hic, ut64 addr, const HexPkt *pkt) {
+	hi->addr = addr;
+	hi->identifier = tpl->id;
+	hi->opcode = hi_u32;
+	hi->pred = tpl->pred;
+	hi->regs_read = hex_implicit_reg_sets[tpl->implicit_read];
+	hi->regs_written = hex_implicit_reg_sets[tpl->implicit_write];
+	hi->mem = tpl->mem;
+
+	HexDecodeCfg cfg = {
+		.reg_alias = rz_config_get_b(state->cfg, "plugins.hexagon.reg.alias"),
+		.show_hash = rz_config_get_b(state->cfg, "plugins.hexagon.imm.hash"),
+		.sign_nums = rz_config_get_b(state->cfg, "plugins.hexagon.imm.sign"),
+	};
+	RzStrBuf sb;
+	rz_strbuf_init(&sb);
+#ifdef HEX_DECODE_SPECIALIZED
+	hex_decode_ops_specialized(tpl, state, hi_u32, hi, hic, addr, pkt, &cfg, &sb);
+#else
+	hex_decode_ops(tpl, state, hi_u32, hi, hic, addr, pkt, &cfg, &sb);
+#endif
+
+	hi->text_infix = hex_str_arena_add(state, rz_strbuf_get(&sb));
+	rz_strbuf_fini(&sb);
+}
+
+/**
+ * \brief Decodes \p hi_u32 with the first matching template of \p tpl.
+ *
+ * \return True if a template matched. False otherwise (\p hi is not touched).
+ */
+static bool hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *state, ut32 hi_u32, RZ_INOUT HexInsn *hi, HexInsnContainer *hic, ut64 addr, HexPkt *pkt) {
+	// Find the right template
+	for (; tpl->id; tpl++) {
+		HEX_PROF_INC(state, templates_probed);
+		if ((hi_u32 & tpl->encoding.mask) == tpl->encoding.op) {
+			break;
+		}
+	}
+	if (!tpl->id) {
+		// unknown/invalid
+		return false;
+	}
+	hex_decode_insn(tpl, state, hi_u32, hi, hic, addr, pkt);
 
 	// RzAnalysisOp contents
-	hic->ana_op.addr = hic->addr;
-	hic->ana_op.size = 4;
 	hic->ana_op.cond = tpl->cond;
 	// TODO Will always overwrite the type of the previous sub instruction if this is a duplex.
 	//   -> Impossible to solve currently. Wait for RzArch with this.
@@ -227,7 +284,7 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 		}
 		hic->ana_op.jump = pkt->pkt_addr + (st32)hi->ops[jmp_target_imm_op_index].op.imm;
 		if (tpl->flags & HEX_INSN_TEMPLATE_FLAG_PREDICATED) {
-			hic->ana_op.fail = hic->ana_op.addr + 4;
+			hic->ana_op.fail = hic->addr + 4;
 		}
 		if (tpl->flags & HEX_INSN_TEMPLATE_FLAG_LOOP_BEGIN) {
 			if (tpl->flags & HEX_INSN_TEMPLATE_FLAG_LOOP_0) {
@@ -256,9 +313,91 @@ static void hex_disasm_with_templates(const HexInsnTemplate *tpl, HexState *stat
 		}
 	}
 
+	if (tpl->mem.size) {
+		hic->ana_op.direction |= tpl->mem.direction;
+		if (hex_mem_addr_is_absolute(hi)) {
+			hic->ana_op.ptr = hi->ops[tpl->mem.offset].op.imm;
+			hic->ana_op.refptr = tpl->mem.size;
+		}
+	}
+
 	if (tpl->id == HEX_INS_A4_EXT) {
 		hex_extend_op(state, &(hi->ops[0]), true, addr);
+		hex_pkt_set_producer(pkt, hic->addr, HEX_PRODUCER_EXT);
+	} else if (tpl->out_op != HEX_OP_TEMPLATE_NO_OUT && (!hic->is_duplex || hi == hic->bin.sub[1])) {
+		// Of a duplex only the low sub-instruction is the producer.
+		hex_pkt_set_producer(pkt, hic->addr, hi->ops[tpl->out_op].op.reg);
 	}
+	return true;
+}
+
+/**
+ * \brief Returns the information of an instruction.
+ *
+ * \param id The instruction id.
+ * \return const HexInsnInfo* The information or NULL if \p id is no valid instruction id.
+ */
+static inline const HexInsnInfo *hex_get_insn_info(HexInsnID id) {
+	if ((ut32)id >= HEX_INS_COUNT || !hex_insn_info[id].tpl) {
+		return NULL;
+	}
+	return &hex_insn_info[id];
+}
+
+/**
+ * \brief Returns the name of an instruction (e.g. "A2_addi").
+ *
+ * \param id The instruction id.
+ * \return const char* The name or NULL if \p id is no valid instruction id.
+ */
+RZ_API RZ_BORROW const char *hex_get_insn_name(HexInsnID id) {
+	const HexInsnInfo *info = hex_get_insn_info(id);
+	return info ? info->name : NULL;
+}
+
+/**
+ * \brief Returns the RzAnalysisOpType of an instruction.
+ *
+ * \param id The instruction id.
+ * \return ut32 The type or RZ_ANALYSIS_OP_TYPE_ILL if \p id is no valid instruction id.
+ */
+RZ_API ut32 hex_get_insn_op_type(HexInsnID id) {
+	const HexInsnInfo *info = hex_get_insn_info(id);
+	return info ? info->type : RZ_ANALYSIS_OP_TYPE_ILL;
+}
+
+/**
+ * \brief Decodes the operands and the textual disassembly of a buffered instruction again.
+ * The template is looked up by the instruction id. So no template table is searched.
+ * The analysis information of the container is not changed.
+ * It can be used to update the text of buffered instructions after the configuration changed.
+ *
+ * \param state The state which holds the text of the instruction.
+ * \param hic The container of the instruction.
+ * \param pkt The packet of the container.
+ * \param hi The instruction (hic->bin.insn or a sub-instruction of hic). Its identifier, opcode and address are used.
+ * \return bool True if the instruction was decoded. False if it is invalid.
+ */
+RZ_API bool hex_insn_redecode(HexState *state, const HexInsnContainer *hic, const HexPkt *pkt, RZ_INOUT HexInsn *hi) {
+	rz_return_val_if_fail(state && hic && pkt && hi, false);
+	const HexInsnInfo *info = hex_get_insn_info(hi->identifier);
+	if (!info || hi->identifier == HEX_INS_INVALID_DECODE) {
+		return false;
+	}
+	// The constant extender was consumed by the first decoding. Its bits are the upper bits of the extended immediate.
+	for (size_t i = 0; i < hi->op_count; i++) {
+		if (hi->ops[i].type == HEX_OP_TYPE_IMM && hi->ops[i].attr & HEX_OP_CONST_EXT) {
+			HexOp ext = { .type = HEX_OP_TYPE_IMM, .op.imm = hi->ops[i].op.imm & ~0x3Fll };
+			hex_extend_op(state, &ext, true, hi->addr - 4);
+			break;
+		}
+	}
+	hex_decode_insn(info->tpl, state, hi->opcode, hi, hic, hi->addr, pkt);
+	return true;
+}
+
+static inline bool hex_feature_enabled(const HexState *state, HexFeature feature) {
+	return !state->feature_cfg[feature] || state->feature_cfg[feature]->i_value;
 }
 
 /**
@@ -278,8 +417,8 @@ static void hex_set_invalid_duplex(const ut32 hi_u32, RZ_INOUT RZ_NONNULL HexIns
 	hi_high->identifier = HEX_INS_INVALID_DECODE;
 	hi_low->identifier = HEX_INS_INVALID_DECODE;
 	hic->ana_op.type = RZ_ANALYSIS_OP_TYPE_ILL;
-	snprintf(hi_high->text_infix, sizeof(hi_high->text_infix), "invalid");
-	snprintf(hi_low->text_infix, sizeof(hi_low->text_infix), "invalid");
+	hi_high->text_infix = HEX_STR_INVALID;
+	hi_low->text_infix = HEX_STR_INVALID;
 }
 
 int hexagon_disasm_instruction(HexState *state, const ut32 hi_u32, RZ_INOUT HexInsnContainer *hic, HexPkt *pkt) {
@@ -323,7 +462,6 @@ int hexagon_disasm_instruction(HexState *state, const ut32 hi_u32, RZ_INOUT HexI
 			const HexInsnTemplate *tmp_low = get_sub_template_table(iclass, false);
 			if (!(tmp_high && tmp_low)) {
 				hex_set_invalid_duplex(hi_u32, hic);
-				hex_set_hic_text(hic);
 				return 4;
 			}
 			hex_disasm_with_templates(tmp_high, state, opcode_high, hi_high, hic, addr, pkt);
@@ -334,7 +472,14 @@ int hexagon_disasm_instruction(HexState *state, const ut32 hi_u32, RZ_INOUT HexI
 		} else {
 			hic->is_duplex = false;
 			ut32 cat = (hi_u32 >> 28) & 0xF;
-			hex_disasm_with_templates(templates_normal[cat], state, hi_u32, hic->bin.insn, hic, addr, pkt);
+			for (size_t f = 0; f < HEX_FEATURE_COUNT; f++) {
+				if (!templates_normal[f][cat] || !hex_feature_enabled(state, f)) {
+					continue;
+				}
+				if (hex_disasm_with_templates(templates_normal[f][cat], state, hi_u32, hic->bin.insn, hic, addr, pkt)) {
+					break;
+				}
+			}
 			hic->identifier = hic->bin.insn->identifier;
 		}
 	}
@@ -345,8 +490,7 @@ int hexagon_disasm_instruction(HexState *state, const ut32 hi_u32, RZ_INOUT HexI
 		hic->ana_op.type = RZ_ANALYSIS_OP_TYPE_ILL;
 		HexInsn *hi = hexagon_alloc_instr();
 		hic->bin.insn = hi;
-		snprintf(hic->bin.insn->text_infix, sizeof(hic->bin.insn->text_infix), "invalid");
+		hic->bin.insn->text_infix = HEX_STR_INVALID;
 	}
-	hex_set_hic_text(hic);
 	return 4;
 }
@@ -2,6 +2,7 @@
 // SPDX-License-Identifier: LGPL-3.0-only
 
 #define HEX_OP_MASKS_MAX 4
+#define HEX_OP_TEMPLATE_NO_OUT UT8_MAX
 
 typedef enum {
 	HEX_OP_TEMPLATE_TYPE_NONE = 0,
@@ -18,6 +19,7 @@ typedef enum {
 	HEX_OP_TEMPLATE_FLAG_REG_PAIR = 1 << 3,
 	HEX_OP_TEMPLATE_FLAG_REG_QUADRUPLE = 1 << 4,
 	HEX_OP_TEMPLATE_FLAG_REG_N_REG = 1 << 5,
+	HEX_OP_TEMPLATE_FLAG_REG_IN = 1 << 6,
 	// for HEX_OP_TEMPLATE_TYPE_IMM:
 	HEX_OP_TEMPLATE_FLAG_IMM_SIGNED = 1 << 2,
 	HEX_OP_TEMPLATE_FLAG_IMM_EXTENDABLE = 1 << 3,
@@ -65,6 +67,39 @@ typedef struct {
 	ut8 pred; // HexPred
 	ut8 cond; // RzTypeCond
 	ut8 flags; // HexInsnTemplateFlag
+	ut8 out_op; // index of the first output register in ops or HEX_OP_TEMPLATE_NO_OUT
+	ut8 implicit_read; // index into hex_implicit_reg_sets
+	ut8 implicit_write; // index into hex_implicit_reg_sets
+	HexMemAccess mem; // only set for loads and stores
 	const char *syntax;
 	_RzAnalysisOpType type;
 } HexInsnTemplate;
+
+/**
+ * \brief The information of an instruction by its HexInsnID (see hex_insn_info).
+ */
+typedef struct {
+	const HexInsnTemplate *tpl; // the template in its template table
+	const char *name; // the instruction name (e.g. "A2_addi")
+	_RzAnalysisOpType type; // same as tpl->type
+	ut8 flags; // same as tpl->flags (HexInsnTemplateFlag)
+} HexInsnInfo;
+
+/**
+ * \brief The plugin configuration the operand decoders need. It is read once per instruction word.
+ */
+typedef struct {
+	bool reg_alias; ///< plugins.hexagon.reg.alias
+	bool show_hash; ///< plugins.hexagon.imm.hash
+	bool sign_nums; ///< plugins.hexagon.imm.sign
+} HexDecodeCfg;
+
+/**
+ * \brief Entry of the generated hash table of the assembler (hex_asm_index).
+ * The templates which can encode a text with the key are hex_asm_candidates[first] ... hex_asm_candidates[first + count - 1].
+ */
+typedef struct {
+	const char *key; ///< Key of the syntax. NULL for empty slots.
+	ut16 first;
+	ut16 count;
+} HexAsmIndexEntry;
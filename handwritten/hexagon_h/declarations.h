@@ -4,4 +4,11 @@
 RZ_API RZ_BORROW RzConfig *hexagon_get_config();
 RZ_API void hex_extend_op(HexState *state, RZ_INOUT HexOp *op, const bool set_new_extender, const ut32 addr);
 int resolve_n_register(const int reg_num, const ut32 addr, const HexPkt *p);
+RZ_API void hex_reg_set_union(RZ_INOUT HexRegSet *dest, const HexRegSet *src);
+RZ_API bool hex_reg_set_intersects(const HexRegSet *a, const HexRegSet *b);
+RZ_API bool hex_mem_addr_is_absolute(const HexInsn *hi);
 int hexagon_disasm_instruction(HexState *state, const ut32 hi_u32, RZ_INOUT HexInsnContainer *hi, HexPkt *pkt);
+RZ_API RZ_BORROW const char *hex_get_insn_name(HexInsnID id);
+RZ_API ut32 hex_get_insn_op_type(HexInsnID id);
+RZ_API bool hex_insn_redecode(HexState *state, const HexInsnContainer *hic, const HexPkt *pkt, RZ_INOUT HexInsn *hi);
+RZ_API int hexagon_assemble_packet(RZ_NONNULL const char *text, ut32 addr, RZ_OUT ut32 *words, size_t max_words);
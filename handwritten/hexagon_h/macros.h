@@ -6,3 +6,20 @@
 #define BF_PREP(x, start, len) (((x)&BIT_MASK(len))<<(start))
 #define BF_GET(y, start, len) (((y)>>(start)) & BIT_MASK(len))
 #define BF_GETB(y, start, end) (BF_GET((y), (start), (end) - (start) + 1)
+
+// Instrumentation of the hot paths. Compile with -DHEX_PROFILE to enable it. Otherwise the macros are empty.
+#ifdef HEX_PROFILE
+#if defined(__x86_64__) || defined(__i386__)
+#define HEX_PROF_TICKS() __builtin_ia32_rdtsc()
+#else
+#define HEX_PROF_TICKS() rz_time_now_mono()
+#endif
+#define HEX_PROF_ADD(state, counter, n) ((state)->prof.counter += (n))
+#define HEX_PROF_START(t) ut64 t = HEX_PROF_TICKS()
+#define HEX_PROF_STOP(state, timer, t) ((state)->prof.ticks[timer] += HEX_PROF_TICKS() - (t))
+#else
+#define HEX_PROF_ADD(state, counter, n)
+#define HEX_PROF_START(t)
+#define HEX_PROF_STOP(state, timer, t)
+#endif
+#define HEX_PROF_INC(state, counter) HEX_PROF_ADD(state, counter, 1)
@@ -3,6 +3,10 @@
 
 #define MAX_CONST_EXT 512
 #define HEXAGON_STATE_PKTS 8
+#define HEX_STR_ARENA_INIT_SIZE 4096
+#define HEX_PRODUCER_NONE UT8_MAX
+#define HEX_PRODUCER_EXT (UT8_MAX - 1)
+#define HEX_MEM_NO_OP UT8_MAX
 
 typedef enum {
 	HEX_OP_TYPE_IMM,
@@ -29,6 +33,17 @@ typedef enum {
 	HEX_OP_IMM_SCALED = 1 << 6 // Is the immediate shifted?
 } HexOpAttr;
 
+/**
+ * \brief Instruction set extensions. Each one has its own template tables.
+ * The tables are checked in this order. Must match InsnFeature in InstructionTemplate.py
+ */
+typedef enum {
+	HEX_FEATURE_CORE, ///< Scalar instructions. Always decoded.
+	HEX_FEATURE_HVX, ///< HVX vector instructions (V6_*). plugins.hexagon.decode.hvx
+	HEX_FEATURE_SYSTEM, ///< System instructions which are not implemented by LLVM (IMPORTED_*). plugins.hexagon.decode.system
+	HEX_FEATURE_COUNT,
+} HexFeature;
+
 typedef enum {
 	HEX_NO_LOOP = 0,
 	HEX_LOOP_0 = 1, // Is packet of loop0
@@ -36,23 +51,62 @@ typedef enum {
 	HEX_LOOP_01 = 1 << 2 // Belongs to loop 0 and 1
 } HexLoopAttr;
 
+/**
+ * \brief Addressing modes of load and store instructions.
+ */
+typedef enum {
+	HEX_NO_ADDR_MODE, ///< No memory access or the address is implicit (allocframe, dealloc_return etc.)
+	HEX_ADDR_MODE_ABS, ///< memw(##U32)
+	HEX_ADDR_MODE_GP_REL, ///< memw(gp+#u16). Absolute if the immediate is constant extended.
+	HEX_ADDR_MODE_ABS_SET, ///< memw(Re=##U32)
+	HEX_ADDR_MODE_BASE_IMM, ///< memw(Rs+#s11)
+	HEX_ADDR_MODE_BASE_LONG, ///< memw(Ru<<#u2+##U32)
+	HEX_ADDR_MODE_BASE_REG, ///< memw(Rs+Ru<<#u2)
+	HEX_ADDR_MODE_POST_INC, ///< memw(Rx++#s4), memw(Rx++Mu), circular and bit-reversed
+} HexAddrMode;
+
+/**
+ * \brief The memory access of a load or store instruction.
+ * base and offset are operand indices or HEX_MEM_NO_OP. All members are only valid if size != 0.
+ */
+typedef struct {
+	ut8 mode; ///< HexAddrMode
+	ut8 size; ///< Number of bytes accessed.
+	ut8 direction; ///< RzAnalysisOpDirection. RZ_ANALYSIS_OP_DIR_READ for loads, RZ_ANALYSIS_OP_DIR_WRITE for stores.
+	ut8 base; ///< Index of the base register operand.
+	ut8 offset; ///< Index of the offset (or absolute address) immediate operand.
+} HexMemAccess;
+
 typedef struct {
 	bool first_insn;
 	bool last_insn;
-	char text_prefix[16]; // Package indicator
-	char text_postfix[24]; // for ":endloop" string.
+	const char *text_prefix; // Package indicator
+	const char *text_postfix; // Closing bracket of the SDK syntax.
+	const char *text_eloop; // for ":endloop" string.
 } HexPktInfo;
 
 typedef struct {
-	ut8 type;
 	union {
 		ut8 reg; // + additional Hi or Lo selector // + additional shift // + additional :brev //
 		st64 imm;
 	} op;
-	HexOpAttr attr;
+	ut8 type; // HexOpType
+	ut8 attr; // HexOpAttr flags
 	ut8 shift;
 } HexOp;
 
+/**
+ * \brief A set of registers. One bit per register, indexed by the hardware encoding.
+ * Register pairs and other composed registers set the bits of all their parts.
+ */
+typedef struct {
+	ut32 gpr; ///< R0 - R31
+	ut32 ctr; ///< C0 - C31
+	ut32 vec; ///< V0 - V31
+	ut8 pred; ///< P0 - P3
+	ut8 vpred; ///< Q0 - Q3
+} HexRegSet;
+
 typedef struct {
 	bool is_sub; ///< Flag for sub-instructions.
 	ut8 op_count; ///< The number of operands this instruction has.
@@ -60,10 +114,40 @@ typedef struct {
 	ut32 opcode; ///< The instruction opcode.
 	HexPred pred; ///< The instruction predicate.
 	HexInsnID identifier; ///< The instruction identifier
-	char text_infix[128]; ///< Textual disassembly of the instruction.
+	ut32 text_infix; ///< Offset of the textual disassembly in the string arena of the state.
 	HexOp ops[HEX_MAX_OPERANDS]; ///< The operands of the instructions.
+	HexRegSet regs_read; ///< Registers the instruction reads. Explicit and implicit ones.
+	HexRegSet regs_written; ///< Registers the instruction writes. Explicit and implicit ones.
+	HexMemAccess mem; ///< The memory access of load and store instructions.
 } HexInsn;
 
+/**
+ * \brief A value of the analysis. Only the RzAnalysisValue members the decoder sets.
+ */
+typedef struct {
+	st64 imm; ///< Immediate value or ST64_MAX if unset.
+	ut64 plugin_specific; ///< Plugin specific value. Register number of J2_jumpr.
+} HexAnalysisVal;
+
+/**
+ * \brief The analysis information of an instruction container.
+ * Only the RzAnalysisOp members the decoder produces. They are written into the RzAnalysisOp of the caller.
+ */
+typedef struct {
+	ut32 type; ///< RzAnalysisOpType
+	ut64 prefix; ///< RzAnalysisOpPrefix
+	RzTypeCond cond; ///< Condition type.
+	int id; ///< Instruction ID. Only set for duplexes.
+	bool eob; ///< Is end of block?
+	ut64 jump; ///< Jump target or UT64_MAX.
+	ut64 fail; ///< Fail target or UT64_MAX.
+	st64 ptr; ///< Referenced address or UT64_MAX.
+	int refptr; ///< Number of bytes accessed at ptr. 0 if ptr is only a reference.
+	int direction; ///< RzAnalysisOpDirection of the memory access.
+	ut64 val; ///< Value or UT64_MAX.
+	HexAnalysisVal analysis_vals[6]; ///< Same size as RzAnalysisOp.analysis_vals.
+} HexAnalysisInfo;
+
 /**
  * \brief The instruction container holds one instruction or two sub-instructions if it is a duplex.
  * It stores meta information about those instruction(s) like opcode, packet information or the parse bits.
@@ -79,10 +163,7 @@ typedef struct {
     ut32 addr; ///< Address of container. Equals address of instruction or of the high sub-instruction if this is a duplex.
     ut32 opcode; ///< The instruction opcode.
     HexPktInfo pkt_info; ///< Packet related information. First/last instr., prefix and postfix for text etc.
-    // Deprecated members will be removed on RzArch introduction.
-    RZ_DEPRECATE RzAsmOp asm_op; ///< Private copy of AsmOp. Currently only of interest because it holds the utf8 flag.
-	RZ_DEPRECATE RzAnalysisOp ana_op; ///< Private copy of AnalysisOp. Analysis info is written into it.
-	char text[296]; ///< Textual disassembly
+    HexAnalysisInfo ana_op; ///< Analysis information. Copied into the RzAnalysisOp of the caller.
 } HexInsnContainer;
 
 /**
@@ -114,6 +195,7 @@ typedef struct {
 	ut64 last_access; ///< Last time accessed in milliseconds
 	ut32 pkt_addr; ///< Address of the packet. Equals the address of the first instruction.
 	bool is_eob; ///< Is this packet the end of a code block? E.g. contains unconditional jmp.
+	ut8 producers[4]; ///< Output register of the instruction at each index of bin. HEX_PRODUCER_NONE or HEX_PRODUCER_EXT otherwise.
 } HexPkt;
 
 typedef struct {
@@ -122,13 +204,54 @@ typedef struct {
 } HexConstExt;
 
 /**
- * \brief Buffer packets for reversed instructions.
- * 
+ * \brief Zero terminated strings of a state. Instructions reference their text by offset.
+ * Strings of evicted instructions are dropped when the arena is compacted.
+ */
+typedef struct {
+	char *buf; ///< The strings.
+	ut32 size; ///< Bytes in use.
+	ut32 capacity; ///< Allocated bytes.
+} HexStrArena;
+
+#ifdef HEX_PROFILE
+/**
+ * \brief The timers of the instrumented build. The decode timer contains the time of the .new resolution.
+ */
+typedef enum {
+	HEX_PROF_DECODE, ///< Decoding of the instruction words.
+	HEX_PROF_NEW_REG, ///< Resolution of Nt.new registers to their producers.
+	HEX_PROF_TEXT, ///< Concatenation of the instruction text for the RzAsmOp.
+	HEX_PROF_TOKENIZE, ///< Tokenization of the instruction text.
+	HEX_PROF_TIMER_COUNT,
+} HexProfTimer;
+
+/**
+ * \brief Counters and timers of a state. Only present if the plugin is compiled with HEX_PROFILE.
+ * The timers count CPU cycles on x86 and microseconds otherwise.
  */
 typedef struct {
+	ut64 words; ///< Decoded instruction words.
+	ut64 templates_probed; ///< Templates compared with the instruction words.
+	ut64 hic_lookups; ///< Searches for an already decoded instruction container.
+	ut64 hic_hits; ///< Searches which found one.
+	ut64 pkts_evicted; ///< Buffered packets cleared for new instructions.
+	ut64 ticks[HEX_PROF_TIMER_COUNT]; ///< Time spent in each HexProfTimer section.
+} HexProfile;
+#endif
+
+/**
+ * \brief Buffer packets for reversed instructions.
+ * Each plugin instance (RzAsm, RzAnalysis) owns one state (stored in its plugin_data).
+ */
+typedef struct hex_state_t {
     HexPkt pkts[HEXAGON_STATE_PKTS]; // buffered instructions
     RzList *const_ext_l; // Constant extender values.
-	RzAsm rz_asm; // Copy of RzAsm struct. Holds certain flags of interesed for disassembly formatting.
-	RzConfig *cfg;
-	RzPVector /* RzAsmTokenPattern* */ *token_patterns; ///< PVector with token patterns. Priority ordered.
+	bool utf8; ///< Use UTF8 packet indicators. Taken from the RzAsm of the last disassembly call.
+	RzConfig *cfg; ///< The plugin configuration. Shared by all states.
+	RzPVector /* RzAsmTokenPattern* */ *token_patterns; ///< PVector with token patterns. Priority ordered. Only set for RzAsm states.
+	HexStrArena text; ///< Textual disassembly of the buffered instructions.
+	RzConfigNode *feature_cfg[HEX_FEATURE_COUNT]; ///< Config nodes which enable the decoding of a feature. NULL: Always decoded.
+#ifdef HEX_PROFILE
+	HexProfile prof; ///< Counters and timers of the instrumented build.
+#endif
 } HexState;
@@ -2,7 +2,10 @@
 #
 # SPDX-License-Identifier: LGPL-3.0-only
 
+import argparse
+import json
 import re
+import time
 
 from bitarray import bitarray
 from enum import IntEnum
@@ -10,6 +13,8 @@ from enum import IntEnum
 from typing.io import TextIO
 
 import PluginInfo
+from AsmString import AsmString
+from ImplementationException import ImplementationException
 from UnexpectedException import UnexpectedException
 
 try:
@@ -32,20 +37,80 @@ class LogLevel(IntEnum):
 
 
 LOG_LEVEL = LogLevel.INFO
+# Subsystem -> LogLevel. Overrides LOG_LEVEL for messages of this subsystem.
+LOG_SUBSYSTEM_LEVELS: dict = dict()
+# Subsystems which can be passed to log(). Messages without a subsystem only use LOG_LEVEL.
+LOG_SUBSYSTEMS = ["importer", "instruction", "encoding", "operand", "syntax", "registers", "template", "benchmark"]
+# Maximum of LOG_LEVEL and all subsystem levels. Everything above it is dropped by a single comparison.
+_max_log_level = LOG_LEVEL
+# Text file the messages are written to as JSON lines. None if disabled.
+_log_json_sink = None
+
+
+def set_log_level(level: LogLevel, subsystem: str = None) -> None:
+    """Sets the log level of a subsystem. If no subsystem is given the default level LOG_LEVEL is set."""
+    global LOG_LEVEL, _max_log_level
+    if subsystem is None:
+        LOG_LEVEL = level
+    elif subsystem not in LOG_SUBSYSTEMS:
+        raise ImplementationException("Unknown log subsystem: {}".format(subsystem))
+    else:
+        LOG_SUBSYSTEM_LEVELS[subsystem] = level
+    _max_log_level = max([LOG_LEVEL] + list(LOG_SUBSYSTEM_LEVELS.values()))
+
+
+def parse_log_arg(value: str) -> tuple:
+    """Parses a "SUBSYSTEM=LEVEL" command line argument. Use it as argparse type.
+
+    Returns: (subsystem, LogLevel)
+    """
+    subsystem, sep, level = value.partition("=")
+    levels = [lvl.name for lvl in LogLevel]
+    if not sep or subsystem not in LOG_SUBSYSTEMS or level.upper() not in levels:
+        raise argparse.ArgumentTypeError(
+            "'{}' is not SUBSYSTEM=LEVEL. Subsystems: {}. Levels: {}".format(
+                value, ", ".join(LOG_SUBSYSTEMS), ", ".join(levels)
+            )
+        )
+    return subsystem, LogLevel[level.upper()]
+
+
+def set_log_json_sink(path: str = None) -> None:
+    """Writes all logged messages additionally as JSON lines to the file at path. None disables it."""
+    global _log_json_sink
+    if _log_json_sink:
+        _log_json_sink.close()
+    _log_json_sink = open(path, "w") if path else None
+
+
+def log_enabled(verbosity: LogLevel, subsystem: str = None) -> bool:
+    """Returns true if a message of the given level and subsystem is logged.
+    Use it to guard the computation of expensive log arguments.
+    """
+    if verbosity > _max_log_level:
+        return False
+    return verbosity <= LOG_SUBSYSTEM_LEVELS.get(subsystem, LOG_LEVEL)
 
 
-def log(msg: str, verbosity: LogLevel = LogLevel.INFO) -> None:
+def log(msg: str, verbosity: LogLevel = LogLevel.INFO, *args, subsystem: str = None) -> None:
     """
 
     Args:
-        msg: The message to log
+        msg: The message to log. If args are given it is a format string and formatted only if it is logged.
         verbosity: msg level: error, log
+        args: Arguments for msg.format()
+        subsystem: The subsystem the message belongs to (one of LOG_SUBSYSTEMS).
 
     Returns: None
 
     """
-    if verbosity > LOG_LEVEL:
+    if verbosity > _max_log_level or not log_enabled(verbosity, subsystem):
         return
+    if args:
+        msg = msg.format(*args)
+    if _log_json_sink:
+        record = {"time": time.time(), "level": verbosity.name, "subsystem": subsystem, "msg": msg}
+        _log_json_sink.write(json.dumps(record) + "\n")
 
     if colorama_imported:
         if verbosity == LogLevel.ERROR:
@@ -335,8 +400,6 @@ def include_file(filename):
 
 
 def normalize_llvm_syntax(llvm_syntax: str) -> str:
-    syntax = re.sub(r"#{0,2}\$", "", llvm_syntax)
-    # Any number which stands before a register or immediate letter.
-    syntax = re.sub(r"([A-Z][a-z,A-Z]+)[0-9]+", r"\1", syntax)
-    log("Normalized syntax: {} -> {}".format(llvm_syntax, syntax), LogLevel.VERBOSE)
+    syntax = AsmString(llvm_syntax).normalized
+    log("Normalized syntax: {} -> {}", LogLevel.VERBOSE, llvm_syntax, syntax, subsystem="syntax")
     return syntax